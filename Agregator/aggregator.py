@@ -0,0 +1,1013 @@
+import pymongo
+from neo4j import GraphDatabase
+import pandas as pd
+from datetime import datetime, timedelta
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Tuple
+from dotenv import load_dotenv
+load_dotenv()
+import logging
+import os
+
+import numpy as np
+
+from columnar import BACKENDS, DEFAULT_STORE_PATH, get_columnar_store
+from index_advisor import record_query
+from joins import DEFAULT_WORK_HOURS, index_by, join_records, normalize_key, to_records, work_hours
+from line_items import DEFAULT_ARRAY_PATH, get_line_item_arrays
+from market_basket import (
+    COUNTS_COLLECTION,
+    association_rules,
+    basket_counts_branches,
+    counts_available,
+    live_counts,
+    materialized_counts,
+    merge_count_branches
+)
+from multi_aggregate import run_multi
+from rollup import (
+    ROLLUP_DAILY_EMPLOYEE,
+    ROLLUP_DAILY_FRANCHISE,
+    ROLLUP_DAILY_FRANCHISE_PRODUCT,
+    employee_totals_pipeline,
+    franchise_monthly_pipeline,
+    franchise_product_pipeline,
+    rollups_available,
+    top_employees_pipeline,
+    top_franchises_pipeline,
+    top_products_pipeline
+)
+from sketches import (
+    DEFAULT_MAX_SAMPLE,
+    DEFAULT_PRECISION,
+    HyperLogLog,
+    approximate_distinct,
+    hash_sample_stage,
+    heavy_hitters,
+    proportion_interval,
+    sample_fraction
+)
+
+logger = logging.getLogger(__name__)
+
+# Data referensi Neo4j yang dipakai bersama oleh beberapa analisis
+REFERENCE_QUERIES = {
+    'employees': """
+        MATCH (e:Employee)
+        RETURN e.id_employee as employee_id, e.name as employee_name,
+               e.work_start_hour as start_hour, e.work_end_hour as end_hour,
+               e.id_cafe as cafe_id
+    """,
+    'products': """
+        MATCH (p:Product)
+        RETURN p.id_product as product_id, p.name as product_name,
+               p.category as category, p.price as price
+    """,
+    'franchises': """
+        MATCH (f:Franchise)
+        RETURN f.id_cafe as franchise_id, f.name as franchise_name,
+               f.year as year_established
+    """
+}
+
+DEFAULT_ANALYSIS_WORKERS = 4
+
+# Fixed price per order item (product prices are not stored in MongoDB)
+REVENUE_STAGE = {"$addFields": {"calculated_revenue": {"$multiply": ["$order_quantity", 30000]}}}
+
+# Periode laporan comprehensive analysis
+REPORT_START_DATE = "2020-01-01"
+REPORT_END_DATE = "2025-12-31"
+REPORT_MONTHS_BACK = 12
+
+
+def growth_period(months_back: int) -> Tuple[str, str]:
+    """(start, end) date strings covering the last `months_back` months"""
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=months_back * 30)
+    return start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+
+class MongoNeo4jAggregator:
+    def __init__(self, mongo_uri: str, neo4j_uri: str, neo4j_user: str, neo4j_password: str, use_rollups: bool = True, approximate_segmentation: bool = False, backend: str = "mongodb", columnar_path: str = DEFAULT_STORE_PATH, line_item_path: str = DEFAULT_ARRAY_PATH):
+        # MongoDB Connection
+        self.mongo_client = pymongo.MongoClient(mongo_uri)
+        self.mongo_db = self.mongo_client['dbcafe']
+        self.transactions_collection = self.mongo_db['transactionlog']
+        
+        # Neo4j Connection
+        self.neo4j_driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password))
+
+        # Answer from rollup collections when they have been built
+        self.use_rollups = use_rollups
+        self._rollups_ready = None
+
+        # Segment customers from sketches instead of grouping every name
+        self.approximate_segmentation = approximate_segmentation
+
+        # Analytical backend: "columnar" reads the local Parquet snapshot (columnar.py)
+        if backend not in BACKENDS:
+            raise ValueError(f"backend harus salah satu dari {BACKENDS}")
+        self.columnar = None
+        if backend == "columnar":
+            store = get_columnar_store(columnar_path)
+            if store.available():
+                self.columnar = store
+            else:
+                logger.warning("Columnar cache belum disinkronkan (python columnar.py sync), memakai MongoDB")
+
+        # Memory-mapped line items (line_items.py) for price-weighted revenue metrics
+        arrays = get_line_item_arrays(line_item_path)
+        self.line_items = arrays if arrays.available() else None
+
+        # Neo4j reference data, fetched once and shared across analyses
+        self._reference_cache: Dict[str, List[Dict[str, Any]]] = {}
+        self._reference_locks = {name: threading.Lock() for name in REFERENCE_QUERIES}
+        self.reference_timings: Dict[str, float] = {}
+        self.last_run_timings: Dict[str, Any] = {}
+        
+        # Product price mapping (since prices aren't in MongoDB)
+        self.product_prices = {
+            "C1": 25000,  # Americano
+            "C2": 35000,  # Cappuccino
+            "C3": 40000,  # Latte
+            "C4": 20000,  # Espresso
+            "C5": 30000,  # Macchiato
+            "C6": 38000,  # Flat White
+            "C7": 45000,  # Mocha
+            "C8": 35000,  # Cold Brew
+            "NC1": 42000, # Matcha Latte
+            "NC2": 40000  # Chai Latte
+        }
+        
+    def close_connections(self):
+        """Close database connections"""
+        self.mongo_client.close()
+        self.neo4j_driver.close()
+
+    def get_product_price(self, product_id: str) -> int:
+        """Get product price with fallback"""
+        return self.product_prices.get(product_id, 30000)  # Default 30k
+
+    def _aggregate(self, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run a pipeline on transactionlog, recording its shape for the index advisor"""
+        record_query(self.mongo_db, self.transactions_collection.name, "aggregate", pipeline)
+        return list(self.transactions_collection.aggregate(pipeline, allowDiskUse=True))
+
+    def _aggregate_many(self, pipelines: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Several pipelines over transactions_collection in one $facet scan"""
+        return run_multi(
+            self.transactions_collection,
+            pipelines,
+            shared_stages=[REVENUE_STAGE],
+            on_pipeline=lambda pipeline: record_query(self.mongo_db, self.transactions_collection.name, "aggregate", pipeline)
+        )
+
+    def reference_data(self, name: str) -> List[Dict[str, Any]]:
+        """
+        Neo4j reference rows (employees/products/franchises). The first caller
+        runs the query, concurrent callers wait for it; failures yield [].
+        """
+        if name in self._reference_cache:
+            return self._reference_cache[name]
+        with self._reference_locks[name]:
+            if name not in self._reference_cache:
+                started = time.perf_counter()
+                try:
+                    with self.neo4j_driver.session() as session:
+                        self._reference_cache[name] = session.run(REFERENCE_QUERIES[name]).data()
+                except Exception as e:
+                    logger.warning(f"Failed to get {name} from Neo4j, using empty results: {e}")
+                    self._reference_cache[name] = []
+                self.reference_timings[name] = time.perf_counter() - started
+        return self._reference_cache[name]
+
+    def clear_reference_data(self):
+        self._reference_cache.clear()
+        self.reference_timings.clear()
+
+    def rollups_enabled(self) -> bool:
+        """Whether analyses should read from the rollup collections"""
+        if not self.use_rollups:
+            return False
+        if self._rollups_ready is None:
+            try:
+                self._rollups_ready = rollups_available(self.mongo_db)
+            except Exception as e:
+                logger.warning(f"Failed to check rollup state, using transactionlog: {e}")
+                self._rollups_ready = False
+            if self._rollups_ready:
+                logger.info("Rollup collections available, analyses will read from them")
+        return self._rollups_ready
+
+    # ========== FIXED IDEA 1: Employee Performance Analysis ==========
+    def employee_performance_pipeline(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        return [
+            {
+                "$match": {
+                    "transaction_date": {
+                        "$gte": start_date,
+                        "$lte": end_date
+                    }
+                }
+            },
+            REVENUE_STAGE,
+            {
+                "$group": {
+                    "_id": "$id_employee",
+                    "total_transactions": {"$sum": 1},
+                    "total_revenue": {"$sum": "$calculated_revenue"},
+                    "avg_order_quantity": {"$avg": "$order_quantity"},
+                    "franchise_id": {"$first": "$id_franchise"}
+                }
+            }
+        ]
+
+    def employee_performance_analysis(self, start_date: str, end_date: str, mongo_results: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        logger.info("Starting employee performance analysis...")
+        
+        # Get transaction data (columnar cache, rollups, a shared scan, or its own pipeline)
+        if mongo_results is None:
+            if self.columnar is not None:
+                mongo_results = self.columnar.employee_totals(start_date, end_date)
+            elif self.rollups_enabled():
+                mongo_results = list(self.mongo_db[ROLLUP_DAILY_EMPLOYEE].aggregate(employee_totals_pipeline(start_date, end_date)))
+            else:
+                mongo_results = self._aggregate(self.employee_performance_pipeline(start_date, end_date))
+        
+        # Employee data from Neo4j (shared reference data, fetched once)
+        neo4j_results = self.reference_data('employees')
+        
+        # Combine results: satu hash join, jam kerja dihitung sekali per employee
+        combined = join_records(
+            mongo_results, neo4j_results, '_id', 'employee_id',
+            right_columns=['employee_name', 'start_hour', 'end_hour', 'cafe_id'],
+            indicator=True
+        )
+        combined_results = []
+        if not combined.empty:
+            matched = combined['_merge'] == 'both'
+            hours = work_hours(combined['start_hour'], combined['end_hour']).where(matched, DEFAULT_WORK_HOURS)
+            revenue = combined['total_revenue']
+            # Employee tanpa data Neo4j tetap dihitung dengan jam kerja default
+            score = pd.Series(np.where(hours > 0, revenue / hours.where(hours > 0, 1), 0), index=combined.index)
+            fallback_cafe = combined['franchise_id'] if 'franchise_id' in combined else 'Unknown'
+            frame = pd.DataFrame({
+                'employee_id': combined['_id'],
+                'employee_name': combined['employee_name'].where(matched, 'Employee ' + combined['_id'].astype(str)),
+                'cafe_id': combined['cafe_id'].where(matched, fallback_cafe),
+                'total_transactions': combined['total_transactions'],
+                'total_revenue': revenue,
+                'avg_order_quantity': combined['avg_order_quantity'],
+                'work_hours': hours,
+                'performance_score': score,
+                'revenue_per_hour': score
+            })
+            combined_results = to_records(frame.sort_values('performance_score', ascending=False, kind='stable'))
+        
+        return {
+            'analysis_period': f"{start_date} to {end_date}",
+            'employee_performance': combined_results
+        }
+
+    # ========== FIXED IDEA 2: Regional Product Popularity ==========
+    def regional_product_pipeline(self) -> List[Dict[str, Any]]:
+        # Since location data is missing from sample, we'll analyze by franchise
+        return [
+            {
+                "$unwind": "$product"  # Unwind the product array
+            },
+            {
+                "$group": {
+                    "_id": {
+                        "franchise_id": "$id_franchise",
+                        "product_id": "$product.id_product",
+                        "product_name": "$product.name"
+                    },
+                    "total_quantity": {"$sum": "$product.quantity"},
+                    "total_orders": {"$sum": 1},
+                    "avg_order_size": {"$avg": "$order_quantity"}
+                }
+            },
+            {
+                "$group": {
+                    "_id": "$_id.franchise_id",
+                    "products": {
+                        "$push": {
+                            "product_id": "$_id.product_id",
+                            "product_name": "$_id.product_name",
+                            "total_quantity": "$total_quantity",
+                            "total_orders": "$total_orders",
+                            "avg_order_size": "$avg_order_size"
+                        }
+                    },
+                    "franchise_total_orders": {"$sum": "$total_orders"}
+                }
+            }
+        ]
+
+    def regional_product_analysis(self, mongo_results: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        logger.info("Starting regional product analysis...")
+        
+        if mongo_results is None:
+            if self.columnar is not None:
+                mongo_results = self.columnar.franchise_products()
+            elif self.rollups_enabled():
+                mongo_results = list(self.mongo_db[ROLLUP_DAILY_FRANCHISE_PRODUCT].aggregate(franchise_product_pipeline()))
+            else:
+                mongo_results = self._aggregate(self.regional_product_pipeline())
+        
+        # Product category data from Neo4j (shared reference data)
+        product_data = self.reference_data('products')
+        
+        # Enhance results with product categories: flatten franchise x produk, satu merge
+        product_rows = pd.DataFrame([
+            {**product, '_franchise': position, '_franchise_total': franchise_data['franchise_total_orders']}
+            for position, franchise_data in enumerate(mongo_results)
+            for product in franchise_data['products']
+        ])
+        products_by_franchise = {}
+        if not product_rows.empty:
+            product_rows = join_records(product_rows, product_data, 'product_id', 'product_id', right_columns=['category'], indicator=True)
+            product_rows['category'] = product_rows['category'].where(product_rows['_merge'] == 'both', 'Coffee')  # Default category
+            product_rows['price'] = product_rows['product_id'].map(self.product_prices).fillna(30000).astype(int)
+            totals = product_rows['_franchise_total']
+            product_rows['popularity_score'] = np.where(totals > 0, product_rows['total_orders'] / totals.where(totals > 0, 1), 0)
+            product_rows = product_rows.sort_values(['_franchise', 'popularity_score'], ascending=[True, False], kind='stable')
+            for position, group in product_rows.groupby('_franchise', sort=False):
+                products_by_franchise[position] = to_records(group.drop(columns=['_franchise', '_franchise_total', '_merge']))
+        
+        enhanced_results = [
+            {
+                'franchise_id': franchise_data['_id'],
+                'total_orders': franchise_data['franchise_total_orders'],
+                'products': products_by_franchise.get(position, [])
+            }
+            for position, franchise_data in enumerate(mongo_results)
+        ]
+        
+        return {
+            'franchise_analysis': enhanced_results,
+            'top_franchises': sorted(enhanced_results, key=lambda x: x['total_orders'], reverse=True)[:5]
+        }
+
+    # ========== FIXED IDEA 3: Franchise Growth Analysis ==========
+    def franchise_growth_pipeline(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        # Monthly transaction trends per franchise
+        return [
+            {
+                "$match": {
+                    "transaction_date": {
+                        "$gte": start_date,
+                        "$lte": end_date
+                    }
+                }
+            },
+            REVENUE_STAGE,
+            {
+                "$addFields": {
+                    "month_year": {"$substr": ["$transaction_date", 0, 7]}  # Extract YYYY-MM
+                }
+            },
+            {
+                "$group": {
+                    "_id": {
+                        "franchise_id": "$id_franchise",
+                        "month": "$month_year"
+                    },
+                    "monthly_transactions": {"$sum": 1},
+                    "monthly_revenue": {"$sum": "$calculated_revenue"}
+                }
+            },
+            {
+                "$group": {
+                    "_id": "$_id.franchise_id",
+                    "monthly_data": {
+                        "$push": {
+                            "month": "$_id.month",
+                            "transactions": "$monthly_transactions",
+                            "revenue": "$monthly_revenue"
+                        }
+                    },
+                    "total_transactions": {"$sum": "$monthly_transactions"},
+                    "total_revenue": {"$sum": "$monthly_revenue"}
+                }
+            }
+        ]
+
+    def franchise_growth_analysis(self, months_back: int = 12, mongo_results: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        logger.info("Starting franchise growth analysis...")
+        
+        if mongo_results is None:
+            start_date, end_date = growth_period(months_back)
+            if self.columnar is not None:
+                mongo_results = self.columnar.franchise_monthly(start_date, end_date)
+            elif self.rollups_enabled():
+                mongo_results = list(self.mongo_db[ROLLUP_DAILY_FRANCHISE].aggregate(franchise_monthly_pipeline(start_date, end_date)))
+            else:
+                mongo_results = self._aggregate(self.franchise_growth_pipeline(start_date, end_date))
+        
+        # Franchise data from Neo4j (shared reference data)
+        franchise_data = index_by(self.reference_data('franchises'), 'franchise_id')
+        
+        # Calculate growth metrics
+        growth_analysis = []
+        for franchise_info in mongo_results:
+            franchise_id = franchise_info['_id']
+            neo4j_info = franchise_data.get(normalize_key(franchise_id), {})
+            
+            # Calculate growth trend
+            monthly_data = sorted(franchise_info['monthly_data'], key=lambda x: x['month'])
+            if len(monthly_data) >= 2:
+                first_month_revenue = monthly_data[0]['revenue']
+                last_month_revenue = monthly_data[-1]['revenue']
+                growth_rate = ((last_month_revenue - first_month_revenue) / first_month_revenue * 100) if first_month_revenue > 0 else 0
+            else:
+                growth_rate = 0
+            
+            franchise_age = datetime.now().year - (neo4j_info.get('year_established') or datetime.now().year)
+            
+            growth_analysis.append({
+                'franchise_id': franchise_id,
+                'franchise_name': neo4j_info.get('franchise_name', f'Franchise {franchise_id}'),
+                'franchise_age_years': franchise_age,
+                'total_transactions': franchise_info['total_transactions'],
+                'total_revenue': franchise_info['total_revenue'],
+                'growth_rate_percent': growth_rate,
+                'monthly_trends': monthly_data,
+                'avg_monthly_revenue': franchise_info['total_revenue'] / len(monthly_data) if monthly_data else 0
+            })
+        
+        return {
+            'analysis_period_months': months_back,
+            'franchise_growth': sorted(growth_analysis, key=lambda x: x['growth_rate_percent'], reverse=True),
+            'top_performers': sorted(growth_analysis, key=lambda x: x['total_revenue'], reverse=True)[:10]
+        }
+
+    # ========== FIXED IDEA 4: Cross-Selling Opportunity Analysis ==========
+    def cross_selling_analysis(self, top_n: int = 20, top_n_per_franchise: int = 5, counts: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        logger.info("Starting cross-selling analysis...")
+        
+        # Pair counts are computed inside MongoDB; only the small count table
+        # comes back (from basket_counts when it is built and up to date)
+        if counts is not None:
+            source = self.transactions_collection.name
+        elif self.columnar is not None:
+            counts = self.columnar.basket_counts()
+            source = 'columnar'
+        elif counts_available(self.mongo_db, self.transactions_collection.name):
+            counts = materialized_counts(self.mongo_db)
+            source = COUNTS_COLLECTION
+        else:
+            counts = live_counts(self.transactions_collection)
+            source = self.transactions_collection.name
+        overall = association_rules(counts, top_n=top_n)
+        per_franchise = association_rules(counts, by_franchise=True, top_n=top_n_per_franchise)
+        
+        # Product names from Neo4j (shared reference data)
+        products = index_by(self.reference_data('products'), 'product_id')
+        
+        def format_rule(rule):
+            prod1_info = products.get(normalize_key(rule['product1']), {})
+            prod2_info = products.get(normalize_key(rule['product2']), {})
+            return {
+                'product1': {'id': rule['product1'], 'name': prod1_info.get('product_name', f"Product {rule['product1']}")},
+                'product2': {'id': rule['product2'], 'name': prod2_info.get('product_name', f"Product {rule['product2']}")},
+                'frequency': rule['frequency'],
+                'support': rule['support'],
+                'confidence': rule['confidence'],
+                'confidence_reverse': rule['confidence_reverse'],
+                'lift': rule['lift']
+            }
+        
+        by_franchise = {}
+        for rule in per_franchise['rules']:
+            by_franchise.setdefault(rule['id_franchise'], []).append(format_rule(rule))
+        
+        return {
+            'analysis_summary': {
+                'total_transactions': overall['summary']['total_transactions'],
+                'total_multi_product_transactions': overall['summary']['multi_product_transactions'],
+                'unique_product_combinations': overall['summary']['unique_pairs'],
+                'source': source
+            },
+            'top_product_combinations': [format_rule(rule) for rule in overall['rules']],
+            'by_franchise': by_franchise
+        }
+
+    # ========== FIXED MongoDB-Only Analysis ==========
+    def mongodb_only_pipelines(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Summary and top-10 pipelines; _aggregate_many runs them in one scan"""
+        return {
+            # Transaction summary
+            'summary': [{"$count": "total_transactions"}],
+            # Top employees by revenue
+            'top_employees': [
+                REVENUE_STAGE,
+                {
+                    "$group": {
+                        "_id": "$id_employee",
+                        "transaction_count": {"$sum": 1},
+                        "total_revenue": {"$sum": "$calculated_revenue"},
+                        "avg_order_quantity": {"$avg": "$order_quantity"}
+                    }
+                },
+                {"$sort": {"total_revenue": -1}},
+                {"$limit": 10}
+            ],
+            # Top products (unwind the array first)
+            'top_products': [
+                {"$unwind": "$product"},
+                {
+                    "$group": {
+                        "_id": "$product.id_product",
+                        "product_name": {"$first": "$product.name"},
+                        "total_quantity": {"$sum": "$product.quantity"},
+                        "order_count": {"$sum": 1}
+                    }
+                },
+                {"$sort": {"total_quantity": -1}},
+                {"$limit": 10}
+            ],
+            # Franchise analysis
+            'top_franchises': [
+                REVENUE_STAGE,
+                {
+                    "$group": {
+                        "_id": "$id_franchise",
+                        "transaction_count": {"$sum": 1},
+                        "total_revenue": {"$sum": "$calculated_revenue"}
+                    }
+                },
+                {"$sort": {"total_revenue": -1}},
+                {"$limit": 10}
+            ]
+        }
+
+    def mongodb_only_analysis(self, mongo_results: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> Dict[str, Any]:
+        logger.info("Running MongoDB-only analysis...")
+
+        if mongo_results is None and self.columnar is not None:
+            mongo_results = self.columnar.mongodb_only()
+        if mongo_results is None and self.rollups_enabled():
+            totals = list(self.mongo_db[ROLLUP_DAILY_FRANCHISE].aggregate([
+                {"$group": {"_id": None, "total_transactions": {"$sum": "$transactions"}}}
+            ]))
+            return {
+                'summary': {
+                    'total_transactions': totals[0]['total_transactions'] if totals else 0,
+                    'analysis_type': 'MongoDB Only (rollup)'
+                },
+                'top_employees': list(self.mongo_db[ROLLUP_DAILY_EMPLOYEE].aggregate(top_employees_pipeline())),
+                'top_products': list(self.mongo_db[ROLLUP_DAILY_FRANCHISE_PRODUCT].aggregate(top_products_pipeline())),
+                'top_franchises': list(self.mongo_db[ROLLUP_DAILY_FRANCHISE].aggregate(top_franchises_pipeline()))
+            }
+        
+        if mongo_results is None:
+            mongo_results = self._aggregate_many(self.mongodb_only_pipelines())
+        totals = mongo_results['summary']
+        
+        return {
+            'summary': {
+                'total_transactions': totals[0]['total_transactions'] if totals else 0,
+                'analysis_type': 'MongoDB Only'
+            },
+            'top_employees': mongo_results['top_employees'],
+            'top_products': mongo_results['top_products'],
+            'top_franchises': mongo_results['top_franchises']
+        }
+
+    # ========== FIXED Customer Segmentation ==========
+    def customer_segmentation_pipeline(self) -> List[Dict[str, Any]]:
+        return [
+            REVENUE_STAGE,
+            {
+                "$group": {
+                    "_id": "$name",  # Customer name as identifier
+                    "total_spent": {"$sum": "$calculated_revenue"},
+                    "transaction_count": {"$sum": 1},
+                    "avg_order_value": {"$avg": "$calculated_revenue"},
+                    "preferred_franchises": {"$addToSet": "$id_franchise"},
+                    "last_transaction": {"$max": "$transaction_date"}
+                }
+            },
+            {
+                "$addFields": {
+                    "customer_segment": {
+                        "$switch": {
+                            "branches": [
+                                {
+                                    "case": {"$and": [{"$gte": ["$total_spent", 500000]}, {"$gte": ["$transaction_count", 20]}]},
+                                    "then": "VIP"
+                                },
+                                {
+                                    "case": {"$and": [{"$gte": ["$total_spent", 200000]}, {"$gte": ["$transaction_count", 10]}]},
+                                    "then": "Regular"
+                                },
+                                {
+                                    "case": {"$and": [{"$lte": ["$total_spent", 100000]}, {"$lte": ["$transaction_count", 5]}]},
+                                    "then": "Occasional"
+                                }
+                            ],
+                            "default": "New"
+                        }
+                    },
+                    "franchise_loyalty": {"$size": "$preferred_franchises"}
+                }
+            },
+            {
+                "$group": {
+                    "_id": "$customer_segment",
+                    "customer_count": {"$sum": 1},
+                    "avg_total_spent": {"$avg": "$total_spent"},
+                    "avg_transaction_count": {"$avg": "$transaction_count"},
+                    "avg_order_value": {"$avg": "$avg_order_value"}
+                }
+            }
+        ]
+
+    def approximate_customer_segmentation(
+        self,
+        precision: int = DEFAULT_PRECISION,
+        max_sample: int = DEFAULT_MAX_SAMPLE,
+        top_customers: int = 0) -> Dict[str, Any]:
+        """
+        Segment mix from a hash sample of about `max_sample` customers, scaled
+        to the HyperLogLog customer count; memory stays bounded at any size.
+        Counts carry 95% low/high bounds combining both errors.
+        """
+        sketch = approximate_distinct(self.transactions_collection, 'name', precision).get(None, HyperLogLog(precision))
+        customers = sketch.summary()
+        fraction = sample_fraction(customers['estimate'], max_sample)
+        
+        # Semua transaksi dari pelanggan yang hash namanya masuk sampel
+        pipeline = self.customer_segmentation_pipeline()
+        if fraction < 1:
+            pipeline = [hash_sample_stage('name', fraction)] + pipeline
+        sample_segments = self._aggregate(pipeline)
+        sampled = sum(segment['customer_count'] for segment in sample_segments)
+        
+        if fraction >= 1:
+            # Sampel = seluruh pelanggan, hitungan segmen eksak
+            customers = {'estimate': sampled, 'low': sampled, 'high': sampled, 'standard_error': 0.0, 'confidence': 0.95}
+        
+        segments = []
+        for segment in sample_segments:
+            interval = proportion_interval(segment['customer_count'], sampled, fraction)
+            segments.append({
+                **segment,
+                'sample_customer_count': segment['customer_count'],
+                'customer_count': int(round(interval['share'] * customers['estimate'])),
+                'customer_count_low': int(interval['low'] * customers['low']),
+                'customer_count_high': int(round(interval['high'] * customers['high']))
+            })
+        
+        result = {
+            'customer_segments': segments,
+            'total_customers': customers['estimate'],
+            'approximation': {
+                'method': 'hyperloglog + hash sample',
+                'total_customers_low': customers['low'],
+                'total_customers_high': customers['high'],
+                'distinct_standard_error': customers['standard_error'],
+                'sample_fraction': fraction,
+                'sampled_customers': sampled,
+                'confidence': customers['confidence']
+            }
+        }
+        if top_customers:
+            # Heavy hitter per jumlah transaksi (count-min, tidak pernah undercount)
+            hitters = heavy_hitters(self.transactions_collection, 'name', top_customers)
+            result['top_customers'] = [
+                {'name': item['value'], 'transaction_count_estimate': item['estimate']}
+                for item in hitters['items']
+            ]
+            result['approximation']['top_customers_error_bound'] = hitters['error_bound']
+            result['approximation']['top_customers_confidence'] = hitters['confidence']
+        return result
+
+    def customer_segmentation_analysis(self, mongo_results: Optional[List[Dict[str, Any]]] = None, approximate: Optional[bool] = None, top_customers: int = 0) -> Dict[str, Any]:
+        logger.info("Starting customer segmentation analysis...")
+        
+        if mongo_results is None and self.columnar is not None:
+            mongo_results = self.columnar.customer_segments()
+        if mongo_results is None and (self.approximate_segmentation if approximate is None else approximate):
+            return self.approximate_customer_segmentation(top_customers=top_customers)
+        
+        segmentation_results = mongo_results if mongo_results is not None else self._aggregate(self.customer_segmentation_pipeline())
+        
+        return {
+            'customer_segments': segmentation_results,
+            'total_customers': sum(segment['customer_count'] for segment in segmentation_results)
+        }
+
+    # ========== Product Revenue (Line Items) ==========
+    def product_revenue_analysis(self, top_n: int = 10, bucket: str = "month", months_back: int = REPORT_MONTHS_BACK) -> Dict[str, Any]:
+        """Revenue at product prices from the memory-mapped line items: top-N and time buckets"""
+        logger.info("Running product revenue analysis...")
+        if self.line_items is None:
+            return {'error': 'Line-item arrays belum dibangun (python line_items.py build)'}
+
+        start_date, end_date = growth_period(months_back)
+        prices = self.product_prices
+        return {
+            'top_products': to_records(self.line_items.top_n('product', top_n, prices=prices)),
+            'top_franchises': to_records(self.line_items.top_n('franchise', top_n, prices=prices)),
+            'top_employees': to_records(self.line_items.top_n('employee', top_n, prices=prices)),
+            'revenue_by_period': to_records(self.line_items.time_buckets(bucket, prices=prices, start_date=start_date, end_date=end_date)),
+            'watermark': self.line_items.watermark
+        }
+
+    # ========== Shared Scan ==========
+    def shared_scan_pipelines(self, include_mongodb_only: bool = False) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        """
+        Raw-collection pipelines of the report, per analysis and part.
+        Analyses answered from rollups, basket_counts or sketches are left out,
+        and everything is when the columnar cache is the backend.
+        """
+        scans = {}
+        if self.columnar is not None:
+            return scans
+        if not self.rollups_enabled():
+            scans['employee_performance'] = {'results': self.employee_performance_pipeline(REPORT_START_DATE, REPORT_END_DATE)}
+            scans['regional_products'] = {'results': self.regional_product_pipeline()}
+            scans['franchise_growth'] = {'results': self.franchise_growth_pipeline(*growth_period(REPORT_MONTHS_BACK))}
+            if include_mongodb_only:
+                scans['mongodb_analysis'] = self.mongodb_only_pipelines()
+        if not counts_available(self.mongo_db, self.transactions_collection.name):
+            scans['cross_selling'] = basket_counts_branches()
+        if not self.approximate_segmentation:
+            scans['customer_segmentation'] = {'results': self.customer_segmentation_pipeline()}
+        return scans
+
+    def shared_scan(self, include_mongodb_only: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Read transactions_collection once for every analysis of the report
+        and return the keyword arguments that hand each analysis its results.
+        """
+        scans = self.shared_scan_pipelines(include_mongodb_only)
+        flat = {
+            f"{key}/{part}": pipeline
+            for key, parts in scans.items()
+            for part, pipeline in parts.items()
+        }
+        results = self._aggregate_many(flat)
+        prefetched = {}
+        for key, parts in scans.items():
+            part_results = {part: results[f"{key}/{part}"] for part in parts}
+            if key == 'cross_selling':
+                prefetched[key] = {'counts': merge_count_branches(part_results)}
+            elif key == 'mongodb_analysis':
+                prefetched[key] = {'mongo_results': part_results}
+            else:
+                prefetched[key] = {'mongo_results': part_results['results']}
+        return prefetched
+
+    # ========== Main Analysis Runner ==========
+    def analysis_plan(self, include_mongodb_only: bool = False, prefetched: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """
+        Analyses of the comprehensive report with the reference data each one
+        needs. `prefetched` (filled by shared_scan, read when an analysis
+        starts) supplies MongoDB results so the analysis skips its own scan.
+        """
+        prefetched = prefetched if prefetched is not None else {}
+        plan = [
+            {'key': 'employee_performance', 'label': 'Employee performance analysis', 'references': ['employees'],
+             'run': lambda: self.employee_performance_analysis(REPORT_START_DATE, REPORT_END_DATE, **prefetched.get('employee_performance', {}))},
+            {'key': 'regional_products', 'label': 'Regional product analysis', 'references': ['products'],
+             'run': lambda: self.regional_product_analysis(**prefetched.get('regional_products', {}))},
+            {'key': 'franchise_growth', 'label': 'Franchise growth analysis', 'references': ['franchises'],
+             'run': lambda: self.franchise_growth_analysis(REPORT_MONTHS_BACK, **prefetched.get('franchise_growth', {}))},
+            {'key': 'cross_selling', 'label': 'Cross-selling analysis', 'references': ['products'],
+             'run': lambda: self.cross_selling_analysis(**prefetched.get('cross_selling', {}))},
+            {'key': 'customer_segmentation', 'label': 'Customer segmentation', 'references': [],
+             'run': lambda: self.customer_segmentation_analysis(**prefetched.get('customer_segmentation', {}))}
+        ]
+        if self.line_items is not None:
+            plan.append({'key': 'product_revenue', 'label': 'Product revenue analysis', 'references': [],
+                         'run': lambda: self.product_revenue_analysis()})
+        if include_mongodb_only:
+            plan.append({'key': 'mongodb_analysis', 'label': 'MongoDB analysis', 'references': [],
+                         'run': lambda: self.mongodb_only_analysis(**prefetched.get('mongodb_analysis', {}))})
+        return plan
+
+    def run_comprehensive_analysis(self, max_workers: int = DEFAULT_ANALYSIS_WORKERS, include_mongodb_only: bool = False, shared_scan: bool = True) -> Dict[str, Any]:
+        """
+        Run the independent analyses concurrently on at most `max_workers`
+        threads. Reference data is refreshed once up front (in parallel) and
+        shared; each analysis records its own timing in last_run_timings.
+        With `shared_scan` the MongoDB side of every analysis comes from one
+        $facet pass over the collection, run while Neo4j data loads.
+        """
+        logger.info("Starting comprehensive analysis...")
+        
+        prefetched = {}
+        plan = self.analysis_plan(include_mongodb_only, prefetched)
+        results = {}
+        timings = {}
+        scan_seconds = None
+        started = time.perf_counter()
+        
+        def run_analysis(item):
+            analysis_started = time.perf_counter()
+            try:
+                result = item['run']()
+                status = 'ok'
+            except Exception as e:
+                logger.error(f"{item['label']} failed: {e}")
+                result = {'error': str(e)}
+                status = 'error'
+            return item, result, {
+                'status': status,
+                'started_at_seconds': analysis_started - started,
+                'seconds': time.perf_counter() - analysis_started
+            }
+        
+        try:
+            self.clear_reference_data()
+            needed = sorted({name for item in plan for name in item['references']})
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                # Referensi diminta lebih dulu; analisis yang membutuhkannya menunggu hasil yang sama
+                for name in needed:
+                    executor.submit(self.reference_data, name)
+                if shared_scan:
+                    scan_started = time.perf_counter()
+                    try:
+                        prefetched.update(self.shared_scan(include_mongodb_only))
+                    except Exception as e:
+                        # Mis. hasil $facet melebihi 16MB: setiap analisis scan sendiri
+                        logger.warning(f"Shared scan failed, analyses will scan separately: {e}")
+                    scan_seconds = time.perf_counter() - scan_started
+                futures = [executor.submit(run_analysis, item) for item in plan]
+                for future in as_completed(futures):
+                    item, result, timing = future.result()
+                    results[item['key']] = result
+                    timings[item['key']] = timing
+                    if timing['status'] == 'ok':
+                        logger.info(f"✓ {item['label']} completed in {timing['seconds']:.2f}s")
+            
+            # Urutan hasil tetap sama dengan urutan rencana
+            results = {item['key']: results[item['key']] for item in plan}
+        except Exception as e:
+            logger.error(f"Critical error during analysis: {str(e)}")
+            results = {'error': 'Analysis failed', 'details': str(e)}
+        
+        wall_seconds = time.perf_counter() - started
+        self.last_run_timings = {
+            'analyses': timings,
+            'references': dict(self.reference_timings),
+            'shared_scan_seconds': scan_seconds,
+            'wall_seconds': wall_seconds,
+            'sequential_seconds': sum(t['seconds'] for t in timings.values()),
+            'max_workers': max_workers
+        }
+        logger.info(
+            f"Comprehensive analysis completed in {wall_seconds:.2f}s "
+            f"(sum of analyses {self.last_run_timings['sequential_seconds']:.2f}s)"
+        )
+        return results
+
+    # ========== Data Validation ==========
+    def validate_data_structure(self) -> Dict[str, Any]:
+        logger.info("Validating data structure...")
+        
+        validation_results = {
+            'mongodb': {},
+            'neo4j': {},
+            'recommendations': []
+        }
+        
+        # MongoDB validation
+        try:
+            sample_transaction = self.transactions_collection.find_one()
+            if sample_transaction:
+                validation_results['mongodb'] = {
+                    'sample_structure': {
+                        'fields': list(sample_transaction.keys()),
+                        'has_product_info': 'product' in sample_transaction,
+                        'product_is_array': isinstance(sample_transaction.get('product'), list),
+                        'has_employee_info': 'id_employee' in sample_transaction,
+                        'has_franchise_info': 'id_franchise' in sample_transaction
+                    },
+                    'total_documents': self.transactions_collection.count_documents({}),
+                    'sample_product_structure': sample_transaction.get('product', [])[:2] if sample_transaction.get('product') else []
+                }
+            else:
+                validation_results['mongodb']['error'] = 'No documents found'
+        except Exception as e:
+            validation_results['mongodb']['error'] = str(e)
+        
+        # Neo4j validation
+        try:
+            with self.neo4j_driver.session() as session:
+                node_counts = {}
+                for label in ['Employee', 'Product', 'Franchise']:
+                    try:
+                        result = session.run(f"MATCH (n:{label}) RETURN count(n) as count")
+                        node_counts[label] = result.single()['count']
+                    except Exception as e:
+                        node_counts[label] = f"Error: {e}"
+                
+                validation_results['neo4j']['node_counts'] = node_counts
+                
+        except Exception as e:
+            validation_results['neo4j']['error'] = str(e)
+        
+        return validation_results
+
+def main():
+    # Setup logging
+    logging.basicConfig(level=logging.INFO)
+
+    # Database connection parameters
+    MONGO_URI = "mongodb://localhost:27017/"
+    URI = os.getenv("NEO4J_URI")
+    USERNAME = os.getenv("NEO4J_USERNAME")
+    PASSWORD = os.getenv("NEO4J_PASSWORD")
+    
+    # Initialize aggregator
+    aggregator = MongoNeo4jAggregator(
+        mongo_uri=MONGO_URI,
+        neo4j_uri=URI,
+        neo4j_user=USERNAME,
+        neo4j_password=PASSWORD
+    )
+    
+    try:
+        # Validate data structure first
+        print("=== DATA VALIDATION ===")
+        validation = aggregator.validate_data_structure()
+        print(json.dumps(validation, indent=2, default=str))
+        
+        # Run comprehensive analysis
+        print("\n=== RUNNING COMPREHENSIVE ANALYSIS ===")
+        results = aggregator.run_comprehensive_analysis()
+        
+        # # Save results to JSON file
+        # output_file = f'fixed_analysis_results_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+        # with open(output_file, 'w') as f:
+        #     json.dump(results, f, indent=2, default=str)
+        
+        # print(f"\nResults saved to: {output_file}")
+        
+        # Print summary
+        print("\n=== ANALYSIS SUMMARY ===")
+        
+        for analysis_type, data in results.items():
+            if 'error' not in data:
+                print(f"✓ {analysis_type.replace('_', ' ').title()}: Success")
+                
+                # Print specific metrics for each analysis
+                if analysis_type == 'employee_performance':
+                    emp_count = len(data.get('employee_performance', []))
+                    print(f"  - {emp_count} employees analyzed")
+                    if emp_count > 0:
+                        top_performer = data['employee_performance'][0]
+                        print(f"  - Top performer: {top_performer['employee_name']} (Rp{top_performer['revenue_per_hour']:,.2f}/day)")
+                
+                elif analysis_type == 'regional_products':
+                    franchise_count = len(data.get('franchise_analysis', []))
+                    print(f"  - {franchise_count} franchises analyzed")
+                
+                elif analysis_type == 'product_revenue':
+                    for product in data.get('top_products', [])[:3]:
+                        print(f"  - {product['product_name']}: Rp{product['total_revenue']:,.0f}")
+                
+                elif analysis_type == 'customer_segmentation':
+                    total_customers = data.get('total_customers', 0)
+                    print(f"  - {total_customers} customers segmented")
+                    for segment in data.get('customer_segments', []):
+                        print(f"    • {segment['_id']}: {segment['customer_count']} customers")
+                
+                # elif analysis_type == 'mongodb_analysis':
+                #     total_trans = data['summary'].get('total_transactions', 0)
+                #     print(f"  - {total_trans:,} total transactions processed")
+                
+            else:
+                print(f"✗ {analysis_type.replace('_', ' ').title()}: {data['error']}")
+        
+        # print(f"\n=== DETAILED RESULTS SAVED TO: {output_file} ===")
+        
+        timings = aggregator.last_run_timings
+        print("\n=== TIMINGS ===")
+        for analysis_type, timing in timings.get('analyses', {}).items():
+            print(f"  {analysis_type:<24} {timing['seconds']:>8.2f}s (mulai +{timing['started_at_seconds']:.2f}s)")
+        for name, seconds in timings.get('references', {}).items():
+            print(f"  neo4j:{name:<18} {seconds:>8.2f}s")
+        if timings.get('shared_scan_seconds') is not None:
+            print(f"  {'mongodb shared scan':<24} {timings['shared_scan_seconds']:>8.2f}s")
+        print(f"  wall {timings.get('wall_seconds', 0):.2f}s vs sequential {timings.get('sequential_seconds', 0):.2f}s")
+        
+    except Exception as e:
+        logger.error(f"Main execution failed: {str(e)}")
+        print(f"Analysis failed with error: {e}")
+    
+    finally:
+        # Close connections
+        aggregator.close_connections()
+        print("Database connections closed.")
+
+if __name__ == "__main__":
+    main()
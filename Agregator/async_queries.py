@@ -0,0 +1,411 @@
+"""
+Data-access asyncio untuk MongoDB dan Neo4j: query berjalan di event loop
+latar belakang sehingga halaman dashboard tidak terblokir, dan setiap query
+bisa dibatalkan, diberi timeout, dan dipantau progresnya.
+
+  - MongoDB: PyMongo async (AsyncMongoClient, PyMongo >= 4.9) atau Motor.
+    Timeout lewat maxTimeMS; setiap query diberi `comment` berisi id job
+    sehingga pembatalan juga menghentikan operasi di server (killOp).
+  - Neo4j: AsyncGraphDatabase dengan transaction timeout (neo4j.Query).
+    Pembatalan menutup session sehingga transaksi di server ikut dihentikan.
+
+Satu AsyncQueryRunner per proses memegang event loop di thread daemon.
+Script Streamlit mengirim query (submit_mongo / submit_neo4j) lalu membaca
+status job pada rerun berikutnya; client async dibuat di dalam loop itu.
+
+    python async_queries.py mongo '[{"$group": {"_id": "$id_franchise", "n": {"$sum": 1}}}]' --timeout-ms 5000
+    python async_queries.py neo4j "MATCH (f:Franchise) RETURN f.id_cafe AS id LIMIT 5"
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo.errors import ExecutionTimeout
+
+from connection import MONGO_DB, MONGO_URI, NEO4J_DATABASE, NEO4J_PASSWORD, NEO4J_URI, NEO4J_USERNAME
+from queries import record_to_dict, resolve_collection
+
+try:
+    from pymongo import AsyncMongoClient
+except ImportError:
+    AsyncMongoClient = None
+
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient
+except ImportError:
+    AsyncIOMotorClient = None
+
+try:
+    from neo4j import AsyncGraphDatabase, Query
+except ImportError:
+    AsyncGraphDatabase = None
+    Query = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MONGO_TIMEOUT_MS = 60_000
+DEFAULT_NEO4J_TIMEOUT_SECONDS = 60.0
+DEFAULT_ASYNC_BATCH_SIZE = 1000
+# Jeda tambahan di sisi client di atas timeout server sebelum job dianggap timeout
+CLIENT_TIMEOUT_GRACE_SECONDS = 5.0
+MAX_FINISHED_JOBS = 50
+
+JOB_STATUSES = ["pending", "running", "done", "failed", "cancelled", "timeout"]
+FINISHED_STATUSES = {"done", "failed", "cancelled", "timeout"}
+
+
+class QueryJob:
+    """State of one submitted query, updated from the event loop thread"""
+
+    def __init__(self, label: str, backend: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.backend = backend
+        self.status = "pending"
+        self.rows = 0
+        self.result: Optional[List[Dict[str, Any]]] = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.future = None
+
+    @property
+    def finished(self) -> bool:
+        self.settle()
+        return self.status in FINISHED_STATUSES
+
+    def settle(self):
+        """Give a final status to a job whose future ended without one (cancelled before start, setup error)"""
+        if self.status in FINISHED_STATUSES or self.future is None or not self.future.done():
+            return
+        self.finished_at = self.finished_at or time.time()
+        if self.future.cancelled():
+            self.status = "cancelled"
+            return
+        error = self.future.exception()
+        self.status = "failed"
+        self.error = str(error) if error is not None else "Job berhenti tanpa status akhir"
+
+    @property
+    def seconds(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def progress(self, rows: int):
+        self.rows = rows
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'label': self.label,
+            'backend': self.backend,
+            'status': self.status,
+            'rows': self.rows,
+            'seconds': self.seconds,
+            'error': self.error
+        }
+
+
+# ========== Queries ==========
+async def run_mongo_async(
+    collection,
+    query_type: str = "find",
+    query=None,
+    projection=None,
+    timeout_ms: Optional[int] = DEFAULT_MONGO_TIMEOUT_MS,
+    batch_size: int = DEFAULT_ASYNC_BATCH_SIZE,
+    on_progress: Optional[Callable[[int], Any]] = None,
+    comment: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Run a find/aggregate on an async collection (PyMongo async or Motor)"""
+    options = {"batch_size": batch_size}
+    if timeout_ms:
+        options["max_time_ms" if query_type == "find" else "maxTimeMS"] = int(timeout_ms)
+    if comment:
+        options["comment"] = comment
+
+    if query_type == "find":
+        cursor = collection.find(query or {}, projection, **options)
+    elif query_type == "aggregate":
+        if not isinstance(query, list):
+            raise ValueError("Aggregation query harus dalam bentuk list pipeline.")
+        options["batchSize"] = options.pop("batch_size")
+        cursor = collection.aggregate(query, **options)
+        # PyMongo async mengembalikan coroutine, Motor langsung cursor
+        if inspect.isawaitable(cursor):
+            cursor = await cursor
+    else:
+        raise ValueError("query_type harus 'find' atau 'aggregate'")
+
+    documents = []
+    try:
+        async for document in cursor:
+            documents.append(document)
+            if on_progress is not None and len(documents) % batch_size == 0:
+                on_progress(len(documents))
+    finally:
+        closed = cursor.close()
+        if inspect.isawaitable(closed):
+            await closed
+    if on_progress is not None:
+        on_progress(len(documents))
+    return documents
+
+
+async def kill_mongo_operations(client, comment: str) -> int:
+    """killOp every in-progress operation tagged with `comment` (needs the killop privilege)"""
+    admin = client.admin
+    operations = await admin.command({"currentOp": True, "command.comment": comment})
+    killed = 0
+    for operation in operations.get("inprog", []):
+        await admin.command({"killOp": 1, "op": operation["opid"]})
+        killed += 1
+    return killed
+
+
+async def run_neo4j_async(
+    driver,
+    query: str,
+    parameters: Optional[Dict[str, Any]] = None,
+    database: str = NEO4J_DATABASE,
+    timeout_seconds: Optional[float] = DEFAULT_NEO4J_TIMEOUT_SECONDS,
+    on_progress: Optional[Callable[[int], Any]] = None,
+    progress_every: int = DEFAULT_ASYNC_BATCH_SIZE) -> List[Dict[str, Any]]:
+    """Run a Cypher query on an async driver with a server-side transaction timeout"""
+    statement = Query(query, timeout=timeout_seconds) if timeout_seconds else query
+    records = []
+    async with driver.session(database=database) as session:
+        result = await session.run(statement, parameters or {})
+        async for record in result:
+            records.append(record_to_dict(record))
+            if on_progress is not None and len(records) % progress_every == 0:
+                on_progress(len(records))
+    if on_progress is not None:
+        on_progress(len(records))
+    return records
+
+
+def _is_timeout(error: Exception) -> bool:
+    if isinstance(error, (ExecutionTimeout, asyncio.TimeoutError)):
+        return True
+    # Neo.ClientError.Transaction.TransactionTimedOut(ClientConfiguration)
+    return "TimedOut" in str(getattr(error, "code", "") or "")
+
+
+# ========== Runner ==========
+class AsyncQueryRunner:
+    """
+    Background asyncio event loop for dashboard queries. Async clients are
+    created inside the loop, one per URI (and credentials for Neo4j).
+    """
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="async-queries", daemon=True)
+        self._thread.start()
+        self._jobs: Dict[str, QueryJob] = {}
+        self._jobs_lock = threading.Lock()
+        self._mongo_clients: Dict[str, Any] = {}
+        self._neo4j_drivers: Dict[Any, Any] = {}
+
+    # ========== Clients ==========
+    def _mongo_client(self, uri: str):
+        client = self._mongo_clients.get(uri)
+        if client is None:
+            if AsyncMongoClient is not None:
+                client = AsyncMongoClient(uri)
+            elif AsyncIOMotorClient is not None:
+                client = AsyncIOMotorClient(uri)
+            else:
+                raise ImportError("Query async MongoDB membutuhkan PyMongo >= 4.9 atau paket 'motor'")
+            self._mongo_clients[uri] = client
+        return client
+
+    def _neo4j_driver(self, uri: str, username: str, password: str):
+        if AsyncGraphDatabase is None:
+            raise ImportError("Query async Neo4j membutuhkan driver neo4j >= 5")
+        key = (uri, username, password)
+        driver = self._neo4j_drivers.get(key)
+        if driver is None:
+            driver = AsyncGraphDatabase.driver(uri, auth=(username, password))
+            self._neo4j_drivers[key] = driver
+        return driver
+
+    # ========== Jobs ==========
+    def _register(self, job: QueryJob):
+        with self._jobs_lock:
+            self._jobs[job.id] = job
+            finished = [other for other in self._jobs.values() if other.finished]
+            for other in sorted(finished, key=lambda item: item.submitted_at)[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+                del self._jobs[other.id]
+
+    async def _run(self, job: QueryJob, prepare: Callable[[], Any]):
+        """
+        Run the query built by `prepare` -> (coroutine, client_timeout, on_cancel).
+        Client creation happens inside the try, so setup errors fail the job.
+        """
+        job.status = "running"
+        job.started_at = time.time()
+        on_cancel = None
+        try:
+            coroutine, client_timeout, on_cancel = prepare()
+            job.result = await asyncio.wait_for(coroutine, client_timeout) if client_timeout else await coroutine
+            job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            if on_cancel is not None:
+                try:
+                    await on_cancel()
+                except Exception as e:
+                    logger.warning(f"Gagal menghentikan query {job.id} di server: {e}")
+        except Exception as e:
+            job.status = "timeout" if _is_timeout(e) else "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            if job.status not in ("done", "cancelled"):
+                logger.warning(f"Query async {job.label} ({job.id}) {job.status}: {job.error}")
+        return job.result
+
+    def _submit(self, job: QueryJob, prepare: Callable[[], Any]) -> QueryJob:
+        self._register(job)
+        job.future = asyncio.run_coroutine_threadsafe(self._run(job, prepare), self._loop)
+        # Job yang dibatalkan sebelum task mulai tidak pernah masuk _run
+        job.future.add_done_callback(lambda _: job.settle())
+        return job
+
+    def submit_mongo(
+        self,
+        uri: str = MONGO_URI,
+        db_name: str = MONGO_DB,
+        collection_name: str = "transactionlog",
+        query_type: str = "find",
+        query=None,
+        projection=None,
+        use_index: bool = True,
+        timeout_ms: Optional[int] = DEFAULT_MONGO_TIMEOUT_MS,
+        batch_size: int = DEFAULT_ASYNC_BATCH_SIZE,
+        label: Optional[str] = None) -> QueryJob:
+        """Start a MongoDB query in the background and return its job"""
+        job = QueryJob(label or f"MongoDB {query_type}", "mongodb")
+
+        def prepare():
+            client = self._mongo_client(uri)
+            collection, _ = resolve_collection(client[db_name], collection_name, use_index)
+            coroutine = run_mongo_async(collection, query_type, query, projection, timeout_ms, batch_size, job.progress, comment=job.id)
+            client_timeout = timeout_ms / 1000 + CLIENT_TIMEOUT_GRACE_SECONDS if timeout_ms else None
+            return coroutine, client_timeout, lambda: kill_mongo_operations(client, job.id)
+
+        return self._submit(job, prepare)
+
+    def submit_neo4j(
+        self,
+        query: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        uri: str = NEO4J_URI,
+        username: str = NEO4J_USERNAME,
+        password: str = NEO4J_PASSWORD,
+        database: str = NEO4J_DATABASE,
+        timeout_seconds: Optional[float] = DEFAULT_NEO4J_TIMEOUT_SECONDS,
+        label: Optional[str] = None) -> QueryJob:
+        """Start a Cypher query in the background and return its job"""
+        job = QueryJob(label or "Neo4j Cypher", "neo4j")
+
+        def prepare():
+            driver = self._neo4j_driver(uri, username, password)
+            coroutine = run_neo4j_async(driver, query, parameters, database, timeout_seconds, job.progress)
+            client_timeout = timeout_seconds + CLIENT_TIMEOUT_GRACE_SECONDS if timeout_seconds else None
+            return coroutine, client_timeout, None
+
+        return self._submit(job, prepare)
+
+    def job(self, job_id: Optional[str]) -> Optional[QueryJob]:
+        with self._jobs_lock:
+            return self._jobs.get(job_id) if job_id else None
+
+    def jobs(self) -> List[QueryJob]:
+        with self._jobs_lock:
+            return sorted(self._jobs.values(), key=lambda item: item.submitted_at, reverse=True)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a pending/running job; the query is stopped on the server too"""
+        job = self.job(job_id)
+        if job is None or job.finished or job.future is None:
+            return False
+        # Future.cancel dari thread lain diteruskan ke task di event loop
+        return job.future.cancel()
+
+    def wait(self, job: QueryJob, timeout: Optional[float] = None) -> QueryJob:
+        """Block until the job finishes (for scripts; the dashboard polls instead)"""
+        try:
+            job.future.result(timeout)
+        except (CancelledError, Exception):
+            pass
+        return job
+
+    def close(self):
+        async def shutdown():
+            for client in self._mongo_clients.values():
+                closed = client.close()
+                if inspect.isawaitable(closed):
+                    await closed
+            for driver in self._neo4j_drivers.values():
+                await driver.close()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+_runner: Optional[AsyncQueryRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_async_runner() -> AsyncQueryRunner:
+    """Return the process-wide AsyncQueryRunner"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = AsyncQueryRunner()
+        return _runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query async MongoDB/Neo4j dengan timeout dan progres")
+    parser.add_argument("backend", choices=["mongo", "neo4j"])
+    parser.add_argument("query", help="Filter/pipeline JSON untuk MongoDB atau Cypher untuk Neo4j")
+    parser.add_argument("--query-type", choices=["find", "aggregate"], default=None)
+    parser.add_argument("--collection", default="transactionlog")
+    parser.add_argument("--timeout-ms", type=int, default=DEFAULT_MONGO_TIMEOUT_MS)
+    parser.add_argument("--timeout-seconds", type=float, default=DEFAULT_NEO4J_TIMEOUT_SECONDS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    runner = get_async_runner()
+    if args.backend == "mongo":
+        query = json.loads(args.query)
+        query_type = args.query_type or ("aggregate" if isinstance(query, list) else "find")
+        job = runner.submit_mongo(collection_name=args.collection, query_type=query_type, query=query, timeout_ms=args.timeout_ms)
+    else:
+        job = runner.submit_neo4j(args.query, timeout_seconds=args.timeout_seconds)
+
+    try:
+        while not job.future.done():
+            print(f"\r{job.status}: {job.rows:,} baris, {job.seconds:.1f}s", end="", flush=True)
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        runner.cancel(job.id)
+        runner.wait(job, 10)
+    print(f"\r{job.status}: {job.rows:,} baris, {job.seconds:.2f}s" + (f" - {job.error}" if job.error else ""))
+    runner.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,449 @@
+"""
+Benchmark harness untuk skenario dengan/tanpa index di MongoDB dan Neo4j.
+
+Bisa dipakai dari dashboard (`run_benchmark`) atau headless:
+
+    python benchmark.py --repetitions 30 --warmup 3 --mode warm \
+        --json hasil_benchmark.json --csv hasil_benchmark.csv
+"""
+import argparse
+import csv
+import json
+import logging
+import math
+import random
+import statistics
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from connection import MONGO_DB, NEO4J_DATABASE, get_mongo_db, get_neo4j_driver
+from neo4j_schema import DEFAULT_OPTIMIZED_STATE, apply_schema, detect_schema_state
+from queries import execute_mongo_query, execute_neo4j_query, resolve_collection
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_MODES = ["warm", "cold"]
+# Nama skenario dari default_scenarios
+BENCHMARK_SCENARIOS = [
+    "mongo_without_index", "mongo_with_index",
+    "mongo_filter_without_index", "mongo_filter_with_index",
+    "neo4j_non_optimized", "neo4j_optimized"
+]
+PERCENTILES = [50, 95, 99]
+
+# Query sampel yang sama dengan blok "Perbandingan Performa" di dashboard
+SAMPLE_MONGO_PIPELINE = [
+    {
+        '$unwind': '$product'
+    }, {
+        '$group': {
+            '_id': '$id_franchise',
+            'total_sales': {
+                '$sum': '$product.quantity'
+            },
+            'transaction_ids': {
+                '$addToSet': '$id_transaction'
+            }
+        }
+    }, {
+        '$project': {
+            'total_sales': 1,
+            'transaction_count': {
+                '$size': '$transaction_ids'
+            },
+            'avg_sales': {
+                '$divide': [
+                    '$total_sales', {
+                        '$size': '$transaction_ids'
+                    }
+                ]
+            }
+        }
+    }, {
+        '$sort': {
+            '_id': 1
+        }
+    }
+]
+
+# Filter selektif yang bisa dilayani index: sama dengan salah satu
+# index_advisor.BASELINE_QUERIES, sehingga transactionlogindex punya index
+# compound (id_franchise, transaction_date) untuknya. Pipeline di atas
+# selalu full scan di kedua collection.
+SAMPLE_MONGO_FILTER = {"id_franchise": 1, "transaction_date": {"$gte": "2024-01-01", "$lte": "2024-01-31"}}
+
+# Tanpa optimasi: scan semua Franchise lalu expand relasi
+SAMPLE_NEO4J_QUERY = """
+MATCH (f:Franchise)-[:IS_LOCATED]->(d:Daerah)
+RETURN f.id_cafe as id_cafe, f.name, f.year, d.kota, d.kecamatan, d.nama_daerah
+"""
+
+# Dengan optimasi: lookup Franchise berdasarkan key yang diparameterisasi
+SAMPLE_NEO4J_QUERY_OPTIMIZED = """
+MATCH (f:Franchise)
+WHERE f.id_cafe IN $cafe_ids
+MATCH (f)-[:IS_LOCATED]->(d:Daerah)
+RETURN f.id_cafe as id_cafe, f.name, f.year, d.kota, d.kecamatan, d.nama_daerah
+"""
+
+
+class Scenario:
+    """
+    One benchmark scenario.
+
+    `run` executes the workload once and returns the number of rows produced.
+    It should call the query primitives directly so the dashboard result
+    cache is always bypassed.
+    `reset` (optional) is called before every measured run in cold mode to
+    drop whatever caches the backend lets a client drop.
+    `setup` (optional) puts the server in the state the scenario needs (e.g.
+    a Neo4j schema state); it runs untimed, once, before the scenarios that
+    share it are warmed up and measured.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[], int],
+        reset: Optional[Callable[[], None]] = None,
+        backend: str = "",
+        description: str = "",
+        setup: Optional[Callable[[], None]] = None):
+        self.name = name
+        self.run = run
+        self.reset = reset
+        self.backend = backend
+        self.description = description
+        self.setup = setup
+
+
+# ========== Statistics ==========
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Percentile with linear interpolation between closest ranks"""
+    if not sorted_values:
+        return float('nan')
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    position = (len(sorted_values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    if lower == upper:
+        return sorted_values[lower]
+    weight = position - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+
+
+def bootstrap_ci(
+    values: List[float],
+    q: float,
+    confidence: float = 0.95,
+    resamples: int = 1000,
+    seed: int = 0) -> List[float]:
+    """Percentile-bootstrap confidence interval for the q-th percentile"""
+    if len(values) < 2:
+        return [float('nan'), float('nan')]
+    rng = random.Random(seed)
+    estimates = sorted(
+        percentile(sorted(rng.choices(values, k=len(values))), q)
+        for _ in range(resamples)
+    )
+    alpha = (1 - confidence) / 2
+    return [percentile(estimates, alpha * 100), percentile(estimates, (1 - alpha) * 100)]
+
+
+def summarize(samples_ns: List[int], confidence: float = 0.95, seed: int = 0) -> Dict[str, Any]:
+    """Summarize latency samples (nanoseconds) into milliseconds"""
+    values = [ns / 1e6 for ns in samples_ns]
+    ordered = sorted(values)
+    summary = {
+        'n': len(values),
+        'mean_ms': statistics.fmean(values) if values else float('nan'),
+        'stdev_ms': statistics.stdev(values) if len(values) > 1 else 0.0,
+        'min_ms': ordered[0] if ordered else float('nan'),
+        'max_ms': ordered[-1] if ordered else float('nan'),
+        'confidence': confidence
+    }
+    for q in PERCENTILES:
+        summary[f'p{q}_ms'] = percentile(ordered, q)
+        summary[f'p{q}_ci_ms'] = bootstrap_ci(values, q, confidence, seed=seed)
+    return summary
+
+
+# ========== Runner ==========
+class BenchmarkResult:
+    def __init__(self, config: Dict[str, Any], samples: List[Dict[str, Any]], summary: Dict[str, Dict[str, Any]]):
+        self.config = config
+        self.samples = samples
+        self.summary = summary
+
+    def summary_rows(self) -> List[Dict[str, Any]]:
+        """Flat summary rows (one per scenario), handy for DataFrames and CSV"""
+        rows = []
+        for name, stats in self.summary.items():
+            row = {'scenario': name}
+            for key, value in stats.items():
+                if isinstance(value, list):
+                    row[f'{key}_low'], row[f'{key}_high'] = value
+                else:
+                    row[key] = value
+            rows.append(row)
+        return rows
+
+    def to_json(self, path: Optional[str] = None) -> str:
+        payload = json.dumps({
+            'config': self.config,
+            'summary': self.summary,
+            'samples': self.samples
+        }, indent=2, default=str)
+        if path:
+            with open(path, 'w') as f:
+                f.write(payload)
+        return payload
+
+    def to_csv(self, path: str, summary_only: bool = False):
+        rows = self.summary_rows() if summary_only else self.samples
+        if not rows:
+            return
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+def run_benchmark(
+    scenarios: List[Scenario],
+    repetitions: int = 20,
+    warmup: int = 3,
+    mode: str = "warm",
+    seed: int = 42,
+    confidence: float = 0.95,
+    progress: Optional[Callable[[int, int], None]] = None) -> BenchmarkResult:
+    """
+    Run every scenario `repetitions` times, interleaved.
+
+    Scenarios are grouped by their `setup` (server state). Each group's setup
+    is applied once, then the group is warmed up and measured before the
+    next state is applied, so a measured run never pays for a schema change.
+    Within a group each round runs all scenarios once in a freshly shuffled
+    order so that no scenario systematically benefits from running after
+    another. In warm mode every scenario first gets `warmup` unmeasured runs;
+    in cold mode there is no warm-up and each measured run is preceded by the
+    scenario's `reset` hook.
+    """
+    if mode not in BENCHMARK_MODES:
+        raise ValueError(f"mode harus salah satu dari {BENCHMARK_MODES}")
+
+    rng = random.Random(seed)
+    total_steps = repetitions * len(scenarios)
+    step = 0
+
+    # Urutan grup mengikuti kemunculan pertama setup-nya
+    groups: List[List[Scenario]] = []
+    for scenario in scenarios:
+        group = next((group for group in groups if group[0].setup is scenario.setup), None)
+        if group is None:
+            groups.append([scenario])
+        else:
+            group.append(scenario)
+
+    samples = []
+    timings: Dict[str, List[int]] = {scenario.name: [] for scenario in scenarios}
+
+    for group_index, group in enumerate(groups):
+        if group[0].setup is not None:
+            group[0].setup()
+
+        if mode == "warm":
+            for _ in range(warmup):
+                for scenario in rng.sample(group, len(group)):
+                    scenario.run()
+
+        for round_index in range(repetitions):
+            order = rng.sample(group, len(group))
+            for position, scenario in enumerate(order):
+                if mode == "cold" and scenario.reset is not None:
+                    scenario.reset()
+
+                start = time.perf_counter_ns()
+                rows = scenario.run()
+                elapsed = time.perf_counter_ns() - start
+
+                timings[scenario.name].append(elapsed)
+                samples.append({
+                    'scenario': scenario.name,
+                    'backend': scenario.backend,
+                    'mode': mode,
+                    'group': group_index,
+                    'round': round_index,
+                    'position': position,
+                    'elapsed_ns': elapsed,
+                    'rows': rows
+                })
+
+                step += 1
+                if progress:
+                    progress(step, total_steps)
+
+    summary = {
+        name: summarize(values, confidence, seed)
+        for name, values in timings.items()
+    }
+    config = {
+        'started_at': datetime.now().isoformat(),
+        'repetitions': repetitions,
+        'warmup': warmup if mode == "warm" else 0,
+        'mode': mode,
+        'seed': seed,
+        'confidence': confidence,
+        'scenarios': {s.name: {'backend': s.backend, 'description': s.description} for s in scenarios}
+    }
+    return BenchmarkResult(config, samples, summary)
+
+
+# ========== Default Scenarios ==========
+def mongo_scenario(name: str, db, collection_name: str, query, use_index: bool, query_type: str = "aggregate") -> Scenario:
+    collection, label = resolve_collection(db, collection_name, use_index)
+
+    def run():
+        return len(execute_mongo_query(collection, query_type, query))
+
+    def reset():
+        # Hanya plan cache yang bisa dibuang dari client; cache WiredTiger/OS
+        # baru benar-benar dingin setelah mongod direstart.
+        db.command("planCacheClear", collection.name)
+
+    return Scenario(name, run, reset, backend="mongodb", description=f"{query_type} {label} ({collection.name})")
+
+
+def neo4j_scenario(
+    name: str,
+    driver,
+    query: str,
+    parameters=None,
+    database: str = NEO4J_DATABASE,
+    description: str = "",
+    setup: Optional[Callable[[], None]] = None) -> Scenario:
+    def run():
+        return len(execute_neo4j_query(driver, query, parameters, database))
+
+    def reset():
+        execute_neo4j_query(driver, "CALL db.clearQueryCaches()", database=database)
+
+    return Scenario(name, run, reset, backend="neo4j", description=description, setup=setup)
+
+
+def neo4j_schema_setup(driver, state: str, database: str = NEO4J_DATABASE) -> Callable[[], None]:
+    def setup():
+        apply_schema(driver, state, database)
+    return setup
+
+
+def restorable_schema_state(driver, database: str = NEO4J_DATABASE) -> str:
+    """Current Neo4j schema state, to re-apply after a schema-toggling benchmark"""
+    state = detect_schema_state(driver, database)
+    if state == "custom":
+        raise ValueError("Schema Neo4j saat ini 'custom' sehingga tidak bisa dikembalikan; jalankan `python neo4j_schema.py apply <state>` dulu")
+    return state
+
+
+def default_scenarios(
+    db=None,
+    driver=None,
+    collection_name: str = "transactionlog",
+    cafe_ids=None,
+    toggle_neo4j_schema: bool = False) -> List[Scenario]:
+    """
+    Scenario 1 (tanpa optimasi) vs Scenario 2 (dengan optimasi) for both
+    backends. MongoDB is measured twice: the dashboard's aggregation (a full
+    scan either way) and a selective find an index can serve. With toggle_neo4j_schema both Neo4j scenarios run the same
+    parameterized key lookup and only the server schema differs (no lookup
+    indexes vs the constrained schema).
+    """
+    db = db if db is not None else get_mongo_db(MONGO_DB)
+    driver = driver if driver is not None else get_neo4j_driver()
+    cafe_ids = cafe_ids if cafe_ids is not None else list(range(1, 11))
+    plain_setup = neo4j_schema_setup(driver, "none") if toggle_neo4j_schema else None
+    indexed_setup = neo4j_schema_setup(driver, DEFAULT_OPTIMIZED_STATE) if toggle_neo4j_schema else None
+
+    if toggle_neo4j_schema:
+        # Query identik di kedua skenario sehingga selisihnya murni dari schema
+        plain_query, plain_parameters = SAMPLE_NEO4J_QUERY_OPTIMIZED, {"cafe_ids": cafe_ids}
+        plain_description = "parameterized key lookup + expand (schema: none)"
+    else:
+        plain_query, plain_parameters = SAMPLE_NEO4J_QUERY, None
+        plain_description = "label scan + expand"
+
+    return [
+        mongo_scenario("mongo_without_index", db, collection_name, SAMPLE_MONGO_PIPELINE, use_index=False),
+        mongo_scenario("mongo_with_index", db, collection_name, SAMPLE_MONGO_PIPELINE, use_index=True),
+        mongo_scenario("mongo_filter_without_index", db, collection_name, SAMPLE_MONGO_FILTER, use_index=False, query_type="find"),
+        mongo_scenario("mongo_filter_with_index", db, collection_name, SAMPLE_MONGO_FILTER, use_index=True, query_type="find"),
+        neo4j_scenario(
+            "neo4j_non_optimized", driver, plain_query, plain_parameters,
+            description=plain_description,
+            setup=plain_setup
+        ),
+        neo4j_scenario(
+            "neo4j_optimized", driver, SAMPLE_NEO4J_QUERY_OPTIMIZED, {"cafe_ids": cafe_ids},
+            description="parameterized key lookup + expand" + (f" (schema: {DEFAULT_OPTIMIZED_STATE})" if toggle_neo4j_schema else ""),
+            setup=indexed_setup
+        )
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark query MongoDB & Neo4j (dengan/tanpa optimasi)")
+    parser.add_argument("--repetitions", "-n", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--mode", choices=BENCHMARK_MODES, default="warm")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--scenarios", help="Daftar nama skenario dipisah koma (default: semua)")
+    parser.add_argument("--json", dest="json_path", help="Simpan hasil lengkap ke file JSON")
+    parser.add_argument("--csv", dest="csv_path", help="Simpan sampel mentah ke file CSV")
+    parser.add_argument("--toggle-neo4j-schema", action="store_true",
+                        help="Kedua skenario Neo4j menjalankan query yang sama; non-optimized tanpa index, optimized dengan constraint")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    scenarios = default_scenarios(toggle_neo4j_schema=args.toggle_neo4j_schema)
+    if args.scenarios:
+        wanted = {name.strip() for name in args.scenarios.split(",")}
+        scenarios = [s for s in scenarios if s.name in wanted]
+
+    original_state = restorable_schema_state(get_neo4j_driver()) if args.toggle_neo4j_schema else None
+    try:
+        result = run_benchmark(
+            scenarios,
+            repetitions=args.repetitions,
+            warmup=args.warmup,
+            mode=args.mode,
+            seed=args.seed,
+            confidence=args.confidence,
+            progress=lambda step, total: logger.info(f"Run {step}/{total}")
+        )
+    finally:
+        if original_state is not None:
+            # Kembalikan graph ke schema sebelum benchmark
+            apply_schema(get_neo4j_driver(), original_state)
+
+    print(f"\n=== BENCHMARK ({args.mode}, n={args.repetitions}) ===")
+    for row in result.summary_rows():
+        print(
+            f"{row['scenario']:<22} p50={row['p50_ms']:.2f}ms "
+            f"[{row['p50_ci_ms_low']:.2f}, {row['p50_ci_ms_high']:.2f}] "
+            f"p95={row['p95_ms']:.2f}ms p99={row['p99_ms']:.2f}ms"
+        )
+
+    if args.json_path:
+        result.to_json(args.json_path)
+        print(f"Hasil JSON disimpan ke: {args.json_path}")
+    if args.csv_path:
+        result.to_csv(args.csv_path)
+        print(f"Sampel CSV disimpan ke: {args.csv_path}")
+
+
+if __name__ == "__main__":
+    main()
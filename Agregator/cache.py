@@ -0,0 +1,200 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_DEFAULT_TTL = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "300"))
+
+# Collection kecil berisi versi data per (backend, collection); loader menaikkan
+# versinya setelah memuat data sehingga cache di proses lain ikut ter-invalidasi.
+DATA_VERSION_COLLECTION = "data_versions"
+
+
+def normalize_query(backend: str, query) -> str:
+    """
+    Canonical text for a query. Cypher whitespace is collapsed; MongoDB
+    queries are serialized as JSON with key order preserved, because key
+    order is significant in `$sort` and compound documents.
+    """
+    if backend == "neo4j" and isinstance(query, str):
+        return re.sub(r"\s+", " ", query).strip()
+    return json.dumps(query, default=str, separators=(",", ":"))
+
+
+def make_key(backend: str, collection: str, query, parameters=None) -> str:
+    payload = "|".join([
+        backend,
+        collection or "",
+        normalize_query(backend, query),
+        json.dumps(parameters or {}, sort_keys=True, default=str, separators=(",", ":"))
+    ])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def estimate_size(value) -> int:
+    """Approximate in-memory size of a cached result in bytes"""
+    if hasattr(value, "memory_usage"):
+        return int(value.memory_usage(deep=True).sum())
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+class ResultCache:
+    """
+    Thread-safe result cache keyed on (backend, collection, normalized query,
+    parameters) with per-entry TTL and an LRU byte budget.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES, default_ttl: float = CACHE_DEFAULT_TTL):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        # key -> (value, size, expires_at, backend, collection)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._data_versions: Dict[str, int] = {}
+        self._versions_synced = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[2] < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, value, backend: str = "", collection: str = "", ttl: Optional[float] = None, size: Optional[int] = None):
+        size = estimate_size(value) if size is None else size
+        if size > self.max_bytes:
+            logger.info(f"Result of {size:,} bytes exceeds cache budget, not cached")
+            return
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at, backend, collection)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def get_or_compute(
+        self,
+        backend: str,
+        collection: str,
+        query,
+        parameters,
+        compute: Callable[[], Any],
+        ttl: Optional[float] = None,
+        bypass: bool = False):
+        """Return (value, hit). With bypass=True the cache is neither read nor written"""
+        if bypass:
+            return compute(), False
+        key = make_key(backend, collection, query, parameters)
+        value = self.get(key)
+        if value is not None:
+            return value, True
+        value = compute()
+        self.put(key, value, backend, collection, ttl)
+        return value, False
+
+    def invalidate(self, backend: Optional[str] = None, collection: Optional[str] = None) -> int:
+        """Drop entries matching backend and/or collection (all entries if neither given)"""
+        with self._lock:
+            keys = [
+                key for key, entry in self._entries.items()
+                if (backend is None or entry[3] == backend) and (collection is None or entry[4] == collection)
+            ]
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def sync_data_versions(self, db) -> int:
+        """
+        Compare the data versions recorded by loaders with the last ones seen
+        and invalidate entries whose data changed. Returns entries dropped.
+        After the first sync a key not seen before counts as version 0, so the
+        first load of a collection also invalidates its cached results.
+        """
+        dropped = 0
+        for doc in db[DATA_VERSION_COLLECTION].find({}, {"version": 1}):
+            version = doc.get("version", 0)
+            previous = self._data_versions.get(doc["_id"], 0 if self._versions_synced else None)
+            if previous is not None and previous != version:
+                backend, _, collection = doc["_id"].partition(":")
+                dropped += self.invalidate(backend, collection or None)
+            self._data_versions[doc["_id"]] = version
+        self._versions_synced = True
+        return dropped
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[1]
+
+
+def bump_data_version(db, backend: str, collection: Optional[str] = None) -> int:
+    """Record that data for (backend, collection) was (re)loaded; call after every load"""
+    key = f"{backend}:{collection}" if collection else backend
+    doc = db[DATA_VERSION_COLLECTION].find_one_and_update(
+        {"_id": key},
+        {"$inc": {"version": 1}, "$set": {"loaded_at": time.time()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc["version"]
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """Return the process-wide ResultCache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+    return _cache
@@ -0,0 +1,197 @@
+"""
+Dictionary encoding hasil query MongoDB menjadi kolom categorical pandas.
+
+Field berkardinalitas rendah (nama produk, nama customer, id franchise,
+employee, produk) diulang di setiap baris sebagai objek Python. Di lapisan
+konversi hasil kolom-kolom itu diubah menjadi pandas Categorical: satu kamus
+nilai + kode integer per baris, sehingga DataFrame jauh lebih kecil dan
+groupby/merge bekerja di atas kode.
+
+Kamus disimpan per proses (get_category_dictionaries) dan dipakai ulang lintas
+query: field yang sama (mis. `product.name` dan `product_name`) memakai satu
+kamus, dan kedua sisi merge bisa di-encode dengan kategori yang identik
+(share_categories) sehingga pandas menggabungkan kode, bukan objek.
+
+transaction_date di-parse sekali menjadi datetime64, dan array `product`
+berisi sub-dokumen dipadatkan: item yang identik berbagi satu dict.
+"""
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Kolom hasil -> nama kamus bersama
+FIELD_DICTIONARIES = {
+    "name": "customer",
+    "customer": "customer",
+    "product.name": "product_name",
+    "product_name": "product_name",
+    "id_product": "id_product",
+    "product_id": "id_product",
+    "product.id_product": "id_product",
+    "id_franchise": "id_franchise",
+    "franchise_id": "id_franchise",
+    "id_cafe": "id_franchise",
+    "id_employee": "id_employee",
+    "employee_id": "id_employee"
+}
+DATE_FIELDS = ["transaction_date"]
+DATE_FORMAT = "%Y-%m-%d"
+NESTED_FIELDS = ["product"]
+
+# Kolom di-encode bila nilai unik <= rasio ini dari jumlah baris
+MAX_CARDINALITY_RATIO = 0.5
+# Kamus bersama berhenti tumbuh di atas ukuran ini (mis. nama customer)
+MAX_DICTIONARY_SIZE = 100_000
+
+
+class CategoryDictionaries:
+    """Process-wide value dictionaries shared by every encoded result"""
+
+    def __init__(self, max_size: int = MAX_DICTIONARY_SIZE):
+        self.max_size = max_size
+        self._categories: Dict[str, pd.Index] = {}
+        self._lock = threading.Lock()
+
+    def categories(self, name: str) -> Optional[pd.Index]:
+        return self._categories.get(name)
+
+    def update(self, name: str, values) -> Optional[pd.Index]:
+        """
+        Add unseen values to dictionary `name` and return its categories
+        (sorted when comparable, so categorical order matches value order).
+        None when the dictionary would exceed max_size.
+        """
+        new = pd.Index(pd.Series(values).dropna().unique())
+        with self._lock:
+            current = self._categories.get(name)
+            if current is not None and new.isin(current).all():
+                return current
+            merged = new if current is None else current.append(new).unique()
+            if len(merged) > self.max_size:
+                return None
+            try:
+                merged = merged.sort_values()
+            except TypeError:
+                pass
+            self._categories[name] = merged
+            return merged
+
+    def encode(self, values: pd.Series, name: str) -> Optional[pd.Series]:
+        categories = self.update(name, values)
+        if categories is None:
+            return None
+        return values.astype(pd.CategoricalDtype(categories))
+
+    def snapshot(self) -> Dict[str, list]:
+        with self._lock:
+            return {name: categories.tolist() for name, categories in self._categories.items()}
+
+    def clear(self):
+        with self._lock:
+            self._categories.clear()
+
+
+def _parse_dates(values: pd.Series) -> pd.Series:
+    parsed = pd.to_datetime(values, format=DATE_FORMAT, errors="coerce")
+    if parsed.isna().sum() > values.isna().sum():
+        # Format lain (mis. datetime lengkap): parse tanpa format tetap
+        parsed = pd.to_datetime(values, errors="coerce")
+    return parsed
+
+
+def _intern_items(values: pd.Series) -> pd.Series:
+    """Share one dict per distinct sub-document across the arrays of a column"""
+    seen = {}
+
+    def intern(item):
+        if not isinstance(item, dict):
+            return item
+        try:
+            return seen.setdefault(tuple(item.items()), item)
+        except TypeError:
+            return item
+
+    return values.map(lambda items: [intern(item) for item in items] if isinstance(items, list) else items)
+
+
+def encode_frame(
+    frame: pd.DataFrame,
+    dictionaries: Optional[CategoryDictionaries] = None,
+    max_ratio: float = MAX_CARDINALITY_RATIO) -> pd.DataFrame:
+    """
+    Dictionary-encode low-cardinality columns of a query result in place:
+    known fields use the shared dictionaries, other object columns a local
+    categorical. Dates become datetime64, nested product arrays are interned.
+    """
+    dictionaries = dictionaries or get_category_dictionaries()
+    rows = len(frame)
+    if rows == 0:
+        return frame
+
+    for column in frame.columns:
+        values = frame[column]
+        if column in DATE_FIELDS and values.dtype == object:
+            frame[column] = _parse_dates(values)
+            continue
+        if column in NESTED_FIELDS and values.dtype == object:
+            frame[column] = _intern_items(values)
+            continue
+        name = FIELD_DICTIONARIES.get(column)
+        if name is None and values.dtype != object:
+            continue
+        try:
+            unique = values.nunique(dropna=True)
+        except TypeError:
+            # List/dict per baris tidak bisa dijadikan kategori
+            continue
+        if unique > max_ratio * rows:
+            continue
+        encoded = dictionaries.encode(values, name) if name is not None else None
+        frame[column] = encoded if encoded is not None else values.astype("category")
+    return frame
+
+
+def share_categories(
+    left: pd.DataFrame,
+    right: pd.DataFrame,
+    left_on: List[str],
+    right_on: Optional[List[str]] = None,
+    dictionaries: Optional[CategoryDictionaries] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Encode the join keys of both frames with identical categories from the
+    shared dictionaries, so pd.merge joins on integer codes.
+    """
+    dictionaries = dictionaries or get_category_dictionaries()
+    right_on = right_on or left_on
+    for left_key, right_key in zip(left_on, right_on):
+        if left_key not in left.columns or right_key not in right.columns:
+            continue
+        name = FIELD_DICTIONARIES.get(right_key) or FIELD_DICTIONARIES.get(left_key) or right_key
+        try:
+            values = pd.concat([left[left_key].astype(object), right[right_key].astype(object)], ignore_index=True)
+            categories = dictionaries.update(name, values)
+        except TypeError:
+            continue
+        if categories is None:
+            continue
+        dtype = pd.CategoricalDtype(categories)
+        left = left.assign(**{left_key: left[left_key].astype(dtype)})
+        right = right.assign(**{right_key: right[right_key].astype(dtype)})
+    return left, right
+
+
+_dictionaries: Optional[CategoryDictionaries] = None
+_dictionaries_lock = threading.Lock()
+
+
+def get_category_dictionaries() -> CategoryDictionaries:
+    """Return the process-wide CategoryDictionaries"""
+    global _dictionaries
+    with _dictionaries_lock:
+        if _dictionaries is None:
+            _dictionaries = CategoryDictionaries()
+        return _dictionaries
@@ -0,0 +1,446 @@
+"""
+Columnar analytics cache transactionlog (Parquet lokal) untuk laporan.
+
+Snapshot transactionlog disimpan sebagai dua tabel Parquet (zstd):
+
+  transactions  satu baris per transaksi (tanpa array product)
+  line_items    satu baris per item product (hasil "$unwind"), dengan kolom
+                transaksi yang dibutuhkan agregasi ikut disalin
+
+Sinkronisasi inkremental memakai watermark id_transaction: hanya transaksi
+dengan id_transaction di atas watermark yang diambil dari MongoDB dan ditulis
+sebagai part file baru. Asumsinya sama dengan rollup/basket_counts: transaksi
+append-only dengan id naik; pakai --full setelah edit atau delete.
+
+Agregasi dijalankan di proses (pandas di atas kolom Arrow) dan menghasilkan
+bentuk dokumen yang sama dengan pipeline MongoDB-nya, sehingga aggregator dan
+template combine bisa memilih backend tanpa mengubah pengolahan hasil.
+
+    python columnar.py sync
+    python columnar.py sync --full
+    python columnar.py status
+    python columnar.py compact
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from connection import MONGO_DB, get_mongo_db
+from queries import BASE_COLLECTION
+from streaming import iter_batches
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    ds = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.getenv("COLUMNAR_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "columnar_cache"))
+DEFAULT_SYNC_BATCH_SIZE = 100_000
+COMPRESSION = "zstd"
+STATE_FILE = "_state.json"
+TABLES = ["transactions", "line_items"]
+BACKENDS = ["mongodb", "columnar"]
+
+# Harga tetap per item, sama dengan REVENUE_STAGE di aggregator
+UNIT_PRICE = 30000
+
+TRANSACTION_SCHEMA = None
+LINE_ITEM_SCHEMA = None
+if pa is not None:
+    TRANSACTION_SCHEMA = pa.schema([
+        ("id_transaction", pa.int64()),
+        ("transaction_date", pa.date32()),
+        ("id_franchise", pa.int64()),
+        ("id_employee", pa.int64()),
+        ("name", pa.string()),
+        ("order_quantity", pa.int64()),
+        ("item_count", pa.int32())
+    ])
+    LINE_ITEM_SCHEMA = pa.schema([
+        ("id_transaction", pa.int64()),
+        ("transaction_date", pa.date32()),
+        ("id_franchise", pa.int64()),
+        ("id_employee", pa.int64()),
+        ("order_quantity", pa.int64()),
+        ("id_product", pa.string()),
+        ("product_name", pa.string()),
+        ("quantity", pa.int64())
+    ])
+
+# Template combine_page yang bisa dijawab dari cache
+TEMPLATE_QUERIES = {
+    "Analisis Penjualan per Franchise": "franchise_sales",
+    "Analisis Penjualan Minuman per Franchise": "franchise_product_sales"
+}
+
+
+def _parse_date(value) -> Optional[date]:
+    if value is None or isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def documents_to_tables(docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Arrow tables (transactions, line_items) for a batch of transaction documents"""
+    transactions = {name: [] for name in TRANSACTION_SCHEMA.names}
+    items = {name: [] for name in LINE_ITEM_SCHEMA.names}
+    for doc in docs:
+        products = doc.get("product") or []
+        transaction_date = _parse_date(doc.get("transaction_date"))
+        row = {
+            "id_transaction": doc.get("id_transaction"),
+            "transaction_date": transaction_date,
+            "id_franchise": doc.get("id_franchise"),
+            "id_employee": doc.get("id_employee"),
+            "order_quantity": doc.get("order_quantity")
+        }
+        for key, value in row.items():
+            transactions[key].append(value)
+        transactions["name"].append(doc.get("name"))
+        transactions["item_count"].append(len(products))
+        for product in products:
+            for key, value in row.items():
+                items[key].append(value)
+            items["id_product"].append(product.get("id_product"))
+            items["product_name"].append(product.get("name"))
+            items["quantity"].append(product.get("quantity"))
+    return {
+        "transactions": pa.Table.from_pydict(transactions, schema=TRANSACTION_SCHEMA),
+        "line_items": pa.Table.from_pydict(items, schema=LINE_ITEM_SCHEMA)
+    }
+
+
+class ColumnarStore:
+    """Parquet snapshot of transactionlog plus MongoDB-shaped aggregations over it"""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        if pa is None:
+            raise ImportError("Columnar cache membutuhkan paket 'pyarrow'")
+        self.path = path
+        self._lock = threading.Lock()
+
+    # ========== State ==========
+    @property
+    def state_path(self) -> str:
+        return os.path.join(self.path, STATE_FILE)
+
+    def state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write_state(self, state: Dict[str, Any]):
+        # Tulis ke file sementara lalu rename agar state tidak pernah setengah jadi
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2, default=str)
+        os.replace(temp_path, self.state_path)
+
+    def available(self) -> bool:
+        return bool(self.state().get("parts"))
+
+    @property
+    def watermark(self) -> Optional[int]:
+        return self.state().get("watermark")
+
+    def _table_dir(self, table: str) -> str:
+        return os.path.join(self.path, table)
+
+    def _drop_orphans(self, parts: List[str]):
+        """Remove part files a crashed sync wrote but never recorded"""
+        for table in TABLES:
+            table_dir = self._table_dir(table)
+            if not os.path.isdir(table_dir):
+                continue
+            for name in os.listdir(table_dir):
+                if name.endswith(".parquet") and name not in parts:
+                    os.remove(os.path.join(table_dir, name))
+
+    # ========== Sync ==========
+    def sync(self, db, source: str = BASE_COLLECTION, batch_size: int = DEFAULT_SYNC_BATCH_SIZE, full: bool = False) -> Dict[str, Any]:
+        """Append transactions above the watermark as new part files"""
+        with self._lock:
+            state = {} if full else self.state()
+            if full and os.path.isdir(self.path):
+                shutil.rmtree(self.path)
+            if state.get("source") not in (None, source):
+                raise ValueError(f"Cache berisi snapshot {state['source']}, pakai --full untuk {source}")
+            for table in TABLES:
+                os.makedirs(self._table_dir(table), exist_ok=True)
+            state.setdefault("source", source)
+            state.setdefault("parts", [])
+            self._drop_orphans(state["parts"])
+
+            low = state.get("watermark")
+            query = {"id_transaction": {"$gt": low}} if low is not None else {}
+            cursor = db[source].find(query, {"_id": 0}, sort=[("id_transaction", 1)], batch_size=batch_size, allow_disk_use=True)
+
+            started = time.perf_counter()
+            rows = 0
+            for docs in iter_batches(cursor, batch_size):
+                tables = documents_to_tables(docs)
+                first, last = docs[0]["id_transaction"], docs[-1]["id_transaction"]
+                part = f"part-{first:012d}-{last:012d}.parquet"
+                for table, data in tables.items():
+                    pq.write_table(data, os.path.join(self._table_dir(table), part), compression=COMPRESSION)
+                rows += len(docs)
+                state["parts"].append(part)
+                state["watermark"] = last
+                state["rows"] = state.get("rows", 0) + len(docs)
+                state["line_items"] = state.get("line_items", 0) + tables["line_items"].num_rows
+                state["synced_at"] = datetime.now().isoformat()
+                self._write_state(state)
+
+            seconds = time.perf_counter() - started
+            logger.info(f"Columnar cache {source}: +{rows:,} transaksi (watermark {state.get('watermark')}) dalam {seconds:.1f}s")
+            return {'synced': rows, 'from': low, 'watermark': state.get("watermark"), 'seconds': seconds}
+
+    def compact(self) -> Dict[str, Any]:
+        """Rewrite all part files of each table into a single file"""
+        with self._lock:
+            state = self.state()
+            parts = state.get("parts", [])
+            if len(parts) <= 1:
+                return {'compacted': False, 'parts': len(parts)}
+            compacted = f"part-compact-{state['watermark']:012d}.parquet"
+            for table in TABLES:
+                data = self._dataset(table, parts).to_table()
+                pq.write_table(data, os.path.join(self._table_dir(table), compacted), compression=COMPRESSION)
+            state["parts"] = [compacted]
+            self._write_state(state)
+            self._drop_orphans(state["parts"])
+            return {'compacted': True, 'parts': len(parts)}
+
+    # ========== Read ==========
+    def _dataset(self, table: str, parts: Optional[List[str]] = None):
+        parts = parts if parts is not None else self.state().get("parts", [])
+        schema = TRANSACTION_SCHEMA if table == "transactions" else LINE_ITEM_SCHEMA
+        return ds.dataset([os.path.join(self._table_dir(table), part) for part in parts], schema=schema, format="parquet")
+
+    def read(self, table: str, columns: List[str], start_date=None, end_date=None) -> pd.DataFrame:
+        """Selected columns of a table, optionally filtered on transaction_date (inclusive)"""
+        condition = None
+        if start_date is not None:
+            condition = ds.field("transaction_date") >= _parse_date(start_date)
+        if end_date is not None:
+            upper = ds.field("transaction_date") <= _parse_date(end_date)
+            condition = upper if condition is None else condition & upper
+        return self._dataset(table).to_table(columns=columns, filter=condition).to_pandas(date_as_object=False)
+
+    # ========== Aggregations (bentuk hasil = pipeline MongoDB) ==========
+    def employee_totals(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """employee_performance_pipeline: per employee counts, revenue, avg quantity"""
+        frame = self.read("transactions", ["id_employee", "id_franchise", "order_quantity"], start_date, end_date)
+        grouped = frame.groupby("id_employee", sort=False).agg(
+            total_transactions=("order_quantity", "size"),
+            total_quantity=("order_quantity", "sum"),
+            avg_order_quantity=("order_quantity", "mean"),
+            franchise_id=("id_franchise", "first")
+        )
+        grouped["total_revenue"] = grouped.pop("total_quantity") * UNIT_PRICE
+        return grouped.rename_axis("_id").reset_index().to_dict("records")
+
+    def franchise_products(self) -> List[Dict[str, Any]]:
+        """regional_product_pipeline: products per franchise with order counts"""
+        frame = self.read("line_items", ["id_franchise", "id_product", "product_name", "quantity", "order_quantity"])
+        grouped = frame.groupby(["id_franchise", "id_product", "product_name"], sort=False).agg(
+            total_quantity=("quantity", "sum"),
+            total_orders=("quantity", "size"),
+            avg_order_size=("order_quantity", "mean")
+        ).reset_index()
+        results = []
+        for franchise_id, products in grouped.groupby("id_franchise", sort=False):
+            results.append({
+                '_id': franchise_id,
+                'products': products.drop(columns="id_franchise").rename(columns={'id_product': 'product_id'}).to_dict("records"),
+                'franchise_total_orders': int(products["total_orders"].sum())
+            })
+        return results
+
+    def franchise_monthly(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """franchise_growth_pipeline: monthly transactions and revenue per franchise"""
+        frame = self.read("transactions", ["id_franchise", "transaction_date", "order_quantity"], start_date, end_date)
+        frame["month"] = frame["transaction_date"].values.astype("datetime64[M]")
+        monthly = frame.groupby(["id_franchise", "month"], sort=False).agg(
+            transactions=("order_quantity", "size"),
+            revenue=("order_quantity", "sum")
+        ).reset_index()
+        monthly["revenue"] *= UNIT_PRICE
+        monthly["month"] = monthly["month"].dt.strftime("%Y-%m")
+        results = []
+        for franchise_id, months in monthly.groupby("id_franchise", sort=False):
+            results.append({
+                '_id': franchise_id,
+                'monthly_data': months[["month", "transactions", "revenue"]].to_dict("records"),
+                'total_transactions': int(months["transactions"].sum()),
+                'total_revenue': int(months["revenue"].sum())
+            })
+        return results
+
+    def customer_segments(self) -> List[Dict[str, Any]]:
+        """customer_segmentation_pipeline: customers per segment"""
+        frame = self.read("transactions", ["name", "order_quantity"])
+        frame["revenue"] = frame["order_quantity"] * UNIT_PRICE
+        customers = frame.groupby("name", sort=False)["revenue"].agg(total_spent="sum", transaction_count="size", avg_order_value="mean")
+        spent, count = customers["total_spent"], customers["transaction_count"]
+        customers["segment"] = np.select(
+            [
+                (spent >= 500000) & (count >= 20),
+                (spent >= 200000) & (count >= 10),
+                (spent <= 100000) & (count <= 5)
+            ],
+            ["VIP", "Regular", "Occasional"],
+            default="New"
+        )
+        segments = customers.groupby("segment").agg(
+            customer_count=("total_spent", "size"),
+            avg_total_spent=("total_spent", "mean"),
+            avg_transaction_count=("transaction_count", "mean"),
+            avg_order_value=("avg_order_value", "mean")
+        )
+        return segments.rename_axis("_id").reset_index().to_dict("records")
+
+    def basket_counts(self) -> List[Dict[str, Any]]:
+        """market_basket.basket_counts_pipeline: basket/item/pair count documents per franchise"""
+        items = self.read("line_items", ["id_transaction", "id_franchise", "id_product"]).dropna(subset=["id_product"])
+        items = items.drop_duplicates(["id_transaction", "id_product"]).sort_values(["id_transaction", "id_product"])
+        transactions = self.read("transactions", ["id_transaction", "id_franchise"])
+        sizes = items.groupby("id_transaction").size()
+        transactions["multi"] = transactions["id_transaction"].map(sizes).fillna(0) > 1
+
+        counts = []
+        baskets = transactions.groupby("id_franchise").agg(count=("multi", "size"), multi=("multi", "sum"))
+        for franchise_id, row in baskets.iterrows():
+            counts.append({'_id': {'kind': 'basket', 'f': franchise_id, 'a': None, 'b': None}, 'count': int(row["count"]), 'multi': int(row["multi"])})
+        for (franchise_id, product), count in items.groupby(["id_franchise", "id_product"]).size().items():
+            counts.append({'_id': {'kind': 'item', 'f': franchise_id, 'a': product, 'b': None}, 'count': int(count)})
+
+        # Pasangan a < b: item ke-i dipasangkan dengan item ke-(i+k) pada transaksi yang sama
+        transaction_ids = items["id_transaction"].to_numpy()
+        products = items["id_product"].to_numpy()
+        franchises = items["id_franchise"].to_numpy()
+        pair_frames = []
+        offset = 1
+        while offset < len(items):
+            same = transaction_ids[offset:] == transaction_ids[:-offset]
+            if not same.any():
+                break
+            pair_frames.append(pd.DataFrame({'f': franchises[:-offset][same], 'a': products[:-offset][same], 'b': products[offset:][same]}))
+            offset += 1
+        if pair_frames:
+            pairs = pd.concat(pair_frames, ignore_index=True).groupby(["f", "a", "b"]).size()
+            for (franchise_id, first, second), count in pairs.items():
+                counts.append({'_id': {'kind': 'pair', 'f': franchise_id, 'a': first, 'b': second}, 'count': int(count)})
+        return counts
+
+    def mongodb_only(self) -> Dict[str, List[Dict[str, Any]]]:
+        """mongodb_only_pipelines: summary and top-10 employees/products/franchises"""
+        frame = self.read("transactions", ["id_employee", "id_franchise", "order_quantity"])
+        frame["calculated_revenue"] = frame["order_quantity"] * UNIT_PRICE
+        employees = frame.groupby("id_employee").agg(
+            transaction_count=("calculated_revenue", "size"),
+            total_revenue=("calculated_revenue", "sum"),
+            avg_order_quantity=("order_quantity", "mean")
+        )
+        franchises = frame.groupby("id_franchise").agg(
+            transaction_count=("calculated_revenue", "size"),
+            total_revenue=("calculated_revenue", "sum")
+        )
+        items = self.read("line_items", ["id_product", "product_name", "quantity"])
+        products = items.groupby("id_product").agg(
+            product_name=("product_name", "first"),
+            total_quantity=("quantity", "sum"),
+            order_count=("quantity", "size")
+        )
+
+        def top(grouped: pd.DataFrame, column: str) -> List[Dict[str, Any]]:
+            return grouped.nlargest(10, column).rename_axis("_id").reset_index().to_dict("records")
+
+        return {
+            'summary': [{'total_transactions': len(frame)}],
+            'top_employees': top(employees, "total_revenue"),
+            'top_products': top(products, "total_quantity"),
+            'top_franchises': top(franchises, "total_revenue")
+        }
+
+    # ========== Combine Templates ==========
+    def franchise_sales(self) -> pd.DataFrame:
+        """'Analisis Penjualan per Franchise': total quantity and transactions per franchise"""
+        items = self.read("line_items", ["id_transaction", "id_franchise", "quantity"])
+        grouped = items.groupby("id_franchise").agg(
+            total_sales=("quantity", "sum"),
+            transaction_count=("id_transaction", "nunique")
+        )
+        grouped["avg_sales"] = grouped["total_sales"] / grouped["transaction_count"]
+        return grouped.rename_axis("_id").reset_index().sort_values("_id", ignore_index=True)
+
+    def franchise_product_sales(self) -> pd.DataFrame:
+        """'Analisis Penjualan Minuman per Franchise': quantity per franchise and product"""
+        items = self.read("line_items", ["id_franchise", "id_product", "product_name", "quantity"])
+        grouped = items.groupby(["id_franchise", "id_product", "product_name"], sort=False)["quantity"].sum()
+        frame = grouped.rename("total_quantity").reset_index()
+        return frame.sort_values(["id_franchise", "total_quantity"], ascending=[True, False], ignore_index=True)
+
+    def template(self, name: str) -> pd.DataFrame:
+        if name not in TEMPLATE_QUERIES:
+            raise KeyError(f"Template '{name}' tidak tersedia di columnar cache")
+        return getattr(self, TEMPLATE_QUERIES[name])()
+
+
+_stores: Dict[str, ColumnarStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_columnar_store(path: str = DEFAULT_STORE_PATH) -> ColumnarStore:
+    """Return the process-wide ColumnarStore for `path`"""
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = ColumnarStore(path)
+        return _stores[path]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar cache (Parquet) transactionlog untuk laporan")
+    parser.add_argument("command", choices=["sync", "status", "compact"])
+    parser.add_argument("--source", default=BASE_COLLECTION)
+    parser.add_argument("--path", default=DEFAULT_STORE_PATH)
+    parser.add_argument("--full", action="store_true", help="Hapus cache lalu snapshot ulang dari awal")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_SYNC_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = get_columnar_store(args.path)
+
+    if args.command == "sync":
+        report = store.sync(get_mongo_db(MONGO_DB), args.source, args.batch_size, full=args.full)
+        print(f"{report['synced']:,} transaksi disinkronkan, watermark {report['watermark']} ({report['seconds']:.1f}s)")
+    elif args.command == "compact":
+        print(store.compact())
+    else:
+        state = store.state()
+        if not state:
+            print("Columnar cache belum dibuat")
+            return
+        print(f"{state['source']}: {state.get('rows', 0):,} transaksi, {state.get('line_items', 0):,} line item, "
+              f"{len(state['parts'])} part, watermark {state.get('watermark')}, sinkron {state.get('synced_at')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from queries import execute_mongo_query, execute_neo4j_query
+from streaming import iter_batches
+
+logger = logging.getLogger(__name__)
+
+# Jumlah grup hasil MongoDB per batch yang diteruskan ke Neo4j
+DEFAULT_GROUP_BATCH_SIZE = 50
+
+
+def _timed(fn: Callable, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _uses_parameter(query: str, name: str) -> bool:
+    return re.search(rf"\${re.escape(name)}\b", query) is not None
+
+
+def run_combined_query(
+    mongo_collection,
+    mongo_pipeline: List[Dict[str, Any]],
+    neo4j_driver,
+    neo4j_query: str,
+    id_extractor: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    id_param: Optional[str] = None,
+    neo4j_parameters: Optional[Dict[str, Any]] = None,
+    group_batch_size: int = DEFAULT_GROUP_BATCH_SIZE,
+    max_workers: int = 4,
+    database: str = "neo4j") -> Dict[str, Any]:
+    """
+    Run the MongoDB and Neo4j halves of a combined query concurrently.
+
+    Without `id_extractor` the two queries are independent and simply run in
+    parallel. With it, the aggregation cursor is consumed in batches of
+    `group_batch_size` groups and a Neo4j query is submitted for each batch
+    of new IDs (passed as `$<id_param>`) while MongoDB keeps streaming.
+    A Neo4j query that does not reference `$<id_param>` would return the same
+    rows for every batch, so it is run once instead.
+
+    Returns the raw documents/records plus per-side and wall-clock timings.
+    `mongo_seconds` is the time to drain the aggregation, `neo4j_seconds` is
+    the summed busy time of all Neo4j calls, and `overlap_seconds` is how much
+    of that work was hidden by running it concurrently.
+    """
+    if id_extractor is not None and id_param and not _uses_parameter(neo4j_query, id_param):
+        logger.warning(f"Query Neo4j tidak memakai ${id_param}; dijalankan sekali tanpa batching")
+        id_extractor = None
+
+    wall_start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        if id_extractor is None:
+            mongo_future = pool.submit(_timed, execute_mongo_query, mongo_collection, "aggregate", mongo_pipeline)
+            neo4j_future = pool.submit(_timed, execute_neo4j_query, neo4j_driver, neo4j_query, neo4j_parameters, database)
+            mongo_docs, mongo_seconds = mongo_future.result()
+            neo4j_records, neo4j_seconds = neo4j_future.result()
+            neo4j_calls = 1
+        else:
+            if not id_param:
+                raise ValueError("id_param wajib diisi jika id_extractor dipakai")
+
+            mongo_docs = []
+            neo4j_futures = []
+            seen_ids = set()
+
+            mongo_start = time.perf_counter()
+            cursor = mongo_collection.aggregate(mongo_pipeline, batchSize=group_batch_size)
+            try:
+                for batch in iter_batches(cursor, group_batch_size):
+                    mongo_docs.extend(batch)
+                    new_ids = []
+                    for doc in batch:
+                        doc_id = id_extractor(doc)
+                        if doc_id is not None and doc_id not in seen_ids:
+                            seen_ids.add(doc_id)
+                            new_ids.append(doc_id)
+                    if new_ids:
+                        # Neo4j mulai bekerja selagi MongoDB masih mengirim batch berikutnya
+                        parameters = dict(neo4j_parameters or {}, **{id_param: new_ids})
+                        neo4j_futures.append(
+                            pool.submit(_timed, execute_neo4j_query, neo4j_driver, neo4j_query, parameters, database)
+                        )
+            finally:
+                cursor.close()
+            mongo_seconds = time.perf_counter() - mongo_start
+
+            neo4j_records = []
+            neo4j_seconds = 0.0
+            for future in neo4j_futures:
+                records, seconds = future.result()
+                neo4j_records.extend(records)
+                neo4j_seconds += seconds
+            neo4j_calls = len(neo4j_futures)
+
+    wall_seconds = time.perf_counter() - wall_start
+
+    return {
+        'mongo_docs': mongo_docs,
+        'neo4j_records': neo4j_records,
+        'timings': {
+            'mongo_seconds': mongo_seconds,
+            'neo4j_seconds': neo4j_seconds,
+            'wall_seconds': wall_seconds,
+            'sequential_estimate_seconds': mongo_seconds + neo4j_seconds,
+            'overlap_seconds': max(0.0, mongo_seconds + neo4j_seconds - wall_seconds),
+            'neo4j_calls': neo4j_calls
+        }
+    }
@@ -1,12 +1,26 @@
 
 import streamlit as st
-from pymongo import MongoClient
 import pandas as pd
 import time
 from streamlit_option_menu import option_menu
-from neo4j import GraphDatabase
 import json
 
+from async_queries import DEFAULT_MONGO_TIMEOUT_MS, DEFAULT_NEO4J_TIMEOUT_SECONDS, get_async_runner
+from benchmark import BENCHMARK_MODES, BENCHMARK_SCENARIOS, default_scenarios, restorable_schema_state, run_benchmark
+from cache import get_result_cache
+from categorical import encode_frame, share_categories
+from columnar import TEMPLATE_QUERIES, get_columnar_store
+from combined_query import run_combined_query
+from connection import get_connection_manager, get_mongo_client, get_neo4j_driver
+from index_advisor import advise, apply_proposals, index_report, record_query
+from line_items import get_line_item_arrays
+from neo4j_schema import DEFAULT_OPTIMIZED_STATE, apply_schema, detect_schema_state
+from profiling import explain_mongo, profile_cypher
+from queries import NEO4J_CONVERSION_MODES, DEFAULT_NEO4J_FETCH_SIZE, resolve_collection, execute_mongo_query, execute_neo4j_query, fetch_neo4j_frame
+from rollup import TEMPLATE_ROLLUPS, rollups_available
+from sampling import approximate_query
+from streaming import DEFAULT_BATCH_SIZE, ARRAY_MODES, BoundedPreview, stream_mongo_frames
+
 # Fungsi ambil data dari MongoDB
 def getDataMongoDB(
     uri,
@@ -17,49 +31,178 @@ def getDataMongoDB(
     projection=None,
     return_dataframe=True,
     show_time=True,
-    use_index=True):
+    use_index=True,
+    use_cache=None,
+    categorical=True):
 
-    client = MongoClient(uri)
+    # Pakai client dari pool bersama, bukan koneksi baru setiap query
+    client = get_mongo_client(uri)
     db = client[db_name]
     
     # Pilih collection berdasarkan apakah menggunakan index atau tidak
-    if use_index:
-        collection = db["transactionlogindex"]
-        collection_label = "with index"
-    else:
-        collection = db[collection_name]
-        collection_label = "without index"
+    collection, collection_label = resolve_collection(db, collection_name, use_index)
+
+    def execute():
+        # Workload advisor hanya mencatat eksekusi nyata, bukan rerun/cache hit
+        record_query(db, collection_name, query_type, query)
+        return execute_mongo_query(collection, query_type, query, projection)
+
+    if use_cache is None:
+        use_cache = st.session_state.get("use_result_cache", True)
 
     start = time.time()
+    cache_hit = False
     try:
-        if query_type == "find":
-            query = query or {}
-            cursor = collection.find(query, projection)
-            result = list(cursor)
-        elif query_type == "aggregate":
-            if not isinstance(query, list):
-                raise ValueError("Aggregation query harus dalam bentuk list pipeline.")
-            result = list(collection.aggregate(query))
-        else:
-            raise ValueError("query_type harus 'find' atau 'aggregate'")
+        result, cache_hit = get_result_cache().get_or_compute(
+            "mongodb",
+            collection.name,
+            [query_type, query, projection],
+            None,
+            execute,
+            bypass=not use_cache
+        )
     except Exception as e:
         st.error(f"Terjadi error saat query: {e}")
         result = []
     end = time.time()
 
     if show_time:
+        cache_label = " (cache hit)" if cache_hit else ""
         if use_index:
-            st.success(f"MongoDB query '{query_type}' executed {collection_label} in {end - start:.4f} seconds")
+            st.success(f"MongoDB query '{query_type}' executed {collection_label} in {end - start:.4f} seconds{cache_label}")
         else:
-            st.warning(f"MongoDB query '{query_type}' executed {collection_label} in {end - start:.4f} seconds")
-
-    client.close()
+            st.warning(f"MongoDB query '{query_type}' executed {collection_label} in {end - start:.4f} seconds{cache_label}")
 
     if return_dataframe:
-        return pd.DataFrame(result)
+        # Field berulang di-encode sebagai categorical dengan kamus bersama (lihat categorical.py)
+        frame = pd.DataFrame(result)
+        return encode_frame(frame) if categorical else frame
     else:
         return result
-    
+
+# Fungsi ambil data approximate: query dijalankan pada sampel bertingkat lalu diskalakan
+def approximateDataMongoDB(
+    uri,
+    db_name,
+    collection_name,
+    query_type="find",
+    query=None,
+    projection=None,
+    show_time=True):
+
+    db = get_mongo_client(uri)[db_name]
+    start = time.time()
+    try:
+        result = approximate_query(db, query_type, query, projection, source=collection_name)
+    except Exception as e:
+        st.error(f"Terjadi error saat query approximate: {e}")
+        return pd.DataFrame()
+    end = time.time()
+
+    if show_time:
+        st.info(f"MongoDB query '{query_type}' (approximate, {result['method']}) executed in {end - start:.4f} seconds")
+    if result['summary']:
+        summary = result['summary']
+        st.metric(
+            "Estimasi dokumen cocok",
+            f"{summary['estimated_count']:,.0f}",
+            help=f"Interval 95%: {summary.get('estimated_count_low', 0):,.0f} – {summary.get('estimated_count_high', 0):,.0f}"
+        )
+    if not result['scaled']:
+        st.warning("Pipeline tidak bisa diskalakan (mis. $limit/$replaceRoot sebelum $group), hasil hanya dari sampel.")
+    if result['partial']:
+        st.warning(
+            f"Hasil hanya sebagian terskala: {', '.join(result['unscaled_fields'])} berasal dari accumulator "
+            "non-aditif ($addToSet/$push/$first/$max, ...) dan masih bernilai sampel; kombinasi dengan field terskala tidak akurat."
+        )
+    if result['scaled'] and result['scaled_fields']:
+        st.caption(
+            f"Diskalakan ke seluruh collection: {', '.join(result['scaled_fields'])}. "
+            "Kolom `_low`/`_high` adalah interval 95%."
+        )
+    return pd.DataFrame(result['rows'])
+
+# Fungsi ambil data dari columnar cache lokal (Parquet, lihat columnar.py)
+# atau dari line-item arrays yang di-mmap (lihat line_items.py)
+def getDataColumnar(template_name, show_time=True, line_items=False):
+    store = get_line_item_arrays() if line_items else get_columnar_store()
+    label = "Line-item arrays" if line_items else "Columnar cache"
+    if not store.available():
+        command = "python line_items.py build" if line_items else "python columnar.py sync"
+        st.warning(f"{label} belum dibangun (jalankan `{command}`)")
+        return pd.DataFrame()
+
+    start = time.time()
+    try:
+        result = store.template(template_name)
+    except Exception as e:
+        st.error(f"Terjadi error saat membaca {label.lower()}: {e}")
+        return pd.DataFrame()
+    end = time.time()
+
+    if show_time:
+        watermark = store.watermark
+        st.success(f"{label} executed in {end - start:.4f} seconds (id_transaction ≤ {watermark})")
+    return result
+
+# Callback tombol promote: matikan mode approximate lalu jalankan query yang sama secara exact
+def promoteToExact(toggle_key, promote_key):
+    st.session_state[toggle_key] = False
+    st.session_state[promote_key] = True
+
+# Fungsi ambil data dari MongoDB secara streaming (per batch)
+def streamDataMongoDB(
+    uri,
+    db_name,
+    collection_name,
+    query_type="find",
+    query=None,
+    projection=None,
+    batch_size=DEFAULT_BATCH_SIZE,
+    array_mode="list",
+    max_preview_rows=10000,
+    show_time=True,
+    use_index=True):
+
+    client = get_mongo_client(uri)
+    db = client[db_name]
+    collection, collection_label = resolve_collection(db, collection_name, use_index)
+
+    preview = BoundedPreview(max_rows=max_preview_rows)
+    table_placeholder = st.empty()
+    status_placeholder = st.empty()
+    first_batch_time = None
+
+    start = time.perf_counter()
+    try:
+        for chunk in stream_mongo_frames(collection, query_type, query, projection, batch_size, "product", array_mode):
+            preview.add(chunk)
+            if first_batch_time is None:
+                # Halaman pertama langsung ditampilkan selagi sisa hasil dimuat
+                first_batch_time = time.perf_counter() - start
+                table_placeholder.dataframe(preview.frame(), use_container_width=True)
+            status_placeholder.info(f"Memuat... {preview.total_rows:,} baris diterima")
+    except Exception as e:
+        st.error(f"Terjadi error saat query: {e}")
+    end = time.perf_counter()
+
+    status_placeholder.empty()
+    if preview.total_rows:
+        table_placeholder.dataframe(preview.frame(), use_container_width=True)
+        if preview.truncated:
+            st.info(f"Menampilkan {max_preview_rows:,} dari {preview.total_rows:,} baris.")
+
+    if show_time:
+        message = f"MongoDB query '{query_type}' (streaming) executed {collection_label} in {end - start:.4f} seconds"
+        if first_batch_time is not None:
+            message += f" (batch pertama {first_batch_time:.4f} seconds)"
+        if use_index:
+            st.success(message)
+        else:
+            st.warning(message)
+
+    return preview
+
 def getDataNeo4j(
     uri,
     username,
@@ -69,55 +212,134 @@ def getDataNeo4j(
     return_dataframe=True,
     show_time=True,
     database="neo4j",
-    optimized=True):
+    optimized=True,
+    profile_mode=None,
+    use_cache=None,
+    conversion="bulk",
+    fetch_size=None):
     
-    driver = GraphDatabase.driver(uri, auth=(username, password))
+    # Driver dari pool bersama, tidak ditutup setelah query
+    driver = get_neo4j_driver(uri, username, password)
+
+    if use_cache is None:
+        use_cache = st.session_state.get("use_result_cache", True)
     
     start = time.time()
     result = []
+    plan_summary = None
+    cache_hit = False
     
     try:
-        with driver.session(database=database) as session:
-            # Execute query
-            response = session.run(query, parameters or {})
-            
-            # Convert records to list of dictionaries
-            result = []
-            for record in response:
-                # Convert record to dictionary
-                record_dict = {}
-                for key in record.keys():
-                    value = record[key]
-                    # Handle Neo4j node/relationship objects
-                    if hasattr(value, '__dict__'):
-                        if hasattr(value, 'items'):  # Node or Relationship
-                            record_dict[key] = dict(value)
-                        else:
-                            record_dict[key] = str(value)
-                    else:
-                        record_dict[key] = value
-                result.append(record_dict)
-                
+        if profile_mode:
+            # PROFILE / EXPLAIN: ambil juga plan eksekusi dari server
+            result, plan_summary = profile_cypher(driver, query, parameters, database, profile_mode)
+        elif return_dataframe:
+            # Konversi bulk per kolom (to_df/values), opsional streaming dengan fetch_size
+            result, cache_hit = get_result_cache().get_or_compute(
+                "neo4j",
+                database,
+                ["dataframe", query],
+                parameters,
+                lambda: fetch_neo4j_frame(driver, query, parameters, database, conversion, fetch_size),
+                bypass=not use_cache
+            )
+        else:
+            # Execute query & convert records to list of dictionaries
+            result, cache_hit = get_result_cache().get_or_compute(
+                "neo4j",
+                database,
+                query,
+                parameters,
+                lambda: execute_neo4j_query(driver, query, parameters, database),
+                bypass=not use_cache
+            )
     except Exception as e:
         st.error(f"Terjadi error saat query Neo4j: {e}")
         result = []
-    finally:
-        driver.close()
     
     end = time.time()
+
+    if plan_summary is not None:
+        showNeo4jProfile(plan_summary)
     
     if show_time:
         optimization_label = "optimized" if optimized else "non-optimized"
+        cache_label = " (cache hit)" if cache_hit else ""
         if optimized:
-            st.success(f"Neo4j query executed ({optimization_label}) in {end - start:.4f} seconds")
+            st.success(f"Neo4j query executed ({optimization_label}) in {end - start:.4f} seconds{cache_label}")
         else:
-            st.warning(f"Neo4j query executed ({optimization_label}) in {end - start:.4f} seconds")
+            st.warning(f"Neo4j query executed ({optimization_label}) in {end - start:.4f} seconds{cache_label}")
     
     if return_dataframe:
-        return pd.DataFrame(result)
+        return result if isinstance(result, pd.DataFrame) else pd.DataFrame(result)
     else:
         return result
 
+# Query async: dijalankan di event loop latar belakang, halaman di-rerun berkala untuk progres
+ASYNC_POLL_SECONDS = 0.5
+
+def cancelAsyncJob(job_key):
+    job_id = st.session_state.get(job_key)
+    if job_id:
+        get_async_runner().cancel(job_id)
+
+def asyncJobPanel(job_key):
+    job = get_async_runner().job(st.session_state.get(job_key))
+    if job is None:
+        st.session_state.pop(job_key, None)
+        return None
+
+    # Future yang sudah selesai dianggap final walau status belum sempat diperbarui
+    if not (job.finished or (job.future is not None and job.future.done())):
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.info(f"⏳ {job.label}: {job.status}, {job.rows:,} baris dalam {job.seconds:.1f} detik")
+        with col2:
+            st.button("⛔ Batalkan", key=f"{job_key}_cancel", on_click=cancelAsyncJob, args=(job_key,))
+        time.sleep(ASYNC_POLL_SECONDS)
+        st.rerun()
+
+    st.session_state.pop(job_key, None)
+    if job.status == "done":
+        st.success(f"{job.label} (async) selesai: {job.rows:,} baris dalam {job.seconds:.4f} seconds")
+        return encode_frame(pd.DataFrame(job.result))
+    if job.status == "cancelled":
+        st.warning(f"{job.label} dibatalkan setelah {job.seconds:.1f} detik")
+    elif job.status == "timeout":
+        st.error(f"{job.label} melewati batas waktu: {job.error}")
+    else:
+        st.error(f"Terjadi error saat query async: {job.error}")
+    return None
+
+# Panel instrumentasi explain MongoDB
+def showMongoProfile(summary):
+    st.write("#### 🔍 Explain Plan MongoDB")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Docs examined", f"{summary['docs_examined']:,}")
+    col2.metric("Keys examined", f"{summary['keys_examined']:,}")
+    col3.metric("Returned", f"{summary['returned']:,}")
+    col4.metric("Execution time", f"{summary['execution_time_ms']} ms")
+
+    if summary['collscan']:
+        st.error(f"COLLSCAN pada `{summary['collection']}`: query tidak memakai index")
+    elif summary['ixscan']:
+        st.success(f"IXSCAN memakai index: {', '.join(summary['index_names'])}")
+    st.dataframe(pd.DataFrame(summary['stages']), use_container_width=True)
+
+# Panel instrumentasi PROFILE / EXPLAIN Neo4j
+def showNeo4jProfile(summary):
+    st.write("#### 🔍 Query Plan Neo4j (" + ("PROFILE" if summary['profiled'] else "EXPLAIN") + ")")
+    if summary['profiled']:
+        col1, col2 = st.columns(2)
+        col1.metric("Total db hits", f"{summary['total_db_hits']:,}")
+        col2.metric("Rows", f"{summary['rows'] or 0:,}")
+
+    if summary['full_scan'] and not summary['uses_index']:
+        st.error(f"Full scan tanpa index: {', '.join(summary['full_scan_operators'])}")
+    elif summary['uses_index']:
+        st.success(f"Memakai index: {', '.join(summary['index_operators'])}")
+    st.dataframe(pd.DataFrame(summary['operators']), use_container_width=True)
+
 # Fungsi untuk page MongoDB
 def mongodb_page():
     st.subheader("📊 Akses Data dari MongoDB")
@@ -131,7 +353,7 @@ def mongodb_page():
 
     st.write("#### Daftar Kolom")
     try:
-        client = MongoClient("mongodb://localhost:27017/")
+        client = get_mongo_client("mongodb://localhost:27017/")
         db = client["dbcafe"]
         collection = db["transactionlog"]
         sample_doc = collection.find_one()
@@ -139,7 +361,6 @@ def mongodb_page():
             st.write(", ".join(f"`{key}`" for key in sample_doc.keys()))
         else:
             st.warning("Koleksi tidak memiliki dokumen.")
-        client.close()
     except Exception as e:
         st.error(f"Tidak dapat terhubung ke MongoDB: {e}")
 
@@ -149,30 +370,184 @@ def mongodb_page():
         placeholder='Contoh: {"name": "Michael Smith"} atau [{"$match": {"name": "Michael Smith"}}]'
     )
 
-    run_query = st.button("Jalankan Query")
+    show_explain = st.checkbox("Tampilkan explain plan (executionStats)", value=False)
+
+    # Mode streaming untuk hasil besar: dimuat per batch dengan memori terbatas
+    stream_mode = st.checkbox("Mode streaming (untuk hasil besar)", value=False)
+    if stream_mode:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            batch_size = st.number_input("Batch size", min_value=100, max_value=100000, value=DEFAULT_BATCH_SIZE, step=500)
+        with col2:
+            max_preview_rows = st.number_input("Maks. baris ditampilkan", min_value=100, max_value=200000, value=10000, step=1000)
+        with col3:
+            array_mode = st.selectbox("Kolom `product`", ARRAY_MODES)
+
+    # Mode approximate: jawaban cepat dari sampel, bisa dipromosikan ke exact
+    approximate = st.checkbox(
+        "Mode approximate (sampel bertingkat franchise x bulan)",
+        key="mongo_approximate",
+        help="Bangun sampel dengan `python sampling.py build`; tanpa sampel dipakai $sample langsung"
+    )
+
+    # Mode async: query tidak memblokir halaman dan bisa dibatalkan
+    async_mode = st.checkbox("Jalankan async (bisa dibatalkan)", value=False, key="mongo_async")
+    if async_mode:
+        mongo_timeout = st.number_input("Timeout (detik, maxTimeMS)", min_value=1, value=DEFAULT_MONGO_TIMEOUT_MS // 1000)
+
+    run_query = st.button("Jalankan Query") or st.session_state.pop("mongo_promote", False)
 
     # -------- Main Area Output --------
     if run_query:
         try:
             query = eval(query_input)
 
-            df = getDataMongoDB(
-                uri="mongodb://localhost:27017/",
-                db_name="dbcafe",
-                collection_name="transactionlog",
-                query_type=query_type,
-                query=query,
-                projection={"_id": 0} if query_type == "find" else None,
-                use_index=(use_index == "With Index")
-            )
+            if show_explain:
+                db = get_mongo_client("mongodb://localhost:27017/")["dbcafe"]
+                collection, _ = resolve_collection(db, "transactionlog", use_index == "With Index")
+                try:
+                    explain = explain_mongo(
+                        db,
+                        collection.name,
+                        query_type,
+                        query,
+                        projection={"_id": 0} if query_type == "find" else None
+                    )
+                    showMongoProfile(explain['summary'])
+                    with st.expander("Explain mentah"):
+                        st.json(explain['raw'])
+                except Exception as e:
+                    st.error(f"Gagal mengambil explain plan: {e}")
+
+            if approximate:
+                st.write("### Hasil Query (approximate)")
+                df = approximateDataMongoDB(
+                    uri="mongodb://localhost:27017/",
+                    db_name="dbcafe",
+                    collection_name="transactionlog",
+                    query_type=query_type,
+                    query=query,
+                    projection={"_id": 0} if query_type == "find" else None
+                )
+                if df.empty:
+                    st.warning("Tidak ada data ditemukan di sampel.")
+                else:
+                    st.dataframe(df)
+                st.button("⬆️ Promote ke exact", on_click=promoteToExact, args=("mongo_approximate", "mongo_promote"))
+                indexAdvisorSection()
+                return
+
+            if stream_mode:
+                st.write("### Hasil Query")
+                preview = streamDataMongoDB(
+                    uri="mongodb://localhost:27017/",
+                    db_name="dbcafe",
+                    collection_name="transactionlog",
+                    query_type=query_type,
+                    query=query,
+                    projection={"_id": 0} if query_type == "find" else None,
+                    batch_size=int(batch_size),
+                    array_mode=array_mode,
+                    max_preview_rows=int(max_preview_rows),
+                    use_index=(use_index == "With Index")
+                )
+                if preview.total_rows == 0:
+                    st.warning("Tidak ada data ditemukan.")
+                return
+
+            if async_mode:
+                db = get_mongo_client("mongodb://localhost:27017/")["dbcafe"]
+                record_query(db, "transactionlog", query_type, query)
+                job = get_async_runner().submit_mongo(
+                    uri="mongodb://localhost:27017/",
+                    db_name="dbcafe",
+                    collection_name="transactionlog",
+                    query_type=query_type,
+                    query=query,
+                    projection={"_id": 0} if query_type == "find" else None,
+                    use_index=(use_index == "With Index"),
+                    timeout_ms=int(mongo_timeout) * 1000,
+                    label=f"MongoDB {query_type}"
+                )
+                st.session_state["mongo_job"] = job.id
+            else:
+                df = getDataMongoDB(
+                    uri="mongodb://localhost:27017/",
+                    db_name="dbcafe",
+                    collection_name="transactionlog",
+                    query_type=query_type,
+                    query=query,
+                    projection={"_id": 0} if query_type == "find" else None,
+                    use_index=(use_index == "With Index")
+                )
+                st.write("### Hasil Query")
+                if df.empty:
+                    st.warning("Tidak ada data ditemukan.")
+                else:
+                    st.dataframe(df)
+
+        except Exception as e:
+            st.error(f"Terjadi kesalahan saat memproses query: {e}")
+
+    if "mongo_job" in st.session_state:
+        df = asyncJobPanel("mongo_job")
+        if df is not None:
             st.write("### Hasil Query")
             if df.empty:
                 st.warning("Tidak ada data ditemukan.")
             else:
                 st.dataframe(df)
 
+    indexAdvisorSection()
+
+# Index advisor: usulan index dari workload yang tercatat + pemakaian index saat ini
+def indexAdvisorSection():
+    with st.expander("📇 Index Advisor (transactionlogindex)"):
+        try:
+            db = get_mongo_client("mongodb://localhost:27017/")["dbcafe"]
+            proposals = advise(db)
+            if proposals:
+                st.write("**Usulan index (urutan ESR)**")
+                st.dataframe(pd.DataFrame([
+                    {
+                        'index': p['name'],
+                        'multikey': p['multikey'],
+                        'query': p['queries']
+                    }
+                    for p in proposals
+                ]), use_container_width=True)
+                if st.button("Buat index yang diusulkan"):
+                    created = apply_proposals(db, proposals)
+                    st.success(f"Index dibuat: {', '.join(name for names in created.values() for name in names)}")
+            else:
+                st.info("Semua index yang diusulkan sudah ada.")
+
+            st.write("**Ukuran & pemakaian index ($indexStats)**")
+            report = pd.DataFrame(index_report(db))
+            if not report.empty:
+                report['size_mb'] = (report['size_bytes'] / 1024 / 1024).round(2)
+                st.dataframe(report.drop(columns=['size_bytes']), use_container_width=True)
         except Exception as e:
-            st.error(f"Terjadi kesalahan saat memproses query: {e}")
+            st.error(f"Gagal memuat index advisor: {e}")
+
+# Status schema Neo4j: skenario optimized berarti lookup key didukung index
+def neo4jSchemaControl(optimized):
+    target_state = DEFAULT_OPTIMIZED_STATE if optimized else "none"
+    try:
+        driver = get_neo4j_driver("bolt://localhost:7687", "neo4j", "jekialacarte")
+        current_state = detect_schema_state(driver)
+    except Exception as e:
+        st.warning(f"Tidak dapat membaca schema Neo4j: {e}")
+        return
+
+    if current_state == target_state:
+        st.caption(f"Schema Neo4j: `{current_state}` (sesuai skenario)")
+        return
+    st.info(f"Schema Neo4j saat ini `{current_state}`, skenario ini membutuhkan `{target_state}`.")
+    if st.button(f"Terapkan schema `{target_state}`"):
+        with st.spinner("Mengubah constraint & index..."):
+            report = apply_schema(driver, target_state)
+        st.success(f"Schema `{target_state}` diterapkan ({report['seconds']:.2f}s)")
 
 # Fungsi untuk page Neo4j
 def neo4j_page():
@@ -187,6 +562,7 @@ def neo4j_page():
         ["Optimized (dengan index & optimasi)", "Non-optimized (tanpa index & optimasi)"]
     )
     optimized = "Optimized" in optimization_option
+    neo4jSchemaControl(optimized)
     
     # Query section
     st.write("#### Cypher Query")
@@ -220,6 +596,31 @@ LIMIT 20"""
         show_time = st.checkbox("Tampilkan waktu eksekusi", value=True)
     with col2:
         return_dataframe = st.checkbox("Return sebagai DataFrame", value=True)
+    col1, col2 = st.columns(2)
+    with col1:
+        conversion = st.selectbox(
+            "Konversi hasil",
+            NEO4J_CONVERSION_MODES,
+            help="bulk: to_df/values dengan konversi per kolom; stream: per chunk dengan fetch size; record: per nilai (lama)"
+        )
+    with col2:
+        fetch_size = st.number_input(
+            "Fetch size",
+            min_value=100,
+            value=DEFAULT_NEO4J_FETCH_SIZE,
+            step=1000,
+            help="Jumlah record per pull dari server"
+        )
+    profile_option = st.selectbox(
+        "Profiling Cypher",
+        ["Tidak", "PROFILE", "EXPLAIN"],
+        help="PROFILE menjalankan query dan mengukur db hits; EXPLAIN hanya menampilkan rencana"
+    )
+
+    # Mode async: query tidak memblokir halaman dan bisa dibatalkan
+    async_mode = st.checkbox("Jalankan async (bisa dibatalkan)", value=False, key="neo4j_async")
+    if async_mode:
+        neo4j_timeout = st.number_input("Timeout transaksi (detik)", min_value=1.0, value=DEFAULT_NEO4J_TIMEOUT_SECONDS)
     
     # Execute query button
     if st.button("🚀 Jalankan Cypher Query", type="primary"):
@@ -237,41 +638,68 @@ LIMIT 20"""
                     st.error(f"Format JSON parameters tidak valid: {e}")
                     return
             
-            # Execute query using the Neo4j function
-            with st.spinner("Menjalankan query Neo4j..."):
-                result = getDataNeo4j(
+            if async_mode and profile_option == "Tidak":
+                job = get_async_runner().submit_neo4j(
+                    cypher_query,
+                    parameters,
                     uri=neo4j_uri,
                     username=neo4j_user,
                     password=neo4j_password,
-                    query=cypher_query,
-                    parameters=parameters,
-                    return_dataframe=return_dataframe,
-                    show_time=show_time,
-                    optimized=optimized
+                    timeout_seconds=float(neo4j_timeout),
+                    label="Neo4j Cypher"
                 )
+                st.session_state["neo4j_job"] = job.id
+            else:
+                if async_mode:
+                    st.info("PROFILE/EXPLAIN dijalankan sinkron")
+
+                # Execute query using the Neo4j function
+                with st.spinner("Menjalankan query Neo4j..."):
+                    result = getDataNeo4j(
+                        uri=neo4j_uri,
+                        username=neo4j_user,
+                        password=neo4j_password,
+                        query=cypher_query,
+                        parameters=parameters,
+                        return_dataframe=return_dataframe,
+                        show_time=show_time,
+                        optimized=optimized,
+                        profile_mode=None if profile_option == "Tidak" else profile_option,
+                        conversion=conversion,
+                        fetch_size=int(fetch_size)
+                    )
             
-            # Display results
-            if return_dataframe:
-                if not result.empty:
-                    st.write(f"**Hasil Query:** {len(result)} record(s)")
-                    st.dataframe(result, use_container_width=True)
+                # Display results
+                if return_dataframe:
+                    if not result.empty:
+                        st.write(f"**Hasil Query:** {len(result)} record(s)")
+                        st.dataframe(result, use_container_width=True)
                     
-                    # Show summary statistics for numeric columns
-                    numeric_cols = result.select_dtypes(include=['number']).columns
-                    if len(numeric_cols) > 0:
-                        st.write("**Statistik Numerik:**")
-                        st.dataframe(result[numeric_cols].describe())
-                else:
-                    st.info("Query berhasil dijalankan tapi tidak ada data yang ditampilkan.")
-            else:
-                if result:
-                    st.write(f"**Hasil Query:** {len(result)} record(s)")
-                    st.json(result)
+                        # Show summary statistics for numeric columns
+                        numeric_cols = result.select_dtypes(include=['number']).columns
+                        if len(numeric_cols) > 0:
+                            st.write("**Statistik Numerik:**")
+                            st.dataframe(result[numeric_cols].describe())
+                    else:
+                        st.info("Query berhasil dijalankan tapi tidak ada data yang ditampilkan.")
                 else:
-                    st.info("Query berhasil dijalankan tapi tidak ada data yang ditampilkan.")
+                    if result:
+                        st.write(f"**Hasil Query:** {len(result)} record(s)")
+                        st.json(result)
+                    else:
+                        st.info("Query berhasil dijalankan tapi tidak ada data yang ditampilkan.")
                     
         except Exception as e:
             st.error(f"Error saat menjalankan query: {str(e)}")
+
+    if "neo4j_job" in st.session_state:
+        result = asyncJobPanel("neo4j_job")
+        if result is not None:
+            if not result.empty:
+                st.write(f"**Hasil Query:** {len(result)} record(s)")
+                st.dataframe(result, use_container_width=True)
+            else:
+                st.info("Query berhasil dijalankan tapi tidak ada data yang ditampilkan.")
     
     # Database info section
     st.write("---")
@@ -320,7 +748,11 @@ LIMIT 20"""
                                 st.write(f"• {rel_type}")
                 else:
                     st.warning("Koneksi berhasil tapi tidak ada labels yang ditemukan.")
-                    
+
+                # Status pool koneksi bersama (MongoDB & Neo4j)
+                st.write("**Status Pool Koneksi:**")
+                st.json(get_connection_manager().health_check())
+
         except Exception as e:
             st.error(f"❌ Gagal terhubung ke Neo4j: {str(e)}")
             st.write("Pastikan:")
@@ -329,6 +761,61 @@ LIMIT 20"""
             st.write("• Port tidak diblokir firewall")
 
 
+# Fungsi menjalankan query gabungan MongoDB & Neo4j secara konkuren
+def runCombinedConcurrently(selected_query, mongo_query, neo4j_query, use_optimization, mongo_collection_name="transactionlog"):
+    db = get_mongo_client("mongodb://localhost:27017/")["dbcafe"]
+    collection, collection_label = resolve_collection(db, mongo_collection_name, use_optimization)
+    driver = get_neo4j_driver("bolt://localhost:7687", "neo4j", "jekialacarte")
+
+    # Template bawaan hanya butuh daftar ID dari MongoDB; custom query independen
+    if selected_query == "Analisis Penjualan per Franchise":
+        id_extractor, id_param = (lambda doc: doc.get('_id')), "cafe_ids"
+    elif selected_query == "Analisis Penjualan Minuman per Franchise":
+        id_extractor, id_param = (lambda doc: doc.get('id_franchise')), "franchise_ids"
+    else:
+        id_extractor, id_param = None, None
+
+    with st.spinner("Menjalankan query MongoDB & Neo4j secara konkuren..."):
+        combined = run_combined_query(
+            collection,
+            mongo_query,
+            driver,
+            neo4j_query,
+            id_extractor=id_extractor,
+            id_param=id_param
+        )
+
+    timings = combined['timings']
+    mongo_result = encode_frame(pd.DataFrame(combined['mongo_docs']))
+    neo4j_result = pd.DataFrame(combined['neo4j_records'])
+
+    st.write("#### ⏱️ Waktu Eksekusi Konkuren")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric(f"MongoDB ({collection_label})", f"{timings['mongo_seconds']:.4f} s")
+    col2.metric("Neo4j", f"{timings['neo4j_seconds']:.4f} s", help=f"{timings['neo4j_calls']} panggilan Neo4j")
+    col3.metric("Wall-clock", f"{timings['wall_seconds']:.4f} s")
+    col4.metric(
+        "Overlap",
+        f"{timings['overlap_seconds']:.4f} s",
+        help=f"Estimasi sekuensial: {timings['sequential_estimate_seconds']:.4f} s"
+    )
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write("### 📊 Hasil MongoDB")
+        if not mongo_result.empty:
+            st.dataframe(mongo_result, use_container_width=True)
+        else:
+            st.warning("Tidak ada data dari MongoDB")
+    with col2:
+        st.write("### 🔗 Hasil Neo4j")
+        if not neo4j_result.empty:
+            st.dataframe(neo4j_result, use_container_width=True)
+        else:
+            st.warning("Tidak ada data dari Neo4j")
+
+    return mongo_result, neo4j_result
+
 # Fungsi untuk page Combine
 def combine_page():
     st.subheader("🔄 Kombinasi Data MongoDB & Neo4j")
@@ -341,7 +828,33 @@ def combine_page():
     )
     
     use_optimization = "Scenario 2" in scenario
-    
+
+    # Execution mode: MongoDB & Neo4j berurutan atau bersamaan
+    execution_mode = st.radio(
+        "Mode Eksekusi",
+        ["Sekuensial", "Konkuren (MongoDB & Neo4j paralel)"],
+        horizontal=True
+    )
+    run_concurrently = execution_mode.startswith("Konkuren")
+
+    # Template bawaan bisa dijawab dari rollup harian (lihat rollup.py)
+    use_rollup = st.checkbox(
+        "Jawab template dari rollup collection",
+        value=False,
+        help="Membaca rollup harian hasil $merge alih-alih scan + $unwind seluruh transactionlog"
+    )
+
+    # Backend analitik untuk sisi MongoDB: server atau snapshot Parquet lokal
+    backend = st.radio(
+        "Backend MongoDB",
+        ["MongoDB", "Columnar cache (lokal)", "Line-item arrays (mmap)"],
+        horizontal=True,
+        help="Columnar cache menjawab template dari snapshot Parquet transactionlog (python columnar.py sync); "
+             "line-item arrays dari array numpy yang di-mmap bersama antar proses (python line_items.py build)"
+    )
+    use_line_items = backend.startswith("Line-item")
+    use_columnar = backend.startswith("Columnar") or use_line_items
+
     # Predefined combined query examples
     st.write("#### Query Gabungan Tersedia")
     query_options = [
@@ -351,36 +864,35 @@ def combine_page():
     ]
     
     selected_query = st.selectbox("Pilih Query Template", query_options)
+    approximate = False
     
     if selected_query == "Analisis Penjualan per Franchise":
         st.write("##### Query: Analisis penjualan dan informasi franchise")
         
         if use_optimization:
+            # id_transaction unik per dokumen, jadi jumlah transaksi = jumlah dokumen.
+            # Tanpa $unwind dan tanpa $addToSet + $size yang menyimpan semua id di memori.
             mongo_query = [
             {
-                '$unwind': '$product'
+                '$match': {
+                    'product.0': {'$exists': True}
+                }
             }, {
                 '$group': {
                     '_id': '$id_franchise', 
                     'total_sales': {
-                        '$sum': '$product.quantity'
+                        '$sum': {'$sum': '$product.quantity'}
                     }, 
-                    'transaction_ids': {
-                        '$addToSet': '$id_transaction'
+                    'transaction_count': {
+                        '$sum': 1
                     }
                 }
             }, {
                 '$project': {
                     'total_sales': 1, 
-                    'transaction_count': {
-                        '$size': '$transaction_ids'
-                    }, 
+                    'transaction_count': 1, 
                     'avg_sales': {
-                        '$divide': [
-                            '$total_sales', {
-                                '$size': '$transaction_ids'
-                            }
-                        ]
+                        '$divide': ['$total_sales', '$transaction_count']
                     }
                 }
             }, {
@@ -506,6 +1018,7 @@ def combine_page():
             ]
             neo4j_query = """
             MATCH (f:Franchise)-[:HAS_PRODUCT]->(p:Product) 
+            WHERE f.id_cafe IN $franchise_ids
             RETURN f.id_cafe as id_franchise, f.name as franchise_name, f.year as year, 
                    p.id_product as id_product, p.category as category, p.price as price
             ORDER BY f.id_cafe
@@ -522,9 +1035,14 @@ def combine_page():
             st.write("**Neo4j Query (Cypher)**")
             neo4j_query_input = st.text_area("Neo4j Query", height=150,
                 placeholder='MATCH (n) RETURN n LIMIT 10')
+        approximate = st.checkbox(
+            "Mode approximate untuk query MongoDB (sampel bertingkat)",
+            key="combine_approximate",
+            help="Hasil $group diskalakan dari sampel dengan interval 95%"
+        )
     
     # Execute combined query
-    if st.button("🚀 Jalankan Query Gabungan", type="primary"):
+    if st.button("🚀 Jalankan Query Gabungan", type="primary") or st.session_state.pop("combine_promote", False):
         if selected_query == "Custom Query":
             try:
                 mongo_query = eval(mongo_query_input) if mongo_query_input.strip() else []
@@ -536,60 +1054,110 @@ def combine_page():
         if not mongo_query or not neo4j_query:
             st.error("Kedua query harus diisi!")
             return
+
+        mongo_collection_name = "transactionlog"
+        columnar_ready = False
+        if use_columnar:
+            if selected_query in TEMPLATE_QUERIES and not approximate:
+                if use_line_items:
+                    columnar_ready = get_line_item_arrays().available()
+                    if not columnar_ready:
+                        st.warning("Line-item arrays belum dibangun (jalankan `python line_items.py build`), memakai MongoDB")
+                else:
+                    columnar_ready = get_columnar_store().available()
+                    if not columnar_ready:
+                        st.warning("Columnar cache belum disinkronkan (jalankan `python columnar.py sync`), memakai MongoDB")
+            else:
+                st.info("Query ini tidak tersedia di columnar cache, memakai MongoDB")
+        if columnar_ready:
+            if run_concurrently:
+                st.info("Columnar cache dijalankan sekuensial")
+                run_concurrently = False
+        elif use_rollup and selected_query in TEMPLATE_ROLLUPS:
+            try:
+                if rollups_available(get_mongo_client("mongodb://localhost:27017/")["dbcafe"]):
+                    mongo_collection_name, mongo_query = TEMPLATE_ROLLUPS[selected_query]
+                    st.info(f"Query MongoDB dijawab dari rollup `{mongo_collection_name}`")
+                else:
+                    st.warning("Rollup belum dibangun atau tertinggal dari transactionlog (jalankan `python rollup.py`), memakai transactionlog")
+            except Exception as e:
+                st.warning(f"Tidak dapat mengecek rollup, memakai transactionlog: {e}")
+        
+        if approximate and run_concurrently:
+            st.info("Mode approximate dijalankan sekuensial")
+            run_concurrently = False
         
         try:
-            col1, col2 = st.columns(2)
+            if run_concurrently:
+                mongo_result, neo4j_result = runCombinedConcurrently(
+                    selected_query, mongo_query, neo4j_query, use_optimization, mongo_collection_name
+                )
+            else:
+                col1, col2 = st.columns(2)
             
-            # Execute MongoDB query
-            with col1:
-                st.write("### 📊 Hasil MongoDB")
-                with st.spinner("Menjalankan query MongoDB..."):
-                    mongo_result = getDataMongoDB(
-                        uri="mongodb://localhost:27017/",
-                        db_name="dbcafe",
-                        collection_name="transactionlog",
-                        query_type="aggregate",
-                        query=mongo_query,
-                        use_index=use_optimization
-                    )
+                # Execute MongoDB query
+                with col1:
+                    st.write("### 📊 Hasil MongoDB")
+                    with st.spinner("Menjalankan query MongoDB..."):
+                        if columnar_ready:
+                            mongo_result = getDataColumnar(selected_query, line_items=use_line_items)
+                        elif approximate:
+                            mongo_result = approximateDataMongoDB(
+                                uri="mongodb://localhost:27017/",
+                                db_name="dbcafe",
+                                collection_name=mongo_collection_name,
+                                query_type="aggregate",
+                                query=mongo_query
+                            )
+                        else:
+                            mongo_result = getDataMongoDB(
+                                uri="mongodb://localhost:27017/",
+                                db_name="dbcafe",
+                                collection_name=mongo_collection_name,
+                                query_type="aggregate",
+                                query=mongo_query,
+                                use_index=use_optimization
+                            )
+                    if approximate:
+                        st.button("⬆️ Promote ke exact", on_click=promoteToExact, args=("combine_approximate", "combine_promote"))
                 
-                if not mongo_result.empty:
-                    st.dataframe(mongo_result, use_container_width=True)
+                    if not mongo_result.empty:
+                        st.dataframe(mongo_result, use_container_width=True)
                     
-                    # Extract IDs for Neo4j query based on selected query type
-                    if selected_query == "Analisis Penjualan per Franchise":
-                        cafe_ids = mongo_result['_id'].tolist()
-                        neo4j_params = {"cafe_ids": cafe_ids}
-                    elif selected_query == "Analisis Penjualan Minuman per Franchise":
-                        franchise_ids = mongo_result['id_franchise'].unique().tolist()
-                        neo4j_params = {"franchise_ids": franchise_ids}
+                        # Extract IDs for Neo4j query based on selected query type
+                        if selected_query == "Analisis Penjualan per Franchise":
+                            cafe_ids = mongo_result['_id'].tolist()
+                            neo4j_params = {"cafe_ids": cafe_ids}
+                        elif selected_query == "Analisis Penjualan Minuman per Franchise":
+                            franchise_ids = mongo_result['id_franchise'].unique().tolist()
+                            neo4j_params = {"franchise_ids": franchise_ids}
+                        else:
+                            neo4j_params = {}
                     else:
+                        st.warning("Tidak ada data dari MongoDB")
                         neo4j_params = {}
-                else:
-                    st.warning("Tidak ada data dari MongoDB")
-                    neo4j_params = {}
             
-            # Execute Neo4j query
-            with col2:
-                st.write("### 🔗 Hasil Neo4j")
-                if neo4j_params or selected_query == "Custom Query":
-                    with st.spinner("Menjalankan query Neo4j..."):
-                        neo4j_result = getDataNeo4j(
-                            uri="bolt://localhost:7687",
-                            username="neo4j",
-                            password="jekialacarte",
-                            query=neo4j_query,
-                            parameters=neo4j_params,
-                            optimized=use_optimization
-                        )
+                # Execute Neo4j query
+                with col2:
+                    st.write("### 🔗 Hasil Neo4j")
+                    if neo4j_params or selected_query == "Custom Query":
+                        with st.spinner("Menjalankan query Neo4j..."):
+                            neo4j_result = getDataNeo4j(
+                                uri="bolt://localhost:7687",
+                                username="neo4j",
+                                password="jekialacarte",
+                                query=neo4j_query,
+                                parameters=neo4j_params,
+                                optimized=use_optimization
+                            )
                     
-                    if not neo4j_result.empty:
-                        st.dataframe(neo4j_result, use_container_width=True)
+                        if not neo4j_result.empty:
+                            st.dataframe(neo4j_result, use_container_width=True)
+                        else:
+                            st.warning("Tidak ada data dari Neo4j")
                     else:
-                        st.warning("Tidak ada data dari Neo4j")
-                else:
-                    st.warning("Tidak dapat menjalankan Neo4j query - tidak ada parameter")
-                    neo4j_result = pd.DataFrame()
+                        st.warning("Tidak dapat menjalankan Neo4j query - tidak ada parameter")
+                        neo4j_result = pd.DataFrame()
             
             # Combine results if both have data
             if not mongo_result.empty and not neo4j_result.empty:
@@ -599,6 +1167,8 @@ def combine_page():
                 if selected_query == "Analisis Penjualan per Franchise":
                     # Merge results on cafe ID
                     try:
+                        # Kunci kedua sisi memakai kategori yang sama agar merge berjalan di atas kode
+                        mongo_result, neo4j_result = share_categories(mongo_result, neo4j_result, ['_id'], ['id_cafe'])
                         combined = pd.merge(
                             mongo_result, 
                             neo4j_result, 
@@ -619,7 +1189,7 @@ def combine_page():
                             
                             # Show top cities
                             if 'kota' in combined.columns:
-                                city_summary = combined.groupby('kota')['total_sales'].sum().sort_values(ascending=False)
+                                city_summary = combined.groupby('kota', observed=True)['total_sales'].sum().sort_values(ascending=False)
                                 st.write("**Penjualan per Kota:**")
                                 for city, sales in city_summary.head().items():
                                     st.write(f"- {city}: {sales} items")
@@ -631,6 +1201,13 @@ def combine_page():
                 elif selected_query == "Analisis Penjualan Minuman per Franchise":
                     # Merge results on franchise ID and product ID
                     try:
+                        if columnar_ready and use_line_items:
+                            # Revenue dihitung kernel line-item arrays dengan harga produk dari Neo4j
+                            prices = neo4j_result.dropna(subset=['price']).drop_duplicates('id_product').set_index('id_product')['price'].to_dict()
+                            mongo_result = get_line_item_arrays().franchise_product_sales(prices)
+                        else:
+                            mongo_result = mongo_result.drop(columns='total_revenue', errors='ignore')
+                        mongo_result, neo4j_result = share_categories(mongo_result, neo4j_result, ['id_franchise', 'id_product'])
                         combined = pd.merge(
                             mongo_result, 
                             neo4j_result, 
@@ -641,7 +1218,8 @@ def combine_page():
                         
                         if not combined.empty:
                             # Calculate total price per product and franchise
-                            combined['total_revenue'] = combined['total_quantity'] * combined['price']
+                            if 'total_revenue' not in combined.columns:
+                                combined['total_revenue'] = combined['total_quantity'] * combined['price']
                             
                             st.write("#### Analisis Penjualan Minuman per Franchise dengan Revenue")
                             st.dataframe(combined, use_container_width=True)
@@ -657,20 +1235,20 @@ def combine_page():
                             
                             # Show top products by revenue
                             if 'product_name' in combined.columns:
-                                product_revenue = combined.groupby('product_name')['total_revenue'].sum().sort_values(ascending=False)
+                                product_revenue = combined.groupby('product_name', observed=True)['total_revenue'].sum().sort_values(ascending=False)
                                 st.write("**Top 5 Produk Berdasarkan Revenue:**")
                                 for product, revenue in product_revenue.head().items():
                                     st.write(f"- {product}: Rp {revenue:,.2f}")
                             
                             # Show top franchises by revenue
-                            franchise_revenue = combined.groupby(['id_franchise', 'franchise_name'])['total_revenue'].sum().sort_values(ascending=False)
+                            franchise_revenue = combined.groupby(['id_franchise', 'franchise_name'], observed=True)['total_revenue'].sum().sort_values(ascending=False)
                             st.write("**Top 5 Franchise Berdasarkan Revenue:**")
                             for (franchise_id, franchise_name), revenue in franchise_revenue.head().items():
                                 st.write(f"- {franchise_name} (ID: {franchise_id}): Rp {revenue:,.2f}")
                             
                             # Show category analysis
                             if 'category' in combined.columns:
-                                category_analysis = combined.groupby('category').agg({
+                                category_analysis = combined.groupby('category', observed=True).agg({
                                     'total_quantity': 'sum',
                                     'total_revenue': 'sum',
                                     'id_product': 'nunique'
@@ -679,7 +1257,7 @@ def combine_page():
                                 st.dataframe(category_analysis, use_container_width=True)
                             
                             # Show franchise performance
-                            franchise_performance = combined.groupby(['id_franchise', 'franchise_name', 'year']).agg({
+                            franchise_performance = combined.groupby(['id_franchise', 'franchise_name', 'year'], observed=True).agg({
                                 'total_quantity': 'sum',
                                 'total_revenue': 'sum',
                                 'id_product': 'nunique'
@@ -714,118 +1292,104 @@ def combine_page():
             import traceback
             st.write("**Full error traceback:**")
             st.code(traceback.format_exc())
-    
-        # Performance comparison
-        st.write("---")
-        st.write("#### 📈 Perbandingan Performa")
 
-        st.info("Menjalankan perbandingan performa untuk kedua skenario...")
-        
-        # Sample query for comparison
-        sample_mongo_query = [
-            {
-                '$unwind': '$product'
-            }, {
-                '$group': {
-                    '_id': '$id_franchise', 
-                    'total_sales': {
-                        '$sum': '$product.quantity'
-                    }, 
-                    'transaction_ids': {
-                        '$addToSet': '$id_transaction'
-                    }
-                }
-            }, {
-                '$project': {
-                    'total_sales': 1, 
-                    'transaction_count': {
-                        '$size': '$transaction_ids'
-                    }, 
-                    'avg_sales': {
-                        '$divide': [
-                            '$total_sales', {
-                                '$size': '$transaction_ids'
-                            }
-                        ]
-                    }
-                }
-            }, {
-                '$sort': {
-                    '_id': 1
-                }
-            }
-        ]
-        
-        sample_neo4j_query = """MATCH (f:Franchise)-[:IS_LOCATED]->(d:Daerah)
-            RETURN f.id_cafe as id_cafe, f.name, f.year, d.kota, d.kecamatan, d.nama_daerah"""
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.write("**Scenario 1: Tanpa Optimasi**")
-            start_time = time.time()
-            
-            # MongoDB without optimization
-            mongo_result_1 = getDataMongoDB(
-                uri="mongodb://localhost:27017/",
-                db_name="dbcafe", 
-                collection_name="transactionlog",
-                query_type="aggregate",
-                query=sample_mongo_query,
-                use_index=False,
-                show_time=False
-            )
-            
-            # Neo4j without optimization
-            neo4j_result_1 = getDataNeo4j(
-                uri="bolt://localhost:7687",
-                username="neo4j",
-                password="jekialacarte",
-                query=sample_neo4j_query,
-                optimized=False,
-                show_time=False
-            )
-            
-            total_time_1 = time.time() - start_time
-            st.warning(f"Total waktu: {total_time_1:.4f} seconds")
-        
-        with col2:
-            st.write("**Scenario 2: Dengan Optimasi**")
-            start_time = time.time()
-            
-            # MongoDB with optimization
-            mongo_result_2 = getDataMongoDB(
-                uri="mongodb://localhost:27017/",
-                db_name="dbcafe",
-                collection_name="transactionlog", 
-                query_type="aggregate",
-                query=sample_mongo_query,
-                use_index=True,
-                show_time=False
-            )
-            
-            # Neo4j with optimization
-            neo4j_result_2 = getDataNeo4j(
-                uri="bolt://localhost:7687",
-                username="neo4j", 
-                password="jekialacarte",
-                query=sample_neo4j_query + " // with optimization",
-                optimized=True,
-                show_time=False
-            )
-            
-            total_time_2 = time.time() - start_time
-            st.success(f"Total waktu: {total_time_2:.4f} seconds")
-        
-        # Show improvement
-        if total_time_1 > 0:
-            improvement = ((total_time_1 - total_time_2) / total_time_1) * 100
-            st.write(f"### 🎯 Peningkatan Performa: {improvement:.1f}%")
-            
-            if improvement > 0:
-                st.success(f"Scenario 2 lebih cepat {improvement:.1f}% dari Scenario 1")
+    # Performance comparison (benchmark terpisah dari query utama)
+    st.write("---")
+    benchmark_section()
+
+# Bagian benchmark: warm-up, N repetisi, urutan skenario diacak per ronde
+def benchmark_section():
+    st.write("#### 📈 Perbandingan Performa")
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        repetitions = st.number_input("Repetisi", min_value=3, max_value=500, value=20)
+    with col2:
+        warmup = st.number_input("Warm-up", min_value=0, max_value=50, value=3)
+    with col3:
+        mode = st.selectbox("Mode cache", BENCHMARK_MODES, help="cold: plan/query cache dibuang sebelum tiap run")
+    with col4:
+        selected_scenarios = st.multiselect(
+            "Skenario",
+            BENCHMARK_SCENARIOS,
+            default=BENCHMARK_SCENARIOS
+        )
+    toggle_schema = st.checkbox(
+        "Ubah schema Neo4j per skenario",
+        value=False,
+        help="Query Neo4j yang sama dijalankan tanpa index (non_optimized) dan dengan constraint (optimized); schema dikembalikan setelah benchmark"
+    )
+
+    if not st.button("📊 Jalankan Benchmark"):
+        return
+
+    scenarios = [
+        scenario for scenario in default_scenarios(
+            db=get_mongo_client("mongodb://localhost:27017/")["dbcafe"],
+            driver=get_neo4j_driver("bolt://localhost:7687", "neo4j", "jekialacarte"),
+            toggle_neo4j_schema=toggle_schema
+        )
+        if scenario.name in selected_scenarios
+    ]
+    if not scenarios:
+        st.warning("Pilih minimal satu skenario.")
+        return
+
+    neo4j_driver = get_neo4j_driver("bolt://localhost:7687", "neo4j", "jekialacarte")
+    original_state = None
+    if toggle_schema:
+        try:
+            original_state = restorable_schema_state(neo4j_driver)
+        except Exception as e:
+            st.error(f"Benchmark dibatalkan: {e}")
+            return
+
+    progress_bar = st.progress(0.0)
+    try:
+        result = run_benchmark(
+            scenarios,
+            repetitions=int(repetitions),
+            warmup=int(warmup),
+            mode=mode,
+            progress=lambda step, total: progress_bar.progress(step / total, text=f"Run {step}/{total}")
+        )
+    except Exception as e:
+        st.error(f"Benchmark gagal: {e}")
+        return
+    finally:
+        if original_state is not None:
+            apply_schema(neo4j_driver, original_state)
+
+    summary_df = pd.DataFrame(result.summary_rows()).set_index('scenario')
+    st.dataframe(summary_df.round(3), use_container_width=True)
+
+    # Show improvement (berdasarkan median / p50)
+    for backend, baseline, optimized in [
+        ("MongoDB (aggregate, full scan)", "mongo_without_index", "mongo_with_index"),
+        ("MongoDB (find dengan filter)", "mongo_filter_without_index", "mongo_filter_with_index"),
+        ("Neo4j", "neo4j_non_optimized", "neo4j_optimized")
+    ]:
+        if baseline in result.summary and optimized in result.summary:
+            base = result.summary[baseline]
+            opt = result.summary[optimized]
+            improvement = (base['p50_ms'] - opt['p50_ms']) / base['p50_ms'] * 100 if base['p50_ms'] > 0 else 0
+            # Klaim hanya signifikan jika interval kepercayaan p50 tidak tumpang tindih
+            significant = opt['p50_ci_ms'][1] < base['p50_ci_ms'][0]
+            if improvement > 0 and significant:
+                st.success(f"{backend}: skenario teroptimasi lebih cepat {improvement:.1f}% (p50, CI {int(result.config['confidence'] * 100)}% tidak tumpang tindih)")
             else:
-                st.warning("Tidak ada peningkatan performa yang signifikan")
+                st.warning(f"{backend}: tidak ada peningkatan performa yang signifikan ({improvement:.1f}% pada p50)")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("⬇️ Unduh JSON", result.to_json(), file_name="benchmark.json", mime="application/json")
+    with col2:
+        st.download_button(
+            "⬇️ Unduh CSV (sampel)",
+            pd.DataFrame(result.samples).to_csv(index=False),
+            file_name="benchmark_samples.csv",
+            mime="text/csv"
+        )
 
 # ================= Streamlit App =================
 st.set_page_config(layout="wide", page_title="Query Database Data Cafe")
@@ -907,6 +1471,32 @@ if selected == "Combine":
     - **Scenario 2**: Dengan index, query ter-optimasi
     """)
 
+st.sidebar.markdown("---")
+st.sidebar.title("🗄️ Cache Hasil Query")
+st.sidebar.checkbox("Gunakan cache hasil query", value=True, key="use_result_cache")
+
+result_cache = get_result_cache()
+try:
+    # Invalidasi otomatis jika loader menandai data sudah dimuat ulang
+    dropped = result_cache.sync_data_versions(get_mongo_client("mongodb://localhost:27017/")["dbcafe"])
+    if dropped:
+        st.sidebar.info(f"{dropped} entri cache di-invalidasi karena data dimuat ulang")
+except Exception as e:
+    st.sidebar.warning(f"Tidak dapat mengecek versi data: {e}")
+
+cache_stats = result_cache.stats()
+col1, col2 = st.sidebar.columns(2)
+col1.metric("Hit", cache_stats['hits'])
+col2.metric("Miss", cache_stats['misses'])
+st.sidebar.caption(
+    f"Hit rate {cache_stats['hit_rate'] * 100:.1f}% · {cache_stats['entries']} entri · "
+    f"{cache_stats['bytes'] / 1024 / 1024:.1f}/{cache_stats['max_bytes'] / 1024 / 1024:.0f} MB · "
+    f"{cache_stats['evictions']} eviction"
+)
+if st.sidebar.button("Kosongkan cache"):
+    result_cache.invalidate()
+    st.sidebar.success("Cache dikosongkan")
+
 st.sidebar.markdown("---")
 st.sidebar.title("👨‍💻 Developer")
 st.sidebar.markdown("""
@@ -0,0 +1,299 @@
+"""
+Index advisor untuk transactionlogindex berdasarkan workload yang tercatat.
+
+Setiap query yang lewat getDataMongoDB dan MongoNeo4jAggregator dicatat
+bentuknya (field equality, sort, range, dan group key) ke collection
+index_workload. Dari bentuk-bentuk itu advisor menyusun index compound dengan
+urutan ESR (Equality, Sort, Range); field di dalam array `product` otomatis
+menjadi multikey. Index dibuat dengan nama tetap sehingga skenario "with
+index" bisa dibangun ulang dari kode, bukan diatur manual.
+
+    python index_advisor.py propose             # usulan dari workload + baseline
+    python index_advisor.py apply               # buat index yang diusulkan
+    python index_advisor.py report              # ukuran & pemakaian ($indexStats)
+"""
+import argparse
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import IndexModel
+
+from connection import MONGO_DB, get_mongo_db
+from queries import BASE_COLLECTION, INDEXED_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+WORKLOAD_COLLECTION = "index_workload"
+ARRAY_FIELDS = {"product"}
+MAX_INDEXES_PER_COLLECTION = 8
+
+EQUALITY_OPERATORS = {"$eq", "$in"}
+RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte", "$ne", "$nin", "$regex", "$exists", "$not", "$type"}
+# Stage yang tidak mengubah bentuk dokumen; index masih berlaku sesudahnya
+PASSTHROUGH_STAGES = {"$match", "$sort"}
+
+# Query yang mendefinisikan skenario "with index": contoh sidebar dashboard dan
+# filter tanggal pada pipeline aggregator
+BASELINE_QUERIES = [
+    ("find", {"transaction_date": "2024-12-07", "id_employee": 5, "product.quantity": 2, "order_quantity": {"$gt": 7}}),
+    ("aggregate", [{'$match': {'name': 'Jennifer Miller'}}, {'$group': {'_id': '$id_franchise'}}, {'$project': {'_id': 0, 'id_franchise': '$_id'}}]),
+    ("aggregate", [{"$match": {"transaction_date": {"$gte": "2024-01-01", "$lte": "2024-12-31"}}}]),
+    ("find", {"id_franchise": 1, "transaction_date": {"$gte": "2024-01-01", "$lte": "2024-01-31"}}),
+    ("find", {"product.id_product": "C1"})
+]
+
+
+# ========== Shape Extraction ==========
+def _classify_filter(filter_doc: Dict[str, Any], equality: List[str], ranges: List[str], prefix: str = ""):
+    for field, condition in filter_doc.items():
+        if field == "$and":
+            for sub_filter in condition:
+                _classify_filter(sub_filter, equality, ranges, prefix)
+        elif field.startswith("$"):
+            # $or/$expr/$text tidak bisa dilayani satu index compound
+            continue
+        elif isinstance(condition, dict) and any(key.startswith("$") for key in condition):
+            operators = set(condition)
+            if "$elemMatch" in operators:
+                _classify_filter(condition["$elemMatch"], equality, ranges, f"{prefix}{field}.")
+            elif operators & RANGE_OPERATORS:
+                ranges.append(prefix + field)
+            elif operators & EQUALITY_OPERATORS:
+                equality.append(prefix + field)
+        else:
+            equality.append(prefix + field)
+
+
+def _group_fields(group_id) -> List[str]:
+    if isinstance(group_id, str) and group_id.startswith("$"):
+        return [group_id[1:]]
+    if isinstance(group_id, dict):
+        return [value[1:] for value in group_id.values() if isinstance(value, str) and value.startswith("$")]
+    return []
+
+
+def extract_shape(query_type: str, query, sort=None) -> Dict[str, Any]:
+    """
+    Reduce a find filter or aggregation pipeline to the fields an index can
+    serve: equality and range fields, sort keys, and group keys of a $group
+    reached before any stage that reshapes documents.
+    """
+    equality, ranges, sort_keys, group = [], [], [], []
+    if query_type == "find":
+        _classify_filter(query or {}, equality, ranges)
+        sort_keys = list((sort or {}).items())
+    elif isinstance(query, list):
+        for stage in query:
+            name = next(iter(stage), None)
+            if name == "$match":
+                _classify_filter(stage[name], equality, ranges)
+            elif name == "$sort" and not sort_keys:
+                sort_keys = list(stage[name].items())
+            elif name == "$group":
+                group = _group_fields(stage[name].get("_id"))
+                break
+            if name not in PASSTHROUGH_STAGES:
+                break
+
+    equality = sorted(set(equality))
+    sort_keys = [(field, direction) for field, direction in sort_keys if field not in equality]
+    sort_fields = {field for field, _ in sort_keys}
+    return {
+        'equality': equality,
+        'sort': [[field, int(direction)] for field, direction in sort_keys],
+        'range': sorted(set(ranges) - set(equality) - sort_fields),
+        'group': [field for field in group if field not in equality]
+    }
+
+
+def shape_id(collection: str, shape: Dict[str, Any]) -> str:
+    payload = json.dumps([collection, shape], sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+# ========== Workload Recording ==========
+def record_query(db, collection_name: str, query_type: str, query, sort=None) -> Optional[Dict[str, Any]]:
+    """
+    Record the shape of one query against the collection its index belongs
+    to (transactionlog queries are served by transactionlogindex).
+    Never raises: recording must not break the query path.
+    """
+    try:
+        target = INDEXED_COLLECTION if collection_name == BASE_COLLECTION else collection_name
+        shape = extract_shape(query_type, query, sort)
+        if not (shape['equality'] or shape['sort'] or shape['range'] or shape['group']):
+            return shape
+        db[WORKLOAD_COLLECTION].update_one(
+            {"_id": shape_id(target, shape)},
+            {
+                "$inc": {"count": 1},
+                "$set": {"last_seen": datetime.now()},
+                "$setOnInsert": {"collection": target, "shape": shape, "example": json.dumps(query, default=str)[:2000]}
+            },
+            upsert=True
+        )
+        return shape
+    except Exception as e:
+        logger.warning(f"Gagal mencatat workload index: {e}")
+        return None
+
+
+def load_workload(db, collection_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    query = {"collection": collection_name} if collection_name else {}
+    return list(db[WORKLOAD_COLLECTION].find(query, {"_id": 0, "collection": 1, "shape": 1, "count": 1}))
+
+
+def baseline_workload(collection_name: str = INDEXED_COLLECTION) -> List[Dict[str, Any]]:
+    return [
+        {"collection": collection_name, "shape": extract_shape(query_type, query), "count": 1}
+        for query_type, query in BASELINE_QUERIES
+    ]
+
+
+# ========== Proposal ==========
+def index_name(keys: List[List[Any]]) -> str:
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+def _is_prefix(short: List[List[Any]], long: List[List[Any]]) -> bool:
+    return len(short) <= len(long) and [list(k) for k in long[:len(short)]] == [list(k) for k in short]
+
+
+def propose_indexes(
+    workload: List[Dict[str, Any]],
+    existing: Optional[Dict[str, List[List[List[Any]]]]] = None,
+    max_per_collection: int = MAX_INDEXES_PER_COLLECTION) -> List[Dict[str, Any]]:
+    """
+    Turn recorded shapes into ESR-ordered index proposals. Equality fields
+    are ordered by how often they appear across the workload so related
+    queries share prefixes; a proposal that is a prefix of another (or of an
+    existing index) is dropped. Output is deterministic for a given workload.
+    """
+    existing = existing or {}
+    field_weight: Dict[Tuple[str, str], int] = {}
+    for item in workload:
+        for field in item['shape']['equality']:
+            key = (item['collection'], field)
+            field_weight[key] = field_weight.get(key, 0) + item.get('count', 1)
+
+    candidates: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for item in workload:
+        collection, shape = item['collection'], item['shape']
+        equality = sorted(shape['equality'], key=lambda f: (-field_weight[(collection, f)], f))
+        sort_keys = shape['sort'] or [[field, 1] for field in shape['group']]
+        keys = [[field, 1] for field in equality] + [list(k) for k in sort_keys] + [[field, 1] for field in shape['range']]
+        if not keys:
+            continue
+        name = index_name(keys)
+        candidate = candidates.setdefault((collection, name), {
+            'collection': collection,
+            'name': name,
+            'keys': keys,
+            'multikey': any(field.split(".")[0] in ARRAY_FIELDS for field, _ in keys),
+            'queries': 0
+        })
+        candidate['queries'] += item.get('count', 1)
+
+    proposals = []
+    by_collection: Dict[str, List[Dict[str, Any]]] = {}
+    for candidate in sorted(candidates.values(), key=lambda c: (c['collection'], -len(c['keys']), -c['queries'], c['name'])):
+        kept = by_collection.setdefault(candidate['collection'], [])
+        covered = any(_is_prefix(candidate['keys'], other['keys']) for other in kept) or \
+            any(_is_prefix(candidate['keys'], keys) for keys in existing.get(candidate['collection'], []))
+        if covered:
+            # Query yang terlayani index lebih panjang ikut dihitung ke index tersebut
+            for other in kept:
+                if _is_prefix(candidate['keys'], other['keys']):
+                    other['queries'] += candidate['queries']
+                    break
+            continue
+        kept.append(candidate)
+
+    for collection, kept in sorted(by_collection.items()):
+        kept.sort(key=lambda c: (-c['queries'], c['name']))
+        proposals.extend(kept[:max_per_collection])
+    return proposals
+
+
+def index_models(proposals: List[Dict[str, Any]]) -> List[IndexModel]:
+    return [IndexModel([tuple(k) for k in p['keys']], name=p['name']) for p in proposals]
+
+
+def baseline_index_models(collection_name: str = INDEXED_COLLECTION) -> List[IndexModel]:
+    """Indexes that define the "with index" scenario, derived from BASELINE_QUERIES"""
+    return index_models(propose_indexes(baseline_workload(collection_name)))
+
+
+def existing_index_keys(db, collection_name: str) -> List[List[List[Any]]]:
+    return [
+        [[field, int(direction) if isinstance(direction, (int, float)) else direction] for field, direction in info['key'].items()]
+        for info in db[collection_name].list_indexes()
+    ]
+
+
+def apply_proposals(db, proposals: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Create proposed indexes (idempotent: same name and keys are a no-op)"""
+    created: Dict[str, List[str]] = {}
+    for collection in sorted({p['collection'] for p in proposals}):
+        models = index_models([p for p in proposals if p['collection'] == collection])
+        created[collection] = db[collection].create_indexes(models)
+        logger.info(f"Index pada {collection}: {', '.join(created[collection])}")
+    return created
+
+
+def advise(db, collection_name: str = INDEXED_COLLECTION, include_baseline: bool = True, skip_existing: bool = True) -> List[Dict[str, Any]]:
+    workload = load_workload(db, collection_name)
+    if include_baseline:
+        workload += baseline_workload(collection_name)
+    existing = {collection_name: existing_index_keys(db, collection_name)} if skip_existing else None
+    return propose_indexes(workload, existing)
+
+
+# ========== Report ==========
+def index_report(db, collection_name: str = INDEXED_COLLECTION) -> List[Dict[str, Any]]:
+    """Size (collStats.indexSizes) and usage ($indexStats) for every index"""
+    sizes = db.command("collStats", collection_name).get("indexSizes", {})
+    rows = []
+    for stats in db[collection_name].aggregate([{"$indexStats": {}}]):
+        rows.append({
+            'name': stats['name'],
+            'keys': json.dumps(stats['key']),
+            'size_bytes': sizes.get(stats['name'], 0),
+            'ops': stats.get('accesses', {}).get('ops', 0),
+            'since': stats.get('accesses', {}).get('since')
+        })
+    return sorted(rows, key=lambda row: row['name'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index advisor untuk collection transaksi")
+    parser.add_argument("command", choices=["propose", "apply", "report"])
+    parser.add_argument("--collection", default=INDEXED_COLLECTION)
+    parser.add_argument("--no-baseline", action="store_true", help="Hanya pakai workload yang tercatat")
+    parser.add_argument("--json", dest="json_path", help="Simpan usulan ke file JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db = get_mongo_db(MONGO_DB)
+
+    if args.command == "report":
+        for row in index_report(db, args.collection):
+            print(f"{row['name']:<45} {row['size_bytes'] / 1024 / 1024:>9.1f} MB {row['ops']:>10,} ops  {row['keys']}")
+        return
+
+    proposals = advise(db, args.collection, include_baseline=not args.no_baseline, skip_existing=args.command == "apply")
+    for proposal in proposals:
+        flag = " (multikey)" if proposal['multikey'] else ""
+        print(f"{proposal['collection']}.{proposal['name']}{flag}: {proposal['queries']} query")
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(proposals, f, indent=2)
+    if args.command == "apply":
+        apply_proposals(db, proposals)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Bulk ingest transaksi hasil generator (NDJSON atau dataset Parquet) ke MongoDB.
+
+File input dibaca per batch dan dikirim dengan `insert_many(ordered=False)`
+dari beberapa worker thread sekaligus. Index untuk transactionlogindex baru
+dibangun setelah semua data masuk, karena membangun index sekali di akhir jauh
+lebih murah daripada memeliharanya di setiap insert.
+
+`_id` dokumen diisi dengan id_transaction, sehingga ingest bisa dilanjutkan
+setelah terputus: file yang sudah selesai dilewati (dicatat di ingest_state)
+dan dokumen yang sudah masuk dari file yang setengah jalan ditolak sebagai
+duplicate key lalu diabaikan.
+
+    python ingest.py "../Generate Data/generated" --collection transactionlog --collection transactionlogindex
+    python ingest.py out --workers 8 --w 1 --fresh
+"""
+import argparse
+import gzip
+import io
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional
+
+from pymongo import IndexModel
+from pymongo.errors import BulkWriteError
+from pymongo.write_concern import WriteConcern
+
+from cache import bump_data_version
+from connection import MONGO_DB, get_mongo_db
+from index_advisor import baseline_index_models
+from queries import BASE_COLLECTION, INDEXED_COLLECTION
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 10_000
+DEFAULT_WORKERS = 4
+INGEST_STATE_COLLECTION = "ingest_state"
+DUPLICATE_KEY_ERROR = 11000
+
+NDJSON_SUFFIXES = (".ndjson", ".ndjson.gz", ".ndjson.zst", ".jsonl", ".jsonl.gz", ".jsonl.zst")
+PARQUET_SUFFIXES = (".parquet",)
+
+# Index transactionlogindex: key unik + index baseline dari index_advisor
+INDEXED_COLLECTION_INDEXES = [
+    IndexModel([("id_transaction", 1)], name="id_transaction_1", unique=True)
+] + baseline_index_models()
+
+
+# ========== Input ==========
+def list_input_files(path: str) -> List[str]:
+    """NDJSON/Parquet files under `path` (or `path` itself), in a stable order"""
+    if os.path.isfile(path):
+        return [path]
+    files = []
+    for root, _, names in os.walk(path):
+        for name in names:
+            if name.endswith(NDJSON_SUFFIXES + PARQUET_SUFFIXES):
+                files.append(os.path.join(root, name))
+    return sorted(files)
+
+
+def _open_ndjson(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError("File .zst membutuhkan paket 'zstandard'")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True), encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def read_ndjson_batches(path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    with _open_ndjson(path) as f:
+        for line in f:
+            if line.strip():
+                batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def _hive_partition_values(path: str) -> Dict[str, Any]:
+    """Partition keys encoded in the directory names (e.g. id_franchise=3)"""
+    values = {}
+    for part in os.path.dirname(path).split(os.sep):
+        key, sep, value = part.partition("=")
+        if sep:
+            values[key] = int(value) if value.lstrip("-").isdigit() else value
+    return values
+
+
+def read_parquet_batches(path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    if pq is None:
+        raise ImportError("Input Parquet membutuhkan paket 'pyarrow'")
+    partition_values = _hive_partition_values(path)
+    # month hanya kunci partisi dari generator, bukan field dokumen transaksi
+    partition_values.pop("month", None)
+    for record_batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        rows = record_batch.to_pylist()
+        for row in rows:
+            row.pop("month", None)
+            row.update(partition_values)
+        yield rows
+
+
+def read_batches(path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    if path.endswith(PARQUET_SUFFIXES):
+        return read_parquet_batches(path, batch_size)
+    return read_ndjson_batches(path, batch_size)
+
+
+# ========== Load ==========
+def insert_batch(collection, docs: List[Dict[str, Any]]) -> int:
+    """Unordered insert; duplicates from a previous interrupted run are skipped"""
+    for doc in docs:
+        doc.setdefault("_id", doc["id_transaction"])
+    try:
+        return len(collection.insert_many(docs, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        errors = [err for err in e.details.get("writeErrors", []) if err.get("code") != DUPLICATE_KEY_ERROR]
+        if errors or e.details.get("writeConcernErrors"):
+            raise
+        return e.details.get("nInserted", 0)
+
+
+def ingest_file(collection, path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, Any]:
+    started = time.perf_counter()
+    read = 0
+    inserted = 0
+    for docs in read_batches(path, batch_size):
+        read += len(docs)
+        inserted += insert_batch(collection, docs)
+    seconds = time.perf_counter() - started
+    return {'path': path, 'read': read, 'inserted': inserted, 'seconds': seconds}
+
+
+def ingest_state(db, collection_name: str) -> Dict[str, Any]:
+    return db[INGEST_STATE_COLLECTION].find_one({"_id": collection_name}) or {}
+
+
+def build_indexes(collection, indexes: Optional[List[IndexModel]] = None) -> Dict[str, Any]:
+    started = time.perf_counter()
+    names = collection.create_indexes(indexes or INDEXED_COLLECTION_INDEXES)
+    seconds = time.perf_counter() - started
+    logger.info(f"{len(names)} index dibangun pada {collection.name} dalam {seconds:.1f}s")
+    return {'indexes': names, 'seconds': seconds}
+
+
+def ingest(
+    input_path: str,
+    collection_name: str = BASE_COLLECTION,
+    db=None,
+    workers: int = DEFAULT_WORKERS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    write_concern: Optional[WriteConcern] = None,
+    fresh: bool = False,
+    build_index: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Load every input file into `collection_name`, skipping files completed
+    by an earlier run unless `fresh` (which drops the collection first).
+    Indexes are built afterwards; by default only for transactionlogindex.
+    """
+    db = db if db is not None else get_mongo_db(MONGO_DB)
+    state_collection = db[INGEST_STATE_COLLECTION]
+    if fresh:
+        db[collection_name].drop()
+        state_collection.delete_one({"_id": collection_name})
+
+    collection = db[collection_name]
+    if write_concern is not None:
+        collection = collection.with_options(write_concern=write_concern)
+
+    files = list_input_files(input_path)
+    completed = set(ingest_state(db, collection_name).get("completed_files", []))
+    pending = [path for path in files if os.path.relpath(path, input_path) not in completed]
+    logger.info(f"{collection_name}: {len(pending)} dari {len(files)} file perlu dimuat")
+
+    started = time.perf_counter()
+    totals = {'read': 0, 'inserted': 0}
+    file_reports = []
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(ingest_file, collection, path, batch_size): path for path in pending}
+        for future in as_completed(futures):
+            report = future.result()
+            state_collection.update_one(
+                {"_id": collection_name},
+                {"$addToSet": {"completed_files": os.path.relpath(report['path'], input_path)}},
+                upsert=True
+            )
+            totals['read'] += report['read']
+            totals['inserted'] += report['inserted']
+            elapsed = time.perf_counter() - started
+            logger.info(
+                f"{os.path.basename(report['path'])}: {report['inserted']:,}/{report['read']:,} docs "
+                f"({report['read'] / report['seconds'] if report['seconds'] else 0:,.0f} docs/s) | "
+                f"total {totals['inserted']:,} ({totals['inserted'] / elapsed if elapsed else 0:,.0f} docs/s)"
+            )
+            file_reports.append(report)
+
+    load_seconds = time.perf_counter() - started
+    index_report = None
+    if build_index if build_index is not None else collection_name == INDEXED_COLLECTION:
+        index_report = build_indexes(db[collection_name])
+
+    try:
+        bump_data_version(db, "mongodb", collection_name)
+    except Exception as e:
+        logger.warning(f"Gagal menandai versi data {collection_name}: {e}")
+
+    return {
+        'collection': collection_name,
+        'files': len(files),
+        'files_loaded': len(file_reports),
+        'files_skipped': len(files) - len(pending),
+        'read': totals['read'],
+        'inserted': totals['inserted'],
+        'load_seconds': load_seconds,
+        'docs_per_second': totals['inserted'] / load_seconds if load_seconds else 0.0,
+        'index': index_report
+    }
+
+
+def _parse_w(value: str):
+    return int(value) if value.isdigit() else value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk ingest transaksi NDJSON/Parquet ke MongoDB")
+    parser.add_argument("input", help="File atau direktori hasil transaction_generator.py")
+    parser.add_argument("--collection", action="append", help="Collection tujuan (bisa diulang; default transactionlog)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--w", type=_parse_w, default=1, help="Write concern w (angka atau 'majority')")
+    parser.add_argument("--journal", action="store_true", help="Tunggu journal untuk setiap batch (j=true)")
+    parser.add_argument("--fresh", action="store_true", help="Drop collection dan status resume sebelum memuat")
+    parser.add_argument("--skip-indexes", action="store_true", help="Jangan bangun index setelah load")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    write_concern = WriteConcern(w=args.w, j=args.journal or None)
+    for collection_name in args.collection or [BASE_COLLECTION]:
+        report = ingest(
+            args.input,
+            collection_name,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            write_concern=write_concern,
+            fresh=args.fresh,
+            build_index=False if args.skip_indexes else None
+        )
+        print(f"{report['collection']}: {report['inserted']:,} dokumen dari {report['files_loaded']} file "
+              f"({report['files_skipped']} dilewati) dalam {report['load_seconds']:.1f}s "
+              f"({report['docs_per_second']:,.0f} docs/s)")
+        if report['index']:
+            print(f"  index: {', '.join(report['index']['indexes'])} ({report['index']['seconds']:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Utilitas join berbasis key untuk menggabungkan hasil MongoDB dan Neo4j.
+
+Sisi referensi (biasanya hasil Neo4j) diindeks sekali, lalu digabung dengan
+merge pandas yang vectorized, bukan `next()` scan per baris. Key dinormalisasi
+dulu sehingga "1" (string dari graph lama) dan 1 (integer dari MongoDB) tetap
+cocok.
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORK_HOURS = 8
+JOIN_KEY = "_join_key"
+
+
+def normalize_key(value):
+    """Scalar key normalization: numeric strings/floats become int, the rest str"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    try:
+        number = float(value)
+        if number.is_integer():
+            return int(number)
+    except (TypeError, ValueError):
+        pass
+    return str(value)
+
+
+def normalize_key_series(series: pd.Series) -> pd.Series:
+    """Vectorized normalize_key: all-numeric columns become Int64, others str"""
+    numeric = pd.to_numeric(series, errors="coerce")
+    present = series.notna()
+    if numeric[present].notna().all() and (numeric[present] % 1 == 0).all():
+        return numeric.astype("Int64")
+    return series.where(~present, series.astype(str))
+
+
+def index_by(records: Iterable[Dict[str, Any]], key: str) -> Dict[Any, Dict[str, Any]]:
+    """Dict index on a normalized key; the first record wins, like next()"""
+    index: Dict[Any, Dict[str, Any]] = {}
+    for record in records:
+        normalized = normalize_key(record.get(key))
+        if normalized is not None:
+            index.setdefault(normalized, record)
+    return index
+
+
+def keyed_frame(records, key: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """DataFrame of `records` with a normalized join key, one row per key"""
+    frame = records if isinstance(records, pd.DataFrame) else pd.DataFrame(list(records))
+    if frame.empty and columns is not None:
+        frame = pd.DataFrame(columns=list(dict.fromkeys(columns + [key])))
+    if frame.empty:
+        return frame.assign(**{JOIN_KEY: pd.Series(dtype="object")})
+    frame = frame.assign(**{JOIN_KEY: normalize_key_series(frame[key])})
+    duplicated = frame[JOIN_KEY].duplicated(keep="first")
+    if duplicated.any():
+        logger.warning(f"{int(duplicated.sum())} baris dengan key '{key}' duplikat diabaikan")
+        frame = frame[~duplicated]
+    return frame
+
+
+def join_records(
+    left,
+    right,
+    left_on: str,
+    right_on: str,
+    how: str = "left",
+    right_columns: Optional[List[str]] = None,
+    indicator: bool = False) -> pd.DataFrame:
+    """
+    Hash join `left` (many) to `right` (one row per key) on normalized keys.
+    Right-hand columns that collide with left ones get a `_right` suffix.
+    """
+    left_frame = left if isinstance(left, pd.DataFrame) else pd.DataFrame(list(left))
+    # Frame dibangun dari semua kolom lalu dipilih right_columns + key, agar key join tidak hilang
+    right_frame = keyed_frame(right, right_on, right_columns)
+    if right_columns is not None:
+        selected = [c for c in dict.fromkeys(right_columns + [right_on]) if c in right_frame.columns]
+        right_frame = right_frame[selected + [JOIN_KEY]]
+        if right_on not in right_columns:
+            # Key mentah sudah terwakili JOIN_KEY; jangan bocor sebagai kolom `_right`
+            right_frame = right_frame.drop(columns=[right_on], errors="ignore")
+    if left_frame.empty:
+        return left_frame
+
+    if left_on not in left_frame.columns:
+        raise KeyError(f"Kolom join '{left_on}' tidak ada di sisi kiri")
+    left_frame = left_frame.assign(**{JOIN_KEY: normalize_key_series(left_frame[left_on])})
+    if right_frame.empty:
+        right_frame = pd.DataFrame(columns=list(right_frame.columns))
+    # Tipe key kedua sisi harus sama agar merge tidak gagal/kosong
+    if left_frame[JOIN_KEY].dtype != right_frame[JOIN_KEY].dtype:
+        left_frame[JOIN_KEY] = left_frame[JOIN_KEY].astype(str)
+        right_frame = right_frame.assign(**{JOIN_KEY: right_frame[JOIN_KEY].astype(str)})
+
+    merged = left_frame.merge(
+        right_frame,
+        on=JOIN_KEY,
+        how=how,
+        suffixes=("", "_right"),
+        validate="many_to_one",
+        indicator=indicator
+    )
+    return merged.drop(columns=[JOIN_KEY])
+
+
+def parse_hour(values: pd.Series) -> pd.Series:
+    """Hour component of "HH:MM[:SS]" strings (or times/numbers) as float, NaN if unparseable"""
+    text = values.astype(str)
+    return pd.to_numeric(text.str.extract(r"^\s*(\d{1,2})", expand=False), errors="coerce")
+
+
+def work_hours(start: pd.Series, end: pd.Series, default: float = DEFAULT_WORK_HOURS) -> pd.Series:
+    """end_hour - start_hour per row; `default` where either side is missing"""
+    hours = parse_hour(end) - parse_hour(start)
+    return hours.fillna(default)
+
+
+def to_records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """DataFrame -> list of dicts with NaN/NA turned into None"""
+    if frame.empty:
+        return []
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
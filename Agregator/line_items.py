@@ -0,0 +1,432 @@
+"""
+Line-item arrays: representasi ringkas transactionlog di disk untuk metrik
+revenue dan quantity.
+
+Setiap item product disimpan sebagai satu baris di enam array numpy lebar
+tetap, satu file .npy per kolom:
+
+  id_transaction  int64
+  date            int32   ordinal hari sejak 1970-01-01 (-1 = kosong)
+  franchise       int32
+  employee        int32
+  product         int16   kode kamus produk (lihat meta.json)
+  quantity        int32
+
+Array dibuka dengan np.load(mmap_mode="r"): pembacaan zero-copy, dan karena
+halaman file datang dari page cache OS, semua proses worker dashboard berbagi
+satu salinan fisik. Setiap build menulis versi baru di direktorinya sendiri
+lalu mengganti pointer CURRENT secara atomik; pembaca yang masih memegang
+versi lama tidak terganggu dan pindah ke versi baru pada pemanggilan
+berikutnya.
+
+Revenue = quantity x harga produk (vektor harga per kode produk). Total,
+top-N, dan bucket waktu dihitung dengan kernel numpy (bincount/argpartition)
+tanpa merge DataFrame.
+
+Build inkremental memakai watermark id_transaction seperti rollup dan
+columnar cache (transaksi append-only dengan id naik; pakai --full setelah
+edit atau delete).
+
+    python line_items.py build
+    python line_items.py build --full
+    python line_items.py status
+    python line_items.py top --by franchise --top 5
+    python line_items.py buckets --bucket month --by franchise
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from columnar import TEMPLATE_QUERIES
+from connection import MONGO_DB, get_mongo_db
+from queries import BASE_COLLECTION
+from streaming import iter_batches
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARRAY_PATH = os.getenv("LINE_ITEM_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "line_item_arrays"))
+DEFAULT_BUILD_BATCH_SIZE = 100_000
+CURRENT_FILE = "CURRENT"
+META_FILE = "meta.json"
+KEEP_VERSIONS = 2
+MISSING = -1
+
+COLUMNS = {
+    "id_transaction": np.int64,
+    "date": np.int32,
+    "franchise": np.int32,
+    "employee": np.int32,
+    "product": np.int16,
+    "quantity": np.int32
+}
+GROUP_KEYS = {"franchise": "id_franchise", "employee": "id_employee", "product": "id_product"}
+BUCKETS = {"day": "D", "month": "M", "year": "Y"}
+METRICS = ["total_revenue", "total_quantity", "line_items", "transactions"]
+
+# Harga default per item, sama dengan REVENUE_STAGE di aggregator
+UNIT_PRICE = 30000
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _date_ordinal(value) -> int:
+    if value is None:
+        return MISSING
+    if not isinstance(value, date):
+        value = datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+    return value.toordinal() - _EPOCH_ORDINAL
+
+
+def _int(value) -> int:
+    return MISSING if value is None else int(value)
+
+
+def documents_to_columns(docs: List[Dict[str, Any]], codes: Dict[str, int], products: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Fixed-width columns for the line items of `docs`; unseen product ids get the next code"""
+    columns = {name: [] for name in COLUMNS}
+    for doc in docs:
+        row = (doc.get("id_transaction"), _date_ordinal(doc.get("transaction_date")),
+               _int(doc.get("id_franchise")), _int(doc.get("id_employee")))
+        for item in doc.get("product") or []:
+            product_id = item.get("id_product")
+            if product_id not in codes:
+                if len(products) > np.iinfo(np.int16).max:
+                    raise ValueError("Jumlah produk melebihi kapasitas kode int16")
+                codes[product_id] = len(products)
+                products.append({"id_product": product_id, "name": item.get("name")})
+            for name, value in zip(("id_transaction", "date", "franchise", "employee"), row):
+                columns[name].append(value)
+            columns["product"].append(codes[product_id])
+            columns["quantity"].append(item.get("quantity") or 0)
+    return {name: np.asarray(values, dtype=COLUMNS[name]) for name, values in columns.items()}
+
+
+def _group_sums(keys: np.ndarray, *weights: np.ndarray):
+    """Distinct keys, row counts and per-key sums of each weight (bincount over the key range)"""
+    if keys.size == 0:
+        return keys[:0].astype(np.int64), np.zeros(0, np.int64), [np.zeros(0) for _ in weights]
+    low = int(keys.min())
+    slots = (keys - low).astype(np.intp)
+    counts = np.bincount(slots)
+    present = np.flatnonzero(counts)
+    sums = [np.bincount(slots, weights=weight, minlength=counts.size)[present] for weight in weights]
+    return present + low, counts[present], sums
+
+
+class LineItemArrays:
+    """Memory-mapped line-item columns plus vectorized revenue/quantity kernels"""
+
+    def __init__(self, path: str = DEFAULT_ARRAY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._meta: Dict[str, Any] = {}
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    # ========== Versions ==========
+    def _current_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.path, CURRENT_FILE), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _open(self):
+        """(Re)map the arrays when another process published a new version"""
+        version = self._current_version()
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            if version is None:
+                self._meta, self._arrays = {}, {}
+            else:
+                version_dir = os.path.join(self.path, version)
+                with open(os.path.join(version_dir, META_FILE), "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                self._arrays = {name: np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode="r") for name in COLUMNS}
+                self._meta = meta
+            self._version = version
+
+    def available(self) -> bool:
+        self._open()
+        return bool(self._arrays)
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        self._open()
+        return self._meta
+
+    @property
+    def watermark(self) -> Optional[int]:
+        return self.meta.get("watermark")
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        self._open()
+        if not self._arrays:
+            raise RuntimeError("Line-item arrays belum dibangun (python line_items.py build)")
+        return self._arrays
+
+    def _prune(self, keep: str):
+        versions = sorted(name for name in os.listdir(self.path) if name.startswith("v") and name != keep)
+        for name in versions[:max(len(versions) - (KEEP_VERSIONS - 1), 0)]:
+            # Di Windows file yang masih di-mmap proses lain tidak bisa dihapus
+            shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    # ========== Build ==========
+    def build(self, db, source: str = BASE_COLLECTION, batch_size: int = DEFAULT_BUILD_BATCH_SIZE, full: bool = False) -> Dict[str, Any]:
+        """Publish a new version with the line items above the watermark appended"""
+        self._open()
+        previous = {} if full else dict(self._arrays)
+        meta = {} if full else dict(self._meta)
+        if meta.get("source") not in (None, source):
+            raise ValueError(f"Array berisi {meta['source']}, pakai --full untuk {source}")
+        products = list(meta.get("products", []))
+        codes = {product["id_product"]: code for code, product in enumerate(products)}
+
+        low = meta.get("watermark")
+        query = {"id_transaction": {"$gt": low}} if low is not None else {}
+        projection = {"_id": 0, "id_transaction": 1, "transaction_date": 1, "id_franchise": 1, "id_employee": 1, "product": 1}
+        cursor = db[source].find(query, projection, sort=[("id_transaction", 1)], batch_size=batch_size, allow_disk_use=True)
+
+        started = time.perf_counter()
+        chunks: List[Dict[str, np.ndarray]] = []
+        transactions = 0
+        high = low
+        for docs in iter_batches(cursor, batch_size):
+            chunks.append(documents_to_columns(docs, codes, products))
+            transactions += len(docs)
+            high = docs[-1]["id_transaction"]
+        if not chunks:
+            if not previous:
+                logger.warning(f"Collection {source} kosong, line-item arrays tidak dibangun")
+            return {'built': False, 'watermark': low}
+
+        # Array lama disalin langsung dari mmap ke file versi baru, tidak lewat memori penuh
+        os.makedirs(self.path, exist_ok=True)
+        version = f"v{high or 0:012d}-{int(time.time() * 1000)}"
+        version_dir = os.path.join(self.path, version)
+        os.makedirs(version_dir)
+        rows = len(previous.get("quantity", [])) + sum(len(chunk["quantity"]) for chunk in chunks)
+        for name, dtype in COLUMNS.items():
+            target = np.lib.format.open_memmap(os.path.join(version_dir, f"{name}.npy"), mode="w+", dtype=dtype, shape=(rows,))
+            position = 0
+            for part in ([previous[name]] if previous else []) + [chunk[name] for chunk in chunks]:
+                target[position:position + len(part)] = part
+                position += len(part)
+            target.flush()
+            del target
+
+        meta.update({
+            "source": source,
+            "rows": rows,
+            "transactions": meta.get("transactions", 0) + transactions,
+            "watermark": high,
+            "products": products,
+            "built_at": datetime.now().isoformat()
+        })
+        with open(os.path.join(version_dir, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2, default=str)
+        temp_path = os.path.join(self.path, CURRENT_FILE + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(temp_path, os.path.join(self.path, CURRENT_FILE))
+        self._prune(version)
+
+        seconds = time.perf_counter() - started
+        logger.info(f"Line-item arrays {source}: +{transactions:,} transaksi, {rows:,} baris (watermark {high}) dalam {seconds:.1f}s")
+        return {'built': True, 'from': low, 'watermark': high, 'rows': rows, 'seconds': seconds}
+
+    # ========== Kernels ==========
+    def product_ids(self) -> np.ndarray:
+        return np.array([product["id_product"] for product in self.meta.get("products", [])], dtype=object)
+
+    def price_vector(self, prices: Optional[Mapping[str, float]] = None, default: float = UNIT_PRICE) -> np.ndarray:
+        """Price per product code; products missing from `prices` use `default`"""
+        prices = prices or {}
+        return np.array([prices.get(product_id, default) for product_id in self.product_ids()], dtype=np.float64)
+
+    def select(self, columns: List[str], start_date=None, end_date=None) -> Dict[str, np.ndarray]:
+        """Columns as zero-copy views, or filtered copies when a date range (inclusive) is given"""
+        arrays = self.arrays()
+        if start_date is None and end_date is None:
+            return {name: arrays[name] for name in columns}
+        days = arrays["date"]
+        mask = days != MISSING
+        if start_date is not None:
+            mask &= days >= _date_ordinal(start_date)
+        if end_date is not None:
+            mask &= days <= _date_ordinal(end_date)
+        return {name: arrays[name][mask] for name in columns}
+
+    def _key_column(self, frame: pd.DataFrame, by: str, keys: np.ndarray) -> pd.DataFrame:
+        if by == "product":
+            products = self.meta.get("products", [])
+            frame.insert(0, "product_name", [products[code]["name"] for code in keys])
+            frame.insert(0, "id_product", self.product_ids()[keys])
+        else:
+            frame.insert(0, GROUP_KEYS[by], keys)
+        return frame
+
+    def totals(self, by: str, prices: Optional[Mapping[str, float]] = None, start_date=None, end_date=None) -> pd.DataFrame:
+        """Quantity, revenue, line items and distinct transactions per franchise/employee/product"""
+        if by not in GROUP_KEYS:
+            raise ValueError(f"by harus salah satu dari {list(GROUP_KEYS)}")
+        data = self.select(["id_transaction", by, "product", "quantity"], start_date, end_date)
+        ids, keys, quantity = data["id_transaction"], data[by], data["quantity"]
+        revenue = quantity * self.price_vector(prices)[data["product"]]
+        groups, lines, (total_quantity, total_revenue) = _group_sums(keys, quantity, revenue)
+
+        # Baris terurut per id_transaction; franchise/employee konstan dalam satu transaksi
+        if by == "product":
+            span = int(keys.max()) + 1 if keys.size else 1
+            pairs = np.unique(ids.astype(np.int64) * span + keys)
+            distinct_keys = pairs % span
+        else:
+            first = np.ones(ids.size, dtype=bool)
+            first[1:] = ids[1:] != ids[:-1]
+            distinct_keys = keys[first]
+        _, transactions, _ = _group_sums(distinct_keys)
+
+        frame = pd.DataFrame({
+            "total_quantity": total_quantity.astype(np.int64),
+            "total_revenue": total_revenue,
+            "line_items": lines,
+            "transactions": transactions
+        })
+        return self._key_column(frame, by, groups)
+
+    def top_n(self, by: str, n: int = 10, metric: str = "total_revenue", prices: Optional[Mapping[str, float]] = None,
+              start_date=None, end_date=None) -> pd.DataFrame:
+        """The `n` groups with the highest `metric` (argpartition, then sort of the n)"""
+        if metric not in METRICS:
+            raise ValueError(f"metric harus salah satu dari {METRICS}")
+        frame = self.totals(by, prices, start_date, end_date)
+        values = frame[metric].to_numpy()
+        if 0 < n < len(values):
+            frame = frame.iloc[np.argpartition(-values, n - 1)[:n]]
+        return frame.sort_values(metric, ascending=False, ignore_index=True).head(max(n, 0))
+
+    def time_buckets(self, bucket: str = "month", by: Optional[str] = None, prices: Optional[Mapping[str, float]] = None,
+                     start_date=None, end_date=None) -> pd.DataFrame:
+        """Quantity and revenue per day/month/year, optionally split per franchise/employee/product"""
+        if bucket not in BUCKETS:
+            raise ValueError(f"bucket harus salah satu dari {list(BUCKETS)}")
+        if by is not None and by not in GROUP_KEYS:
+            raise ValueError(f"by harus salah satu dari {list(GROUP_KEYS)}")
+        columns = ["date", "product", "quantity"] + ([by] if by and by != "product" else [])
+        data = self.select(columns, start_date, end_date)
+        dated = data["date"] != MISSING
+        data = {name: values[dated] for name, values in data.items()}
+        periods = data["date"].astype(np.int64).astype("datetime64[D]").astype(f"datetime64[{BUCKETS[bucket]}]").astype(np.int64)
+        quantity = data["quantity"]
+        revenue = quantity * self.price_vector(prices)[data["product"]]
+
+        if by is None:
+            keys, lines, (total_quantity, total_revenue) = _group_sums(periods, quantity, revenue)
+            periods, group_keys = keys, None
+        else:
+            split = data[by].astype(np.int64)
+            low = int(split.min()) if split.size else 0
+            span = int(split.max()) - low + 1 if split.size else 1
+            keys, lines, (total_quantity, total_revenue) = _group_sums(periods * span + (split - low), quantity, revenue)
+            periods, group_keys = np.floor_divide(keys, span), keys % span + low
+
+        frame = pd.DataFrame({
+            "total_quantity": total_quantity.astype(np.int64),
+            "total_revenue": total_revenue,
+            "line_items": lines
+        })
+        if group_keys is not None:
+            frame = self._key_column(frame, by, group_keys)
+        frame.insert(0, bucket, np.datetime_as_string(periods.astype(f"datetime64[{BUCKETS[bucket]}]")))
+        return frame
+
+    # ========== Combine Templates ==========
+    def franchise_sales(self) -> pd.DataFrame:
+        """'Analisis Penjualan per Franchise': total quantity and transactions per franchise"""
+        frame = self.totals("franchise")
+        frame = frame.rename(columns={"id_franchise": "_id", "total_quantity": "total_sales", "transactions": "transaction_count"})
+        frame["avg_sales"] = frame["total_sales"] / frame["transaction_count"]
+        return frame[["_id", "total_sales", "transaction_count", "avg_sales"]]
+
+    def franchise_product_sales(self, prices: Optional[Mapping[str, float]] = None) -> pd.DataFrame:
+        """'Analisis Penjualan Minuman per Franchise': quantity and revenue per franchise and product"""
+        data = self.select(["franchise", "product", "quantity"])
+        franchises, codes, quantity = data["franchise"].astype(np.int64), data["product"].astype(np.int64), data["quantity"]
+        revenue = quantity * self.price_vector(prices)[codes]
+        span = len(self.product_ids()) or 1
+        keys, _, (total_quantity, total_revenue) = _group_sums(franchises * span + codes, quantity, revenue)
+        frame = self._key_column(pd.DataFrame({
+            "total_quantity": total_quantity.astype(np.int64),
+            "total_revenue": total_revenue
+        }), "product", keys % span)
+        frame.insert(0, "id_franchise", np.floor_divide(keys, span))
+        return frame.sort_values(["id_franchise", "total_quantity"], ascending=[True, False], ignore_index=True)
+
+    def template(self, name: str) -> pd.DataFrame:
+        if name not in TEMPLATE_QUERIES:
+            raise KeyError(f"Template '{name}' tidak tersedia di line-item arrays")
+        return getattr(self, TEMPLATE_QUERIES[name])()
+
+
+_arrays: Dict[str, LineItemArrays] = {}
+_arrays_lock = threading.Lock()
+
+
+def get_line_item_arrays(path: str = DEFAULT_ARRAY_PATH) -> LineItemArrays:
+    """Return the process-wide LineItemArrays for `path`"""
+    with _arrays_lock:
+        if path not in _arrays:
+            _arrays[path] = LineItemArrays(path)
+        return _arrays[path]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Line-item arrays (numpy mmap) transactionlog untuk metrik revenue")
+    parser.add_argument("command", choices=["build", "status", "top", "buckets"])
+    parser.add_argument("--source", default=BASE_COLLECTION)
+    parser.add_argument("--path", default=DEFAULT_ARRAY_PATH)
+    parser.add_argument("--full", action="store_true", help="Bangun ulang dari awal")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BUILD_BATCH_SIZE)
+    parser.add_argument("--by", choices=list(GROUP_KEYS), default=None)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--metric", choices=METRICS, default="total_revenue")
+    parser.add_argument("--bucket", choices=list(BUCKETS), default="month")
+    parser.add_argument("--start-date")
+    parser.add_argument("--end-date")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    arrays = get_line_item_arrays(args.path)
+
+    if args.command == "build":
+        print(arrays.build(get_mongo_db(MONGO_DB), args.source, args.batch_size, full=args.full))
+    elif args.command == "status":
+        meta = arrays.meta
+        if not meta:
+            print("Line-item arrays belum dibangun")
+            return
+        size = sum(array.nbytes for array in arrays.arrays().values())
+        print(f"{meta['source']}: {meta['transactions']:,} transaksi, {meta['rows']:,} line item ({size / 2**20:.1f} MiB), "
+              f"{len(meta['products'])} produk, watermark {meta['watermark']}, dibangun {meta['built_at']}")
+    elif args.command == "top":
+        frame = arrays.top_n(args.by or "product", args.top, args.metric, start_date=args.start_date, end_date=args.end_date)
+        print(frame.to_string(index=False))
+    else:
+        frame = arrays.time_buckets(args.bucket, args.by, start_date=args.start_date, end_date=args.end_date)
+        print(frame.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
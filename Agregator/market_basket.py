@@ -0,0 +1,276 @@
+"""
+Market-basket engine untuk cross_selling_analysis.
+
+Pasangan produk dihitung di dalam MongoDB: produk unik per transaksi dipasangkan
+dengan dirinya sendiri (`$unwind` dua kali + `$lt`) lalu di-`$group`. Yang
+dikirim ke client hanya tabel hitungan kecil per franchise (jumlah basket,
+jumlah per produk, jumlah per pasangan), tidak pernah basket mentah. Support,
+confidence, dan lift dihitung dari tabel hitungan itu.
+
+Hitungan bisa dihitung langsung (live) atau dipelihara inkremental di
+collection basket_counts: transaksi dengan id_transaction di atas watermark
+terakhir di-`$merge` dengan menambahkan hitungannya.
+
+    python market_basket.py refresh            # inkremental sejak watermark
+    python market_basket.py refresh --full     # hitung ulang dari awal
+    python market_basket.py rules --by-franchise --top 5
+"""
+import argparse
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from cache import bump_data_version
+from connection import MONGO_DB, get_mongo_db
+from rollup import ROLLUP_STATE_COLLECTION, SOURCE_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+COUNTS_COLLECTION = "basket_counts"
+STATE_PREFIX = "market_basket:"
+
+
+# ========== Pipelines ==========
+BASKET_PROJECT_STAGE = {
+    "$project": {
+        "_id": 0,
+        "f": "$id_franchise",
+        "items": {"$setUnion": [{"$ifNull": ["$product.id_product", []]}, []]}
+    }
+}
+
+
+def basket_count_facets() -> Dict[str, List[Dict[str, Any]]]:
+    """Sub-pipelines (after BASKET_PROJECT_STAGE) for basket, item and pair counts"""
+    return {
+        "baskets": [
+            {
+                "$group": {
+                    "_id": {"kind": "basket", "f": "$f", "a": None, "b": None},
+                    "count": {"$sum": 1},
+                    "multi": {"$sum": {"$cond": [{"$gt": [{"$size": "$items"}, 1]}, 1, 0]}}
+                }
+            }
+        ],
+        "items": [
+            {"$unwind": "$items"},
+            {"$group": {"_id": {"kind": "item", "f": "$f", "a": "$items", "b": None}, "count": {"$sum": 1}}}
+        ],
+        "pairs": [
+            {"$match": {"items.1": {"$exists": True}}},
+            {"$project": {"f": 1, "a": "$items", "b": "$items"}},
+            {"$unwind": "$a"},
+            {"$unwind": "$b"},
+            {"$match": {"$expr": {"$lt": ["$a", "$b"]}}},
+            {"$group": {"_id": {"kind": "pair", "f": "$f", "a": "$a", "b": "$b"}, "count": {"$sum": 1}}}
+        ]
+    }
+
+
+def basket_counts_branches() -> Dict[str, List[Dict[str, Any]]]:
+    """Standalone pipelines per count kind, for multi_aggregate.run_multi"""
+    return {kind: [BASKET_PROJECT_STAGE] + stages for kind, stages in basket_count_facets().items()}
+
+
+def merge_count_branches(results: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Count documents from per-kind branch results"""
+    return [doc for kind in basket_count_facets() for doc in results.get(kind, [])]
+
+
+def basket_counts_pipeline(match: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    One pass over the transactions producing count documents
+    {_id: {kind, f, a, b}, count[, multi]} with kind basket/item/pair per
+    franchise `f`. Pairs are canonical (a < b).
+    """
+    facets = basket_count_facets()
+    return ([{"$match": match}] if match else []) + [
+        BASKET_PROJECT_STAGE,
+        {"$facet": facets},
+        {"$project": {"counts": {"$concatArrays": [f"${kind}" for kind in facets]}}},
+        {"$unwind": "$counts"},
+        {"$replaceRoot": {"newRoot": "$counts"}}
+    ]
+
+
+def _increment_merge_stage() -> Dict[str, Any]:
+    # Hitungan batch baru ditambahkan ke hitungan yang sudah ada
+    return {
+        "$merge": {
+            "into": COUNTS_COLLECTION,
+            "on": "_id",
+            "whenMatched": [{
+                "$set": {
+                    "count": {"$add": ["$count", "$$new.count"]},
+                    "multi": {"$add": [{"$ifNull": ["$multi", 0]}, {"$ifNull": ["$$new.multi", 0]}]}
+                }
+            }],
+            "whenNotMatched": "insert"
+        }
+    }
+
+
+# ========== Counts ==========
+def live_counts(collection, match: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Count documents computed on the fly from the transaction collection"""
+    return list(collection.aggregate(basket_counts_pipeline(match), allowDiskUse=True))
+
+
+def materialized_counts(db) -> List[Dict[str, Any]]:
+    return list(db[COUNTS_COLLECTION].find({}))
+
+
+def basket_state(db, source: str = SOURCE_COLLECTION) -> Optional[Dict[str, Any]]:
+    return db[ROLLUP_STATE_COLLECTION].find_one({"_id": STATE_PREFIX + source})
+
+
+def newest_transaction_id(db, source: str = SOURCE_COLLECTION):
+    newest = db[source].find_one({}, {"id_transaction": 1}, sort=[("id_transaction", -1)])
+    return newest["id_transaction"] if newest else None
+
+
+def counts_available(db, source: str = SOURCE_COLLECTION) -> bool:
+    """True when basket_counts is built and covers the newest id_transaction"""
+    state = basket_state(db, source)
+    if not (state and state.get("watermark") is not None):
+        return False
+    newest = newest_transaction_id(db, source)
+    if newest is not None and newest > state["watermark"]:
+        logger.warning(
+            f"{COUNTS_COLLECTION} basi (watermark {state['watermark']}, id_transaction terbaru {newest}); "
+            "memakai hitungan live. Jalankan `python market_basket.py refresh`."
+        )
+        return False
+    return True
+
+
+def refresh_basket_counts(db, source: str = SOURCE_COLLECTION, full: bool = False) -> Dict[str, Any]:
+    """
+    Fold transactions with id_transaction above the stored watermark into
+    basket_counts. Assumes transactions are append-only with increasing ids;
+    use `full` after edits or deletes.
+    """
+    state = basket_state(db, source)
+    if full:
+        # Watermark dihapus bersama tabelnya: jika $merge gagal, counts_available
+        # tidak menganggap tabel kosong/parsial sebagai hasil yang lengkap
+        db[ROLLUP_STATE_COLLECTION].update_one({"_id": STATE_PREFIX + source}, {"$unset": {"watermark": ""}})
+        db[COUNTS_COLLECTION].drop()
+    low = None if full else (state or {}).get("watermark")
+
+    high = newest_transaction_id(db, source)
+    if high is None:
+        logger.warning(f"Collection {source} kosong, hitungan basket tidak dibangun")
+        return {'refreshed': False}
+    if low is not None and low >= high:
+        return {'refreshed': False, 'watermark': low}
+
+    id_filter = {"$lte": high}
+    if low is not None:
+        id_filter["$gt"] = low
+    started = datetime.now()
+    db[source].aggregate(basket_counts_pipeline({"id_transaction": id_filter}) + [_increment_merge_stage()], allowDiskUse=True)
+    seconds = (datetime.now() - started).total_seconds()
+
+    db[ROLLUP_STATE_COLLECTION].update_one(
+        {"_id": STATE_PREFIX + source},
+        {"$set": {"watermark": high, "refreshed_at": datetime.now()}},
+        upsert=True
+    )
+    try:
+        bump_data_version(db, "mongodb", COUNTS_COLLECTION)
+    except Exception as e:
+        logger.warning(f"Gagal menandai versi data {COUNTS_COLLECTION}: {e}")
+
+    logger.info(f"Hitungan basket {source}: id_transaction {low or 0}..{high} dalam {seconds:.2f}s")
+    return {'refreshed': True, 'from': low, 'watermark': high, 'seconds': seconds}
+
+
+# ========== Rules ==========
+def _counts_frame(counts: List[Dict[str, Any]]) -> pd.DataFrame:
+    frame = pd.DataFrame([
+        {**doc['_id'], 'count': doc.get('count', 0), 'multi': doc.get('multi', 0)}
+        for doc in counts
+    ], columns=['kind', 'f', 'a', 'b', 'count', 'multi'])
+    return frame
+
+
+def association_rules(counts: List[Dict[str, Any]], by_franchise: bool = False, min_support: float = 0.0, top_n: Optional[int] = 20) -> Dict[str, Any]:
+    """
+    Pair support, confidence (a->b and b->a) and lift from count documents.
+    With by_franchise every rule and summary row carries `id_franchise` and
+    `top_n` applies per franchise.
+    """
+    frame = _counts_frame(counts)
+    keys = ['f'] if by_franchise else []
+    if frame.empty:
+        return {'summary': [] if by_franchise else {'total_transactions': 0, 'multi_product_transactions': 0, 'unique_pairs': 0}, 'rules': []}
+
+    def totals(kind: str, columns: List[str], value_columns: List[str]) -> pd.DataFrame:
+        subset = frame[frame['kind'] == kind]
+        if not columns:
+            return subset[value_columns].sum().to_frame().T
+        return subset.groupby(columns, as_index=False)[value_columns].sum()
+
+    baskets = totals('basket', keys, ['count', 'multi']).rename(columns={'count': 'transactions', 'multi': 'multi_transactions'})
+    items = totals('item', keys + ['a'], ['count'])
+    pairs = totals('pair', keys + ['a', 'b'], ['count'])
+
+    pair_counts = pairs.groupby(keys).size().rename('unique_pairs').reset_index() if keys else None
+    if keys:
+        rules = pairs.merge(baskets, on=keys, how='left')
+        summary = baskets.merge(pair_counts, on=keys, how='left').fillna({'unique_pairs': 0})
+    else:
+        rules = pairs.assign(transactions=baskets['transactions'].iloc[0], multi_transactions=baskets['multi_transactions'].iloc[0])
+        summary = {
+            'total_transactions': int(baskets['transactions'].iloc[0]),
+            'multi_product_transactions': int(baskets['multi_transactions'].iloc[0]),
+            'unique_pairs': int(len(pairs))
+        }
+
+    rules = rules.merge(items.rename(columns={'count': 'count_a'}), on=keys + ['a'], how='left')
+    rules = rules.merge(items.rename(columns={'a': 'b', 'count': 'count_b'}), on=keys + ['b'], how='left')
+    rules['support'] = rules['count'] / rules['transactions']
+    rules['confidence'] = rules['count'] / rules['count_a']
+    rules['confidence_reverse'] = rules['count'] / rules['count_b']
+    rules['lift'] = rules['count'] * rules['transactions'] / (rules['count_a'] * rules['count_b'])
+    rules = rules[rules['support'] >= min_support]
+
+    rules = rules.sort_values(keys + ['count', 'a', 'b'], ascending=[True] * len(keys) + [False, True, True])
+    if top_n is not None:
+        rules = rules.groupby(keys, sort=False).head(top_n) if keys else rules.head(top_n)
+
+    rules = rules.rename(columns={'f': 'id_franchise', 'a': 'product1', 'b': 'product2', 'count': 'frequency'})
+    columns = (['id_franchise'] if keys else []) + ['product1', 'product2', 'frequency', 'support', 'confidence', 'confidence_reverse', 'lift']
+    if keys:
+        summary = summary.rename(columns={'f': 'id_franchise'}).to_dict('records')
+    return {'summary': summary, 'rules': rules[columns].to_dict('records')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hitungan pasangan produk (market basket) untuk cross-selling")
+    parser.add_argument("command", choices=["refresh", "rules"])
+    parser.add_argument("--source", default=SOURCE_COLLECTION)
+    parser.add_argument("--full", action="store_true", help="Hitung ulang basket_counts dari awal")
+    parser.add_argument("--by-franchise", action="store_true")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--live", action="store_true", help="Hitung langsung dari collection sumber")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db = get_mongo_db(MONGO_DB)
+
+    if args.command == "refresh":
+        print(refresh_basket_counts(db, args.source, full=args.full))
+        return
+
+    counts = live_counts(db[args.source]) if args.live or not counts_available(db, args.source) else materialized_counts(db)
+    result = association_rules(counts, by_franchise=args.by_franchise, top_n=args.top)
+    print(result['summary'] if not args.by_franchise else pd.DataFrame(result['summary']).to_string(index=False))
+    print(pd.DataFrame(result['rules']).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Multi-aggregation engine: beberapa pipeline atas collection yang sama
+digabung menjadi satu `$facet` sehingga collection hanya di-scan sekali.
+
+Aturan penggabungan:
+  - `$match` pembuka yang identik di semua pipeline dipindah ke depan `$facet`
+    (masih bisa memakai index).
+  - Stage bersama (mis. `$addFields` calculated_revenue) dihitung sekali
+    sebelum `$facet` dan dibuang dari setiap cabang selama di depannya hanya
+    ada `$match`. Stage bersama hanya boleh menambah field.
+  - Pipeline dengan stage yang tidak boleh ada di dalam `$facet` ($out,
+    $merge, $facet, ...) dijalankan terpisah.
+
+Hasil `$facet` adalah satu dokumen (batas 16MB), jadi setiap cabang harus
+berakhir dengan hasil yang sudah teragregasi, bukan dokumen mentah.
+"""
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FACET_FORBIDDEN_STAGES = {
+    "$collStats", "$facet", "$geoNear", "$indexStats", "$out", "$merge",
+    "$planCacheStats", "$search", "$searchMeta", "$changeStream"
+}
+
+
+def stage_name(stage: Dict[str, Any]) -> str:
+    return next(iter(stage))
+
+
+def facet_compatible(pipeline: List[Dict[str, Any]]) -> bool:
+    """Whether the pipeline may run as a $facet sub-pipeline"""
+    return bool(pipeline) and not any(stage_name(stage) in FACET_FORBIDDEN_STAGES for stage in pipeline)
+
+
+def _common_match_prefix(pipelines: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    # Cabang tidak boleh kosong, jadi stage terakhir setiap pipeline tidak ikut dipindah
+    prefix = []
+    for stages in zip(*[pipeline[:-1] for pipeline in pipelines]):
+        first = stages[0]
+        if stage_name(first) != "$match" or any(stage != first for stage in stages[1:]):
+            break
+        prefix.append(first)
+    return prefix
+
+
+def _strip_shared(pipeline: List[Dict[str, Any]], shared_stages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop shared stages that are preceded only by $match stages"""
+    branch = []
+    filtering = True
+    for stage in pipeline:
+        if filtering and stage in shared_stages:
+            continue
+        if stage_name(stage) != "$match":
+            filtering = False
+        branch.append(stage)
+    return branch or [{"$match": {}}]
+
+
+def combine_pipelines(
+    pipelines: Dict[str, List[Dict[str, Any]]],
+    shared_stages: Optional[List[Dict[str, Any]]] = None) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """
+    One pipeline computing every entry of `pipelines` in a single scan.
+    Returns the pipeline and the mapping name -> $facet output field.
+    """
+    shared_stages = list(shared_stages or [])
+    prefix = _common_match_prefix(list(pipelines.values()))
+    # Nama facet tidak boleh berisi "." atau diawali "$", jadi dipetakan ke q0, q1, ...
+    fields = {name: f"q{position}" for position, name in enumerate(pipelines)}
+    facet = {
+        fields[name]: _strip_shared(pipeline[len(prefix):], shared_stages)
+        for name, pipeline in pipelines.items()
+    }
+    return prefix + shared_stages + [{"$facet": facet}], fields
+
+
+def run_multi(
+    collection,
+    pipelines: Dict[str, List[Dict[str, Any]]],
+    shared_stages: Optional[List[Dict[str, Any]]] = None,
+    allow_disk_use: bool = True,
+    on_pipeline: Optional[Callable[[List[Dict[str, Any]]], Any]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Run several aggregations over `collection`, sharing one scan for every
+    $facet-compatible pipeline. Results come back per name, in input order.
+    `on_pipeline` is called with each pipeline actually sent to the server.
+    """
+    results: Dict[str, List[Dict[str, Any]]] = {}
+
+    def aggregate(pipeline):
+        if on_pipeline is not None:
+            on_pipeline(pipeline)
+        return list(collection.aggregate(pipeline, allowDiskUse=allow_disk_use))
+
+    compatible = {name: pipeline for name, pipeline in pipelines.items() if facet_compatible(pipeline)}
+    for name, pipeline in pipelines.items():
+        if name not in compatible:
+            results[name] = aggregate(pipeline)
+
+    if len(compatible) == 1:
+        name, pipeline = next(iter(compatible.items()))
+        results[name] = aggregate(pipeline)
+    elif compatible:
+        combined, fields = combine_pipelines(compatible, shared_stages)
+        documents = aggregate(combined)
+        document = documents[0] if documents else {}
+        for name, field in fields.items():
+            results[name] = document.get(field, [])
+        logger.info(f"{len(compatible)} aggregasi dijalankan dalam satu scan {collection.name}")
+
+    return {name: results[name] for name in pipelines}
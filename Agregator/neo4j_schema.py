@@ -0,0 +1,197 @@
+"""
+Schema manager Neo4j untuk key lookup graph cafe.
+
+Skenario "optimized" dan "non-optimized" di dashboard dan benchmark sekarang
+berbeda di sisi server, bukan hanya teks query:
+
+  none         tanpa constraint/index pada key lookup (label scan)
+  indexed      range index pada key lookup + text index untuk key string
+  constrained  uniqueness constraint (sekaligus range index) + index sekunder
+
+Key juga dinormalisasi ke integer (id_cafe, id_employee) agar sama dengan
+tipe di MongoDB dan parameter `$cafe_ids` dari dashboard.
+
+    python neo4j_schema.py status
+    python neo4j_schema.py apply constrained
+    python neo4j_schema.py normalize
+"""
+import argparse
+import logging
+import time
+from typing import Any, Dict, List, Tuple
+
+from cache import bump_data_version
+from connection import MONGO_DB, NEO4J_DATABASE, get_mongo_db, get_neo4j_driver
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_STATES = ["none", "indexed", "constrained"]
+DEFAULT_OPTIMIZED_STATE = "constrained"
+INDEX_WAIT_SECONDS = 300
+
+# (label, property) yang dipakai MATCH/MERGE berdasarkan key
+LOOKUP_KEYS: List[Tuple[str, str]] = [
+    ("Franchise", "id_cafe"),
+    ("Daerah", "id_cafe"),
+    ("Employee", "id_employee"),
+    ("Product", "id_product")
+]
+SECONDARY_RANGE_KEYS: List[Tuple[str, str]] = [("Employee", "id_cafe")]
+TEXT_KEYS: List[Tuple[str, str]] = [("Product", "id_product"), ("Product", "name")]
+
+# Key yang disimpan sebagai integer (sama dengan id_franchise/id_employee di MongoDB)
+INTEGER_KEYS: List[Tuple[str, str]] = [
+    ("Franchise", "id_cafe"),
+    ("Daerah", "id_cafe"),
+    ("Employee", "id_employee"),
+    ("Employee", "id_cafe")
+]
+
+
+def _constraint(label: str, prop: str) -> Tuple[str, str]:
+    # Nama sama dengan constraint yang dibuat KGC/graph_loader.py
+    name = f"{label.lower()}_{prop}"
+    return name, f"CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE"
+
+
+def _range_index(label: str, prop: str) -> Tuple[str, str]:
+    name = f"{label.lower()}_{prop}_range"
+    return name, f"CREATE RANGE INDEX {name} IF NOT EXISTS FOR (n:{label}) ON (n.{prop})"
+
+
+def _text_index(label: str, prop: str) -> Tuple[str, str]:
+    name = f"{label.lower()}_{prop}_text"
+    return name, f"CREATE TEXT INDEX {name} IF NOT EXISTS FOR (n:{label}) ON (n.{prop})"
+
+
+def desired_schema(state: str) -> Dict[str, Dict[str, str]]:
+    """Constraints and indexes (name -> CREATE statement) for a schema state"""
+    if state not in SCHEMA_STATES:
+        raise ValueError(f"state harus salah satu dari {SCHEMA_STATES}")
+    constraints: Dict[str, str] = {}
+    indexes: Dict[str, str] = {}
+    if state == "indexed":
+        indexes.update(_range_index(label, prop) for label, prop in LOOKUP_KEYS)
+    elif state == "constrained":
+        constraints.update(_constraint(label, prop) for label, prop in LOOKUP_KEYS)
+    if state != "none":
+        indexes.update(_range_index(label, prop) for label, prop in SECONDARY_RANGE_KEYS)
+        indexes.update(_text_index(label, prop) for label, prop in TEXT_KEYS)
+    return {'constraints': constraints, 'indexes': indexes}
+
+
+def managed_names() -> Dict[str, set]:
+    constraints, indexes = set(), set()
+    for state in SCHEMA_STATES:
+        schema = desired_schema(state)
+        constraints.update(schema['constraints'])
+        indexes.update(schema['indexes'])
+    return {'constraints': constraints, 'indexes': indexes}
+
+
+def current_schema(driver, database: str = NEO4J_DATABASE) -> Dict[str, set]:
+    """Managed constraints and standalone indexes that currently exist"""
+    managed = managed_names()
+    with driver.session(database=database) as session:
+        constraints = {r["name"] for r in session.run("SHOW CONSTRAINTS YIELD name")}
+        indexes = {r["name"] for r in session.run("SHOW INDEXES YIELD name")}
+    return {
+        'constraints': constraints & managed['constraints'],
+        'indexes': indexes & managed['indexes']
+    }
+
+
+def detect_schema_state(driver, database: str = NEO4J_DATABASE) -> str:
+    """Name of the schema state that matches the database, or 'custom'"""
+    current = current_schema(driver, database)
+    for state in SCHEMA_STATES:
+        schema = desired_schema(state)
+        if set(schema['constraints']) == current['constraints'] and set(schema['indexes']) == current['indexes']:
+            return state
+    return "custom"
+
+
+def apply_schema(driver, state: str, database: str = NEO4J_DATABASE) -> Dict[str, Any]:
+    """
+    Move the managed part of the schema to `state`: drop what the state does
+    not include, create what is missing, then wait until indexes are ONLINE.
+    Drops run first because a range index and a uniqueness constraint on the
+    same property cannot coexist.
+    """
+    started = time.perf_counter()
+    desired = desired_schema(state)
+    current = current_schema(driver, database)
+    dropped, created = [], []
+
+    with driver.session(database=database) as session:
+        for name in sorted(current['constraints'] - set(desired['constraints'])):
+            session.run(f"DROP CONSTRAINT {name} IF EXISTS").consume()
+            dropped.append(name)
+        for name in sorted(current['indexes'] - set(desired['indexes'])):
+            session.run(f"DROP INDEX {name} IF EXISTS").consume()
+            dropped.append(name)
+
+        for kind in ('constraints', 'indexes'):
+            for name, statement in sorted(desired[kind].items()):
+                if name not in current[kind]:
+                    session.run(statement).consume()
+                    created.append(name)
+
+        if created:
+            session.run("CALL db.awaitIndexes($seconds)", seconds=INDEX_WAIT_SECONDS).consume()
+
+    seconds = time.perf_counter() - started
+    if dropped or created:
+        logger.info(f"Schema Neo4j -> {state}: +{len(created)} -{len(dropped)} dalam {seconds:.2f}s")
+    return {'state': state, 'created': created, 'dropped': dropped, 'seconds': seconds}
+
+
+def normalize_key_types(driver, database: str = NEO4J_DATABASE) -> Dict[str, int]:
+    """Convert numeric-string keys (e.g. id_cafe "1") to integers in place"""
+    converted = {}
+    with driver.session(database=database) as session:
+        for label, prop in INTEGER_KEYS:
+            summary = session.run(
+                f"""
+                MATCH (n:{label})
+                WHERE toInteger(n.{prop}) IS NOT NULL AND n.{prop} <> toInteger(n.{prop})
+                SET n.{prop} = toInteger(n.{prop})
+                """
+            ).consume()
+            converted[f"{label}.{prop}"] = summary.counters.properties_set
+
+    try:
+        bump_data_version(get_mongo_db(MONGO_DB), "neo4j", database)
+    except Exception as e:
+        logger.warning(f"Gagal menandai versi data Neo4j {database}: {e}")
+    return converted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kelola constraint & index Neo4j untuk key lookup")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status")
+    apply_parser = subparsers.add_parser("apply")
+    apply_parser.add_argument("state", choices=SCHEMA_STATES)
+    subparsers.add_parser("normalize")
+    parser.add_argument("--database", default=NEO4J_DATABASE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    driver = get_neo4j_driver()
+
+    if args.command == "status":
+        current = current_schema(driver, args.database)
+        print(f"State: {detect_schema_state(driver, args.database)}")
+        print(f"  constraints: {', '.join(sorted(current['constraints'])) or '-'}")
+        print(f"  indexes: {', '.join(sorted(current['indexes'])) or '-'}")
+    elif args.command == "apply":
+        report = apply_schema(driver, args.state, args.database)
+        print(f"State {report['state']}: dibuat {report['created'] or '-'}, dihapus {report['dropped'] or '-'} ({report['seconds']:.2f}s)")
+    elif args.command == "normalize":
+        for key, count in normalize_key_types(driver, args.database).items():
+            print(f"{key}: {count} nilai dikonversi ke integer")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Server-side query profiling: MongoDB explain("executionStats") and Cypher
+PROFILE/EXPLAIN, plus a regression check that flags full scans.
+
+    python profiling.py            # cek regresi untuk query contoh dashboard
+"""
+import argparse
+import json
+import logging
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from connection import MONGO_DB, NEO4J_DATABASE, get_mongo_db, get_neo4j_driver
+from queries import record_to_dict, resolve_collection
+
+logger = logging.getLogger(__name__)
+
+# Operator Neo4j yang menandakan scan penuh (tanpa index)
+NEO4J_SCAN_OPERATORS = {"AllNodesScan", "NodeByLabelScan", "DirectedAllRelationshipsScan", "UndirectedAllRelationshipsScan"}
+NEO4J_INDEX_OPERATORS = {
+    "NodeIndexSeek", "NodeUniqueIndexSeek", "NodeIndexScan", "NodeIndexContainsScan", "NodeIndexEndsWithScan",
+    "NodeIndexSeekByRange", "NodeUniqueIndexSeekByRange", "MultiNodeIndexSeek",
+    "DirectedRelationshipIndexSeek", "UndirectedRelationshipIndexSeek"
+}
+
+
+# ========== MongoDB ==========
+def _walk_plan(node, stages: List[Dict[str, Any]]):
+    """Collect every plan stage (with its index name, if any) from an explain tree"""
+    if isinstance(node, dict):
+        if 'stage' in node:
+            stages.append({
+                'stage': node['stage'],
+                'index_name': node.get('indexName'),
+                'key_pattern': node.get('keyPattern'),
+                'docs_examined': node.get('docsExamined'),
+                'keys_examined': node.get('keysExamined'),
+                'returned': node.get('nReturned')
+            })
+        for key, value in node.items():
+            if key != 'rejectedPlans':
+                _walk_plan(value, stages)
+    elif isinstance(node, list):
+        for item in node:
+            _walk_plan(item, stages)
+
+
+def _find_execution_stats(node) -> List[Dict[str, Any]]:
+    found = []
+    if isinstance(node, dict):
+        if 'executionStats' in node and isinstance(node['executionStats'], dict):
+            found.append(node['executionStats'])
+        for key, value in node.items():
+            if key != 'executionStats':
+                found.extend(_find_execution_stats(value))
+    elif isinstance(node, list):
+        for item in node:
+            found.extend(_find_execution_stats(item))
+    return found
+
+
+def summarize_mongo_explain(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a raw explain document to the numbers that matter"""
+    stages = []
+    execution_stats = _find_execution_stats(explain)
+    # executionStages lebih dulu karena membawa angka docs/keys examined per stage
+    for stats in execution_stats:
+        _walk_plan(stats.get('executionStages'), stages)
+    _walk_plan(explain, stages)
+
+    # Stage dari queryPlanner dan executionStages bisa dobel; cukup per nama+index
+    unique_stages = []
+    seen = set()
+    for stage in stages:
+        key = (stage['stage'], stage['index_name'])
+        if key not in seen:
+            seen.add(key)
+            unique_stages.append(stage)
+
+    stage_names = [s['stage'] for s in unique_stages]
+    return {
+        'docs_examined': sum(s.get('totalDocsExamined', 0) for s in execution_stats),
+        'keys_examined': sum(s.get('totalKeysExamined', 0) for s in execution_stats),
+        'returned': sum(s.get('nReturned', 0) for s in execution_stats),
+        'execution_time_ms': max((s.get('executionTimeMillis', 0) for s in execution_stats), default=0),
+        'stages': unique_stages,
+        'index_names': sorted({s['index_name'] for s in unique_stages if s['index_name']}),
+        'collscan': 'COLLSCAN' in stage_names,
+        'ixscan': any(name in ('IXSCAN', 'EXPRESS_IXSCAN', 'IDHACK') for name in stage_names)
+    }
+
+
+def explain_mongo(db, collection_name: str, query_type: str = "find", query=None, projection=None, verbosity: str = "executionStats") -> Dict[str, Any]:
+    """Run explain for a find/aggregate and return the raw explain plus a summary"""
+    if query_type == "find":
+        command = {"find": collection_name, "filter": query or {}}
+        if projection:
+            command["projection"] = projection
+    elif query_type == "aggregate":
+        if not isinstance(query, list):
+            raise ValueError("Aggregation query harus dalam bentuk list pipeline.")
+        command = {"aggregate": collection_name, "pipeline": query, "cursor": {}}
+    else:
+        raise ValueError("query_type harus 'find' atau 'aggregate'")
+
+    explain = db.command("explain", command, verbosity=verbosity)
+    summary = summarize_mongo_explain(explain)
+    summary['collection'] = collection_name
+    return {'summary': summary, 'raw': explain}
+
+
+# ========== Neo4j ==========
+def _flatten_operators(plan: Dict[str, Any], depth: int = 0) -> List[Dict[str, Any]]:
+    args = plan.get('args', {}) or {}
+    operator = {
+        'depth': depth,
+        'operator': plan.get('operatorType', '').split('@')[0],
+        'details': args.get('Details', ''),
+        'identifiers': ", ".join(plan.get('identifiers', [])),
+        'estimated_rows': args.get('EstimatedRows'),
+        'db_hits': plan.get('dbHits', args.get('DbHits')),
+        'rows': plan.get('rows', args.get('Rows'))
+    }
+    operators = [operator]
+    for child in plan.get('children', []) or []:
+        operators.extend(_flatten_operators(child, depth + 1))
+    return operators
+
+
+def summarize_cypher_plan(plan: Optional[Dict[str, Any]], profiled: bool) -> Dict[str, Any]:
+    operators = _flatten_operators(plan) if plan else []
+    names = {op['operator'] for op in operators}
+    return {
+        'profiled': profiled,
+        'operators': operators,
+        'total_db_hits': sum(op['db_hits'] or 0 for op in operators) if profiled else None,
+        'rows': operators[0]['rows'] if operators and profiled else None,
+        'full_scan_operators': sorted(names & NEO4J_SCAN_OPERATORS),
+        'index_operators': sorted(names & NEO4J_INDEX_OPERATORS),
+        'full_scan': bool(names & NEO4J_SCAN_OPERATORS),
+        'uses_index': bool(names & NEO4J_INDEX_OPERATORS)
+    }
+
+
+def profile_cypher(driver, query: str, parameters=None, database: str = NEO4J_DATABASE, mode: str = "PROFILE") -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Run a Cypher query prefixed with PROFILE (executes, returns records and
+    real db hits/rows) or EXPLAIN (plan only, no records).
+    """
+    mode = mode.upper()
+    if mode not in ("PROFILE", "EXPLAIN"):
+        raise ValueError("mode harus 'PROFILE' atau 'EXPLAIN'")
+
+    stripped = query.lstrip()
+    if stripped.upper().startswith(("PROFILE", "EXPLAIN")):
+        stripped = stripped.split(None, 1)[1]
+
+    with driver.session(database=database) as session:
+        response = session.run(f"{mode} {stripped}", parameters or {})
+        records = [record_to_dict(record) for record in response]
+        result_summary = response.consume()
+
+    plan = result_summary.profile if mode == "PROFILE" else result_summary.plan
+    summary = summarize_cypher_plan(plan, profiled=(mode == "PROFILE"))
+    summary['result_available_after_ms'] = result_summary.result_available_after
+    summary['result_consumed_after_ms'] = result_summary.result_consumed_after
+    return records, summary
+
+
+# ========== Regression Check ==========
+def full_scan_findings(name: str, backend: str, summary: Dict[str, Any], min_docs_examined: int = 1000) -> List[str]:
+    """Return human-readable findings when a profiled query fell back to a full scan"""
+    findings = []
+    if backend == "mongodb":
+        if summary.get('collscan') and summary.get('docs_examined', 0) >= min_docs_examined:
+            findings.append(
+                f"{name}: COLLSCAN on {summary.get('collection')} "
+                f"({summary['docs_examined']:,} docs examined for {summary['returned']:,} returned)"
+            )
+    elif backend == "neo4j":
+        if summary.get('full_scan') and not summary.get('uses_index'):
+            findings.append(f"{name}: {', '.join(summary['full_scan_operators'])} without any index seek")
+    return findings
+
+
+# Query contoh dari sidebar dashboard yang seharusnya memakai index
+REGRESSION_CASES = [
+    {
+        'name': 'sidebar_find',
+        'backend': 'mongodb',
+        'query_type': 'find',
+        'query': {"transaction_date": "2024-12-07", "id_employee": 5, "product.quantity": 2, "order_quantity": {"$gt": 7}}
+    },
+    {
+        'name': 'sidebar_aggregate',
+        'backend': 'mongodb',
+        'query_type': 'aggregate',
+        'query': [{'$match': {'name': 'Jennifer Miller'}}, {'$group': {'_id': '$id_franchise'}}, {'$project': {'_id': 0, 'id_franchise': '$_id'}}]
+    },
+    {
+        'name': 'franchise_lookup',
+        'backend': 'neo4j',
+        'query': "MATCH (f:Franchise) WHERE f.id_cafe IN $cafe_ids MATCH (f)-[:IS_LOCATED]->(d:Daerah) RETURN f.id_cafe, d.kota",
+        'parameters': {"cafe_ids": [1, 2, 3]}
+    }
+]
+
+
+def regression_check(db=None, driver=None, cases=None, use_index: bool = True, min_docs_examined: int = 1000) -> Dict[str, Any]:
+    """Profile every case and collect full-scan findings"""
+    db = db if db is not None else get_mongo_db(MONGO_DB)
+    driver = driver if driver is not None else get_neo4j_driver()
+    cases = cases if cases is not None else REGRESSION_CASES
+
+    reports = []
+    findings = []
+    for case in cases:
+        if case['backend'] == 'mongodb':
+            collection, _ = resolve_collection(db, case.get('collection', 'transactionlog'), use_index)
+            summary = explain_mongo(db, collection.name, case['query_type'], case['query'])['summary']
+        else:
+            _, summary = profile_cypher(driver, case['query'], case.get('parameters'), mode="EXPLAIN")
+        case_findings = full_scan_findings(case['name'], case['backend'], summary, min_docs_examined)
+        findings.extend(case_findings)
+        reports.append({'name': case['name'], 'backend': case['backend'], 'summary': summary, 'findings': case_findings})
+
+    return {'passed': not findings, 'findings': findings, 'reports': reports}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cek regresi: tandai query yang jatuh ke full scan")
+    parser.add_argument("--without-index", action="store_true", help="Cek collection transactionlog (tanpa index)")
+    parser.add_argument("--min-docs-examined", type=int, default=1000)
+    parser.add_argument("--json", dest="json_path", help="Simpan laporan lengkap ke file JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = regression_check(use_index=not args.without_index, min_docs_examined=args.min_docs_examined)
+
+    for item in report['reports']:
+        status = "✗" if item['findings'] else "✓"
+        print(f"{status} {item['backend']:<8} {item['name']}")
+        for finding in item['findings']:
+            print(f"    - {finding}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+
+    sys.exit(0 if report['passed'] else 1)
+
+
+if __name__ == "__main__":
+    main()
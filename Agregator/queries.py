@@ -0,0 +1,187 @@
+import logging
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from neo4j.graph import Node, Path, Relationship
+
+logger = logging.getLogger(__name__)
+
+BASE_COLLECTION = "transactionlog"
+INDEXED_COLLECTION = "transactionlogindex"
+
+# Konversi hasil Cypher: bulk (to_df/values), stream (per chunk), record (per nilai)
+NEO4J_CONVERSION_MODES = ["bulk", "stream", "record"]
+DEFAULT_NEO4J_FETCH_SIZE = 1000
+DEFAULT_NEO4J_CHUNK_ROWS = 50_000
+
+
+def resolve_collection(db, collection_name: str, use_index: bool = True) -> Tuple[Any, str]:
+    """Pilih collection berdasarkan apakah menggunakan index atau tidak"""
+    if collection_name != BASE_COLLECTION:
+        # Collection turunan (mis. rollup) tidak punya varian berindex terpisah
+        return db[collection_name], f"from {collection_name}"
+    if use_index:
+        return db[INDEXED_COLLECTION], "with index"
+    return db[collection_name], "without index"
+
+
+def execute_mongo_query(collection, query_type: str = "find", query=None, projection=None) -> List[Dict[str, Any]]:
+    """Run a find/aggregate and return the documents as a list"""
+    if query_type == "find":
+        return list(collection.find(query or {}, projection))
+    elif query_type == "aggregate":
+        if not isinstance(query, list):
+            raise ValueError("Aggregation query harus dalam bentuk list pipeline.")
+        return list(collection.aggregate(query))
+    else:
+        raise ValueError("query_type harus 'find' atau 'aggregate'")
+
+
+def record_to_dict(record) -> Dict[str, Any]:
+    """Convert a Neo4j record to a plain dictionary"""
+    record_dict = {}
+    for key in record.keys():
+        value = record[key]
+        # Handle Neo4j node/relationship objects
+        if hasattr(value, '__dict__'):
+            if hasattr(value, 'items'):  # Node or Relationship
+                record_dict[key] = dict(value)
+            else:
+                record_dict[key] = str(value)
+        else:
+            record_dict[key] = value
+    return record_dict
+
+
+def execute_neo4j_query(driver, query: str, parameters: Optional[Dict[str, Any]] = None, database: str = "neo4j") -> List[Dict[str, Any]]:
+    """Run a Cypher query and return the records as a list of dictionaries"""
+    with driver.session(database=database) as session:
+        response = session.run(query, parameters or {})
+        return [record_to_dict(record) for record in response]
+
+
+# ========== Bulk Neo4j Conversion ==========
+def _path_nodes(path) -> List[Dict[str, Any]]:
+    return [dict(node) for node in path.nodes]
+
+
+def _to_native(value):
+    return value.to_native()
+
+
+def value_converter(value) -> Optional[Callable[[Any], Any]]:
+    """Converter for a column whose values look like `value`; None keeps values as they are"""
+    if isinstance(value, (Node, Relationship)):
+        return dict
+    if isinstance(value, Path):
+        return _path_nodes
+    if hasattr(value, "to_native"):
+        # neo4j.time Date/DateTime/Duration -> datetime/date/timedelta
+        return _to_native
+    if hasattr(value, "__dict__"):
+        return str
+    return None
+
+
+def _convert_value(value):
+    converter = value_converter(value)
+    return value if converter is None else converter(value)
+
+
+def convert_graph_columns(frame: pd.DataFrame, strategies: Optional[Dict[str, Optional[Callable]]] = None) -> pd.DataFrame:
+    """
+    Convert graph/temporal values column by column. The converter of a column
+    is decided once from its first non-null value and stored in `strategies`
+    (reused for later chunks of the same result); a column mixing kinds falls
+    back to per-value conversion.
+    """
+    strategies = strategies if strategies is not None else {}
+    for column in frame.columns:
+        if frame[column].dtype != object:
+            strategies.setdefault(column, None)
+            continue
+        if column not in strategies:
+            first = frame[column].first_valid_index()
+            if first is None:
+                continue
+            strategies[column] = value_converter(frame[column].at[first])
+        converter = strategies[column]
+        if converter is None:
+            continue
+        values = frame[column].tolist()
+        try:
+            frame[column] = [None if value is None else converter(value) for value in values]
+        except (TypeError, ValueError, AttributeError):
+            frame[column] = [None if value is None else _convert_value(value) for value in values]
+    return frame
+
+
+def result_to_frame(response) -> pd.DataFrame:
+    """Whole Cypher result as a DataFrame through the driver's bulk conversion"""
+    if hasattr(response, "to_df"):
+        frame = response.to_df()
+    else:
+        frame = pd.DataFrame(response.values(), columns=list(response.keys()))
+    return convert_graph_columns(frame)
+
+
+def _session(driver, database: str, fetch_size: Optional[int]):
+    config = {"database": database}
+    if fetch_size:
+        config["fetch_size"] = int(fetch_size)
+    return driver.session(**config)
+
+
+def execute_neo4j_frame(
+    driver,
+    query: str,
+    parameters: Optional[Dict[str, Any]] = None,
+    database: str = "neo4j",
+    fetch_size: Optional[int] = None) -> pd.DataFrame:
+    """Run a Cypher query and return the records as a DataFrame (bulk conversion)"""
+    with _session(driver, database, fetch_size) as session:
+        return result_to_frame(session.run(query, parameters or {}))
+
+
+def iter_neo4j_frames(
+    driver,
+    query: str,
+    parameters: Optional[Dict[str, Any]] = None,
+    database: str = "neo4j",
+    fetch_size: int = DEFAULT_NEO4J_FETCH_SIZE,
+    chunk_rows: int = DEFAULT_NEO4J_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Stream a Cypher result as DataFrame chunks of at most `chunk_rows` rows.
+    The server sends `fetch_size` records per pull, so only one chunk of
+    records is buffered at a time; column converters are decided on the
+    first chunk and reused.
+    """
+    strategies: Dict[str, Optional[Callable]] = {}
+    with _session(driver, database, fetch_size) as session:
+        response = session.run(query, parameters or {})
+        keys = list(response.keys())
+        records = iter(response)
+        while True:
+            rows = [record.values() for record in islice(records, chunk_rows)]
+            if not rows:
+                return
+            yield convert_graph_columns(pd.DataFrame(rows, columns=keys), strategies)
+
+
+def fetch_neo4j_frame(
+    driver,
+    query: str,
+    parameters: Optional[Dict[str, Any]] = None,
+    database: str = "neo4j",
+    conversion: str = "bulk",
+    fetch_size: Optional[int] = None) -> pd.DataFrame:
+    """Cypher result as a DataFrame using one of NEO4J_CONVERSION_MODES"""
+    if conversion not in NEO4J_CONVERSION_MODES:
+        raise ValueError(f"conversion harus salah satu dari {NEO4J_CONVERSION_MODES}")
+    if conversion == "record":
+        return pd.DataFrame(execute_neo4j_query(driver, query, parameters, database))
+    if conversion == "stream":
+        chunks = list(iter_neo4j_frames(driver, query, parameters, database, fetch_size or DEFAULT_NEO4J_FETCH_SIZE))
+        return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+    return execute_neo4j_frame(driver, query, parameters, database, fetch_size)
@@ -0,0 +1,424 @@
+"""
+Materialized rollup collections yang dipelihara di samping transactionlog.
+
+Rollup per hari x franchise, hari x franchise x produk, dan hari x employee
+dibangun dengan `$merge` sehingga analisis cukup membaca beberapa ribu dokumen
+rollup, bukan scan + `$unwind` 1,1 juta transaksi.
+
+    python rollup.py              # refresh inkremental mulai tanggal terakhir
+    python rollup.py --full       # bangun ulang semua rollup
+
+Setiap refresh mencatat jumlah dokumen transactionlog saat itu. Rollup yang
+jumlah dokumennya tertinggal dari collection sumber dianggap basi dan tidak
+dipakai (analisis kembali membaca transactionlog).
+"""
+import argparse
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from cache import bump_data_version
+from connection import MONGO_DB, get_mongo_db
+
+logger = logging.getLogger(__name__)
+
+SOURCE_COLLECTION = "transactionlog"
+ROLLUP_PREFIX = "rollup_"
+ROLLUP_DAILY_FRANCHISE = "rollup_daily_franchise"
+ROLLUP_DAILY_FRANCHISE_PRODUCT = "rollup_daily_franchise_product"
+ROLLUP_DAILY_EMPLOYEE = "rollup_daily_employee"
+ROLLUP_COLLECTIONS = [ROLLUP_DAILY_FRANCHISE, ROLLUP_DAILY_FRANCHISE_PRODUCT, ROLLUP_DAILY_EMPLOYEE]
+ROLLUP_STATE_COLLECTION = "rollup_state"
+
+# Harga tetap per item yang dipakai aggregator untuk calculated_revenue
+DEFAULT_UNIT_PRICE = 30000
+
+
+def _date_match(start_date: Optional[str], end_date: Optional[str]) -> List[Dict[str, Any]]:
+    date_filter = {}
+    if start_date:
+        date_filter["$gte"] = start_date
+    if end_date:
+        date_filter["$lte"] = end_date
+    return [{"$match": {"transaction_date": date_filter}}] if date_filter else []
+
+
+def _merge_stage(target: str) -> Dict[str, Any]:
+    # Satu hari selalu dihitung ulang utuh, jadi dokumen lama cukup diganti
+    return {"$merge": {"into": target, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}}
+
+
+def daily_franchise_pipeline(start_date=None, end_date=None) -> List[Dict[str, Any]]:
+    return _date_match(start_date, end_date) + [
+        {
+            "$group": {
+                "_id": {"date": "$transaction_date", "id_franchise": "$id_franchise"},
+                "transactions": {"$sum": 1},
+                "order_quantity": {"$sum": "$order_quantity"},
+                "product_quantity": {"$sum": {"$sum": "$product.quantity"}},
+                "line_items": {"$sum": {"$size": {"$ifNull": ["$product", []]}}}
+            }
+        },
+        {
+            "$project": {
+                "date": "$_id.date",
+                "month": {"$substr": ["$_id.date", 0, 7]},
+                "id_franchise": "$_id.id_franchise",
+                "transactions": 1,
+                "order_quantity": 1,
+                "product_quantity": 1,
+                "line_items": 1,
+                "revenue": {"$multiply": ["$order_quantity", DEFAULT_UNIT_PRICE]}
+            }
+        },
+        _merge_stage(ROLLUP_DAILY_FRANCHISE)
+    ]
+
+
+def daily_franchise_product_pipeline(start_date=None, end_date=None) -> List[Dict[str, Any]]:
+    return _date_match(start_date, end_date) + [
+        {"$unwind": "$product"},
+        {
+            "$group": {
+                "_id": {
+                    "date": "$transaction_date",
+                    "id_franchise": "$id_franchise",
+                    "id_product": "$product.id_product"
+                },
+                "product_name": {"$first": "$product.name"},
+                "quantity": {"$sum": "$product.quantity"},
+                # Produk unik per transaksi, jadi jumlah baris = jumlah transaksi yang memuat produk
+                "orders": {"$sum": 1},
+                "order_quantity": {"$sum": "$order_quantity"}
+            }
+        },
+        {
+            "$project": {
+                "date": "$_id.date",
+                "month": {"$substr": ["$_id.date", 0, 7]},
+                "id_franchise": "$_id.id_franchise",
+                "id_product": "$_id.id_product",
+                "product_name": 1,
+                "quantity": 1,
+                "orders": 1,
+                "order_quantity": 1
+            }
+        },
+        _merge_stage(ROLLUP_DAILY_FRANCHISE_PRODUCT)
+    ]
+
+
+def daily_employee_pipeline(start_date=None, end_date=None) -> List[Dict[str, Any]]:
+    return _date_match(start_date, end_date) + [
+        {
+            "$group": {
+                "_id": {"date": "$transaction_date", "id_employee": "$id_employee"},
+                "id_franchise": {"$first": "$id_franchise"},
+                "transactions": {"$sum": 1},
+                "order_quantity": {"$sum": "$order_quantity"}
+            }
+        },
+        {
+            "$project": {
+                "date": "$_id.date",
+                "month": {"$substr": ["$_id.date", 0, 7]},
+                "id_employee": "$_id.id_employee",
+                "id_franchise": 1,
+                "transactions": 1,
+                "order_quantity": 1,
+                "revenue": {"$multiply": ["$order_quantity", DEFAULT_UNIT_PRICE]}
+            }
+        },
+        _merge_stage(ROLLUP_DAILY_EMPLOYEE)
+    ]
+
+
+ROLLUP_PIPELINES = {
+    ROLLUP_DAILY_FRANCHISE: daily_franchise_pipeline,
+    ROLLUP_DAILY_FRANCHISE_PRODUCT: daily_franchise_product_pipeline,
+    ROLLUP_DAILY_EMPLOYEE: daily_employee_pipeline
+}
+
+ROLLUP_INDEXES = {
+    ROLLUP_DAILY_FRANCHISE: [[("date", 1)], [("id_franchise", 1), ("date", 1)]],
+    ROLLUP_DAILY_FRANCHISE_PRODUCT: [[("date", 1)], [("id_franchise", 1), ("id_product", 1)]],
+    ROLLUP_DAILY_EMPLOYEE: [[("date", 1)], [("id_employee", 1), ("date", 1)]]
+}
+
+
+# ========== Maintenance ==========
+def rollup_state(db, source: str = SOURCE_COLLECTION) -> Optional[Dict[str, Any]]:
+    return db[ROLLUP_STATE_COLLECTION].find_one({"_id": source})
+
+
+def rollups_available(db, source: str = SOURCE_COLLECTION) -> bool:
+    """
+    True once a rollup build has completed for the source collection and no
+    documents were added to (or removed from) it since the last refresh.
+    """
+    state = rollup_state(db, source)
+    if not (state and state.get("last_date")):
+        return False
+    # estimated_document_count membaca metadata, tidak men-scan collection
+    current = db[source].estimated_document_count()
+    if state.get("source_documents") != current:
+        logger.warning(
+            f"Rollup {source} basi ({state.get('source_documents')} dokumen saat refresh, sekarang {current}); "
+            "memakai collection sumber. Jalankan `python rollup.py`."
+        )
+        return False
+    return True
+
+
+def refresh_rollups(db, source: str = SOURCE_COLLECTION, full: bool = False, since: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build or incrementally refresh every rollup.
+
+    Incremental refresh recomputes from the last rolled-up date (inclusive,
+    since that day may have been partial) up to the newest transaction;
+    `since` overrides the start date and `full` rebuilds from scratch.
+    """
+    source_collection = db[source]
+    state = rollup_state(db, source)
+    # Dihitung sebelum aggregate: dokumen yang masuk selama refresh membuat rollup basi
+    source_documents = source_collection.estimated_document_count()
+
+    if full:
+        for name in ROLLUP_COLLECTIONS:
+            db[name].drop()
+        start_date = None
+    else:
+        start_date = since or (state or {}).get("last_date")
+
+    newest = source_collection.find_one({}, {"transaction_date": 1}, sort=[("transaction_date", -1)])
+    if not newest:
+        logger.warning(f"Collection {source} kosong, rollup tidak dibangun")
+        return {'refreshed': False}
+    end_date = newest["transaction_date"]
+
+    timings = {}
+    for name, pipeline_builder in ROLLUP_PIPELINES.items():
+        started = datetime.now()
+        source_collection.aggregate(pipeline_builder(start_date, end_date), allowDiskUse=True)
+        timings[name] = (datetime.now() - started).total_seconds()
+        for keys in ROLLUP_INDEXES[name]:
+            db[name].create_index(keys)
+        logger.info(f"Rollup {name} refreshed from {start_date or 'awal'} to {end_date} in {timings[name]:.2f}s")
+
+    db[ROLLUP_STATE_COLLECTION].update_one(
+        {"_id": source},
+        {"$set": {"last_date": end_date, "source_documents": source_documents, "refreshed_at": datetime.now()}},
+        upsert=True
+    )
+
+    # Dashboard cache untuk rollup ikut ter-invalidasi
+    try:
+        for name in ROLLUP_COLLECTIONS:
+            bump_data_version(db, "mongodb", name)
+    except Exception as e:
+        logger.warning(f"Gagal menandai versi data rollup: {e}")
+
+    return {
+        'refreshed': True,
+        'start_date': start_date,
+        'end_date': end_date,
+        'timings_seconds': timings,
+        'documents': {name: db[name].estimated_document_count() for name in ROLLUP_COLLECTIONS}
+    }
+
+
+# ========== Read Pipelines ==========
+def _range_match(start_date=None, end_date=None) -> List[Dict[str, Any]]:
+    date_filter = {}
+    if start_date:
+        date_filter["$gte"] = start_date
+    if end_date:
+        date_filter["$lte"] = end_date
+    return [{"$match": {"date": date_filter}}] if date_filter else []
+
+
+def employee_totals_pipeline(start_date=None, end_date=None) -> List[Dict[str, Any]]:
+    """Same output shape as the raw employee_performance_analysis pipeline"""
+    return _range_match(start_date, end_date) + [
+        {
+            "$group": {
+                "_id": "$id_employee",
+                "total_transactions": {"$sum": "$transactions"},
+                "total_revenue": {"$sum": "$revenue"},
+                "order_quantity": {"$sum": "$order_quantity"},
+                "franchise_id": {"$first": "$id_franchise"}
+            }
+        },
+        {
+            "$addFields": {
+                "avg_order_quantity": {"$divide": ["$order_quantity", "$total_transactions"]}
+            }
+        }
+    ]
+
+
+def franchise_product_pipeline() -> List[Dict[str, Any]]:
+    """Same output shape as the raw regional_product_analysis pipeline"""
+    return [
+        {
+            "$group": {
+                "_id": {
+                    "franchise_id": "$id_franchise",
+                    "product_id": "$id_product",
+                    "product_name": "$product_name"
+                },
+                "total_quantity": {"$sum": "$quantity"},
+                "total_orders": {"$sum": "$orders"},
+                "order_quantity": {"$sum": "$order_quantity"}
+            }
+        },
+        {
+            "$group": {
+                "_id": "$_id.franchise_id",
+                "products": {
+                    "$push": {
+                        "product_id": "$_id.product_id",
+                        "product_name": "$_id.product_name",
+                        "total_quantity": "$total_quantity",
+                        "total_orders": "$total_orders",
+                        "avg_order_size": {"$divide": ["$order_quantity", "$total_orders"]}
+                    }
+                },
+                "franchise_total_orders": {"$sum": "$total_orders"}
+            }
+        }
+    ]
+
+
+def franchise_monthly_pipeline(start_date=None, end_date=None) -> List[Dict[str, Any]]:
+    """Same output shape as the raw franchise_growth_analysis pipeline"""
+    return _range_match(start_date, end_date) + [
+        {
+            "$group": {
+                "_id": {"franchise_id": "$id_franchise", "month": "$month"},
+                "monthly_transactions": {"$sum": "$transactions"},
+                "monthly_revenue": {"$sum": "$revenue"}
+            }
+        },
+        {
+            "$group": {
+                "_id": "$_id.franchise_id",
+                "monthly_data": {
+                    "$push": {
+                        "month": "$_id.month",
+                        "transactions": "$monthly_transactions",
+                        "revenue": "$monthly_revenue"
+                    }
+                },
+                "total_transactions": {"$sum": "$monthly_transactions"},
+                "total_revenue": {"$sum": "$monthly_revenue"}
+            }
+        }
+    ]
+
+
+def top_employees_pipeline(limit: int = 10) -> List[Dict[str, Any]]:
+    return [
+        {
+            "$group": {
+                "_id": "$id_employee",
+                "transaction_count": {"$sum": "$transactions"},
+                "total_revenue": {"$sum": "$revenue"},
+                "order_quantity": {"$sum": "$order_quantity"}
+            }
+        },
+        {"$addFields": {"avg_order_quantity": {"$divide": ["$order_quantity", "$transaction_count"]}}},
+        {"$project": {"order_quantity": 0}},
+        {"$sort": {"total_revenue": -1}},
+        {"$limit": limit}
+    ]
+
+
+def top_products_pipeline(limit: int = 10) -> List[Dict[str, Any]]:
+    return [
+        {
+            "$group": {
+                "_id": "$id_product",
+                "product_name": {"$first": "$product_name"},
+                "total_quantity": {"$sum": "$quantity"},
+                "order_count": {"$sum": "$orders"}
+            }
+        },
+        {"$sort": {"total_quantity": -1}},
+        {"$limit": limit}
+    ]
+
+
+def top_franchises_pipeline(limit: int = 10) -> List[Dict[str, Any]]:
+    return [
+        {
+            "$group": {
+                "_id": "$id_franchise",
+                "transaction_count": {"$sum": "$transactions"},
+                "total_revenue": {"$sum": "$revenue"}
+            }
+        },
+        {"$sort": {"total_revenue": -1}},
+        {"$limit": limit}
+    ]
+
+
+# Pipeline template dashboard (combine_page) yang dijawab dari rollup,
+# dengan bentuk output yang sama dengan pipeline di transactionlog
+TEMPLATE_ROLLUPS = {
+    "Analisis Penjualan per Franchise": (ROLLUP_DAILY_FRANCHISE, [
+        {
+            "$group": {
+                "_id": "$id_franchise",
+                "total_sales": {"$sum": "$product_quantity"},
+                "transaction_count": {"$sum": "$transactions"}
+            }
+        },
+        {
+            "$project": {
+                "total_sales": 1,
+                "transaction_count": 1,
+                "avg_sales": {"$divide": ["$total_sales", "$transaction_count"]}
+            }
+        },
+        {"$sort": {"_id": 1}}
+    ]),
+    "Analisis Penjualan Minuman per Franchise": (ROLLUP_DAILY_FRANCHISE_PRODUCT, [
+        {
+            "$group": {
+                "_id": {
+                    "id_franchise": "$id_franchise",
+                    "id_product": "$id_product",
+                    "product_name": "$product_name"
+                },
+                "total_quantity": {"$sum": "$quantity"}
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "id_franchise": "$_id.id_franchise",
+                "id_product": "$_id.id_product",
+                "product_name": "$_id.product_name",
+                "total_quantity": 1
+            }
+        },
+        {"$sort": {"id_franchise": 1, "total_quantity": -1}}
+    ])
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bangun / refresh rollup collection transactionlog")
+    parser.add_argument("--source", default=SOURCE_COLLECTION)
+    parser.add_argument("--full", action="store_true", help="Bangun ulang semua rollup dari awal")
+    parser.add_argument("--since", help="Refresh mulai tanggal ini (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = refresh_rollups(get_mongo_db(MONGO_DB), source=args.source, full=args.full, since=args.since)
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""
+Mode approximate berbasis sampel untuk eksplorasi interaktif.
+
+Sampel bertingkat (stratified) dibangun sekali dari transactionlog dengan strata
+id_franchise x bulan: setiap stratum menyumbang `fraction` dokumennya (minimal
+`min_per_stratum`). Setiap dokumen sampel membawa:
+
+  _weight     jumlah dokumen stratum / jumlah sampel stratum
+  _replicate  kelompok acak 0..replicates-1 untuk estimasi error
+
+Query approximate dijalankan pada sampel. `$group` pertama ditulis ulang
+sehingga `$sum` dikalikan `_weight` (hasil diskalakan ke seluruh collection),
+`$avg` menjadi rata-rata berbobot, dan setiap `$sum` juga dihitung per
+replicate. Dari estimasi per replicate (metode random groups) client
+menambahkan kolom `<field>_low` / `<field>_high` (interval 95%).
+
+Accumulator lain ($addToSet, $push, $first, $max, ...) tidak aditif dan
+tidak diskalakan; field tersebut dan field turunannya sesudah $group
+(mis. `$size` dari `$addToSet`) dilaporkan sebagai `unscaled_fields` sehingga
+hasil ditandai hanya sebagian terskala.
+
+Jika sampel belum dibangun, dipakai `$sample` langsung (acak seragam, tidak
+bertingkat) dari collection sumber.
+
+    python sampling.py build --fraction 0.01
+    python sampling.py status
+"""
+import argparse
+import logging
+import math
+import statistics
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache import bump_data_version
+from connection import MONGO_DB, get_mongo_db
+from queries import BASE_COLLECTION
+from rollup import ROLLUP_STATE_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_COLLECTION = "transactionlog_sample"
+STATE_PREFIX = "sample:"
+WEIGHT_FIELD = "_weight"
+REPLICATE_FIELD = "_replicate"
+SAMPLE_FIELDS = [WEIGHT_FIELD, REPLICATE_FIELD]
+
+DEFAULT_SAMPLE_FRACTION = 0.01
+DEFAULT_MIN_PER_STRATUM = 20
+DEFAULT_REPLICATES = 10
+DEFAULT_LIVE_SAMPLE_SIZE = 20_000
+DEFAULT_FIND_LIMIT = 1000
+
+# Kuantil 0.975 distribusi t dengan replicates - 1 derajat bebas
+T_975 = {4: 2.776, 9: 2.262, 19: 2.093}
+
+# Stage yang membuang `_weight` sebelum $group; hasil tidak bisa diskalakan
+UNSCALABLE_STAGES = {"$replaceRoot", "$replaceWith", "$bucket", "$bucketAuto", "$facet", "$sample", "$limit", "$skip"}
+
+
+# ========== Sample Collection ==========
+def sample_build_pipeline(
+    fraction: float = DEFAULT_SAMPLE_FRACTION,
+    min_per_stratum: int = DEFAULT_MIN_PER_STRATUM,
+    replicates: int = DEFAULT_REPLICATES) -> List[Dict[str, Any]]:
+    """Stratified random sample per id_franchise x month, written with $out"""
+    return [
+        {"$set": {"_r": {"$rand": {}}, "_month": {"$substr": ["$transaction_date", 0, 7]}}},
+        {
+            "$setWindowFields": {
+                "partitionBy": {"f": "$id_franchise", "m": "$_month"},
+                "sortBy": {"_r": 1},
+                "output": {
+                    "_rank": {"$documentNumber": {}},
+                    "_stratum_size": {"$count": {}}
+                }
+            }
+        },
+        {
+            "$set": {
+                "_stratum_sample": {
+                    "$min": ["$_stratum_size", {"$max": [min_per_stratum, {"$ceil": {"$multiply": ["$_stratum_size", fraction]}}]}]
+                }
+            }
+        },
+        {"$match": {"$expr": {"$lte": ["$_rank", "$_stratum_sample"]}}},
+        {
+            "$set": {
+                WEIGHT_FIELD: {"$divide": ["$_stratum_size", "$_stratum_sample"]},
+                # Urutan dalam stratum sudah acak, jadi rank mod R membagi rata tiap stratum
+                REPLICATE_FIELD: {"$mod": [{"$subtract": ["$_rank", 1]}, replicates]}
+            }
+        },
+        {"$unset": ["_r", "_month", "_rank", "_stratum_size", "_stratum_sample"]},
+        {"$out": SAMPLE_COLLECTION}
+    ]
+
+
+def sample_state(db, source: str = BASE_COLLECTION) -> Optional[Dict[str, Any]]:
+    return db[ROLLUP_STATE_COLLECTION].find_one({"_id": STATE_PREFIX + source})
+
+
+def sample_available(db, source: str = BASE_COLLECTION) -> bool:
+    return sample_state(db, source) is not None
+
+
+def build_sample(
+    db,
+    source: str = BASE_COLLECTION,
+    fraction: float = DEFAULT_SAMPLE_FRACTION,
+    min_per_stratum: int = DEFAULT_MIN_PER_STRATUM,
+    replicates: int = DEFAULT_REPLICATES) -> Dict[str, Any]:
+    """(Re)build the stratified sample collection from `source`"""
+    started = datetime.now()
+    db[source].aggregate(sample_build_pipeline(fraction, min_per_stratum, replicates), allowDiskUse=True)
+    seconds = (datetime.now() - started).total_seconds()
+
+    report = {
+        'fraction': fraction,
+        'min_per_stratum': min_per_stratum,
+        'replicates': replicates,
+        'source_documents': db[source].estimated_document_count(),
+        'sample_documents': db[SAMPLE_COLLECTION].estimated_document_count(),
+        'seconds': seconds
+    }
+    db[ROLLUP_STATE_COLLECTION].update_one(
+        {"_id": STATE_PREFIX + source},
+        {"$set": dict(report, built_at=datetime.now())},
+        upsert=True
+    )
+    try:
+        bump_data_version(db, "mongodb", SAMPLE_COLLECTION)
+    except Exception as e:
+        logger.warning(f"Gagal menandai versi data {SAMPLE_COLLECTION}: {e}")
+
+    logger.info(f"Sampel {source}: {report['sample_documents']:,} dari {report['source_documents']:,} dokumen dalam {seconds:.1f}s")
+    return report
+
+
+def live_sample_stages(total_documents: int, size: int = DEFAULT_LIVE_SAMPLE_SIZE, replicates: int = DEFAULT_REPLICATES) -> List[Dict[str, Any]]:
+    """Uniform $sample with the weight/replicate fields the stratified sample carries"""
+    size = max(1, min(size, total_documents or size))
+    return [
+        {"$sample": {"size": size}},
+        {
+            "$set": {
+                WEIGHT_FIELD: (total_documents or size) / size,
+                REPLICATE_FIELD: {"$floor": {"$multiply": [{"$rand": {}}, replicates]}}
+            }
+        }
+    ]
+
+
+# ========== Pipeline Rewrite ==========
+def _stage_name(stage: Dict[str, Any]) -> str:
+    return next(iter(stage))
+
+
+def _replicate_field(field: str, replicate: int) -> str:
+    return f"{field}__r{replicate}"
+
+
+def _is_inclusion(projection: Dict[str, Any]) -> bool:
+    return any(value not in (0, False) for key, value in projection.items() if key != "_id")
+
+
+def _weighted(value) -> Any:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"${WEIGHT_FIELD}" if value == 1 else {"$multiply": [value, f"${WEIGHT_FIELD}"]}
+    return {"$multiply": [value, f"${WEIGHT_FIELD}"]}
+
+
+def _references(expression, fields: List[str]) -> bool:
+    """Whether an aggregation expression reads any of `fields`"""
+    if isinstance(expression, str):
+        return any(expression == f"${field}" or expression.startswith(f"${field}.") for field in fields)
+    if isinstance(expression, dict):
+        return any(_references(value, fields) for value in expression.values())
+    if isinstance(expression, list):
+        return any(_references(value, fields) for value in expression)
+    return False
+
+
+def _derived_fields(stage: Dict[str, Any], fields: List[str]) -> List[str]:
+    """Output fields of a post-$group stage computed from `fields`"""
+    name = _stage_name(stage)
+    body = stage[name]
+    if name not in ("$project", "$set", "$addFields") or not isinstance(body, dict):
+        return []
+    return [field for field, expression in body.items() if field not in fields and _references(expression, fields)]
+
+
+def _scaled_group(spec: Dict[str, Any], replicates: int) -> Tuple[List[Dict[str, Any]], List[str], List[str]]:
+    group = {"_id": spec.get("_id")}
+    averages = {}
+    scaled = []
+    unscaled = []
+    for field, accumulator in spec.items():
+        if field == "_id":
+            continue
+        operator, argument = next(iter(accumulator.items()))
+        if operator == "$sum":
+            value = _weighted(argument)
+            group[field] = {"$sum": value}
+            for replicate in range(replicates):
+                group[_replicate_field(field, replicate)] = {
+                    "$sum": {"$cond": [{"$eq": [f"${REPLICATE_FIELD}", replicate]}, value, 0]}
+                }
+            scaled.append(field)
+        elif operator == "$avg":
+            # Rata-rata berbobot: sum(x * w) / sum(w) atas nilai yang tidak null
+            group[f"{field}__wx"] = {"$sum": {"$multiply": [{"$ifNull": [argument, 0]}, f"${WEIGHT_FIELD}"]}}
+            group[f"{field}__w"] = {"$sum": {"$cond": [{"$eq": [{"$ifNull": [argument, None]}, None]}, 0, f"${WEIGHT_FIELD}"]}}
+            averages[field] = {"$cond": [{"$gt": [f"${field}__w", 0]}, {"$divide": [f"${field}__wx", f"${field}__w"]}, None]}
+        else:
+            # Accumulator non-aditif: nilainya hanya dari sampel
+            group[field] = accumulator
+            unscaled.append(field)
+    stages = [{"$group": group}]
+    if averages:
+        stages.append({"$set": averages})
+        stages.append({"$unset": [name for field in averages for name in (f"{field}__wx", f"{field}__w")]})
+    return stages, scaled, unscaled
+
+
+def scale_pipeline(pipeline: List[Dict[str, Any]], replicates: int = DEFAULT_REPLICATES) -> Dict[str, Any]:
+    """
+    Rewrite `pipeline` for the sample: the first $group / $count /
+    $sortByCount is weighted and gets per-replicate sums. Returns the
+    pipeline, the scaled fields, the fields left unscaled (non-additive
+    accumulators and what is computed from them), whether the output is
+    scaled at all, and whether it is only partially scaled.
+    """
+    rewritten: List[Dict[str, Any]] = []
+    scaled: List[str] = []
+    unscaled: List[str] = []
+    grouped = False
+    scalable = True
+
+    for stage in pipeline:
+        name = _stage_name(stage)
+        body = stage[name]
+        if grouped:
+            if name == "$project" and _is_inclusion(body):
+                # Kolom replicate ikut dibawa selama field-nya dipertahankan apa adanya
+                extra = {
+                    _replicate_field(field, replicate): 1
+                    for field in scaled if body.get(field) in (1, True)
+                    for replicate in range(replicates)
+                }
+                stage = {"$project": dict(body, **extra)}
+            if unscaled:
+                unscaled.extend(_derived_fields(stage, unscaled))
+            rewritten.append(stage)
+            continue
+
+        if name == "$group":
+            stages, scaled, unscaled = _scaled_group(body, replicates)
+            rewritten.extend(stages)
+            grouped = True
+        elif name == "$count":
+            stages, scaled, unscaled = _scaled_group({"_id": None, body: {"$sum": 1}}, replicates)
+            rewritten.extend(stages + [{"$project": {"_id": 0}}])
+            grouped = True
+        elif name == "$sortByCount":
+            stages, scaled, unscaled = _scaled_group({"_id": body, "count": {"$sum": 1}}, replicates)
+            rewritten.extend(stages + [{"$sort": {"count": -1}}])
+            grouped = True
+        elif name == "$project" and _is_inclusion(body):
+            rewritten.append({"$project": dict(body, **{field: 1 for field in SAMPLE_FIELDS})})
+        else:
+            if name in UNSCALABLE_STAGES:
+                scalable = False
+            rewritten.append(stage)
+
+    scaled = [field for field in scaled if field not in unscaled]
+    return {
+        'pipeline': rewritten,
+        'scaled_fields': scaled if scalable else [],
+        'unscaled_fields': unscaled if scalable else [],
+        'scaled': scalable and grouped,
+        'partial': scalable and grouped and bool(unscaled)
+    }
+
+
+def attach_error_bars(docs: List[Dict[str, Any]], scaled_fields: List[str], replicates: int = DEFAULT_REPLICATES) -> List[Dict[str, Any]]:
+    """Replace per-replicate sums with <field>_low / <field>_high (95%, random groups)"""
+    t_value = T_975.get(replicates - 1, 1.96)
+    for doc in docs:
+        for field in scaled_fields:
+            estimates = [doc.pop(_replicate_field(field, replicate), None) for replicate in range(replicates)]
+            if field not in doc or any(value is None for value in estimates) or doc[field] is None:
+                continue
+            spread = statistics.stdev(value * replicates for value in estimates) / math.sqrt(replicates)
+            doc[f"{field}_low"] = max(0.0, doc[field] - t_value * spread)
+            doc[f"{field}_high"] = doc[field] + t_value * spread
+        for field in SAMPLE_FIELDS:
+            doc.pop(field, None)
+    return docs
+
+
+# ========== Approximate Queries ==========
+def approximate_query(
+    db,
+    query_type: str,
+    query,
+    projection: Optional[Dict[str, Any]] = None,
+    source: str = BASE_COLLECTION,
+    replicates: int = DEFAULT_REPLICATES,
+    find_limit: int = DEFAULT_FIND_LIMIT) -> Dict[str, Any]:
+    """
+    Run a find/aggregate on the stratified sample (or a live $sample) and
+    scale it. find returns up to `find_limit` sample documents plus the
+    estimated number of matches in the full collection.
+    """
+    state = sample_state(db, source)
+    if state:
+        collection = db[SAMPLE_COLLECTION]
+        prefix: List[Dict[str, Any]] = []
+        replicates = state.get('replicates', replicates)
+        method = 'stratified sample'
+    else:
+        collection = db[source]
+        prefix = live_sample_stages(db[source].estimated_document_count(), replicates=replicates)
+        method = '$sample'
+
+    if query_type == "find":
+        stages = [{"$match": query or {}}, {"$limit": find_limit}] + ([{"$project": projection}] if projection else [])
+        rows = list(collection.aggregate(prefix + stages + [{"$unset": SAMPLE_FIELDS}]))
+        plan = scale_pipeline([{"$match": query or {}}, {"$count": "estimated_count"}], replicates)
+        counts = attach_error_bars(list(collection.aggregate(prefix + plan['pipeline'], allowDiskUse=True)), plan['scaled_fields'], replicates)
+        summary = counts[0] if counts else {'estimated_count': 0, 'estimated_count_low': 0, 'estimated_count_high': 0}
+    elif query_type == "aggregate":
+        if not isinstance(query, list):
+            raise ValueError("Aggregation query harus dalam bentuk list pipeline.")
+        plan = scale_pipeline(query, replicates)
+        rows = attach_error_bars(list(collection.aggregate(prefix + plan['pipeline'], allowDiskUse=True)), plan['scaled_fields'], replicates)
+        summary = {}
+    else:
+        raise ValueError("query_type harus 'find' atau 'aggregate'")
+
+    return {
+        'rows': rows,
+        'summary': summary,
+        'scaled': query_type == "find" or plan['scaled'],
+        'scaled_fields': plan['scaled_fields'],
+        'unscaled_fields': [] if query_type == "find" else plan['unscaled_fields'],
+        'partial': query_type != "find" and plan['partial'],
+        'method': method,
+        'sample_built_at': (state or {}).get('built_at'),
+        'sample_fraction': (state or {}).get('fraction')
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sampel bertingkat transactionlog untuk query approximate")
+    parser.add_argument("command", choices=["build", "status"])
+    parser.add_argument("--source", default=BASE_COLLECTION)
+    parser.add_argument("--fraction", type=float, default=DEFAULT_SAMPLE_FRACTION)
+    parser.add_argument("--min-per-stratum", type=int, default=DEFAULT_MIN_PER_STRATUM)
+    parser.add_argument("--replicates", type=int, default=DEFAULT_REPLICATES)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db = get_mongo_db(MONGO_DB)
+
+    if args.command == "build":
+        report = build_sample(db, args.source, args.fraction, args.min_per_stratum, args.replicates)
+        print(f"{SAMPLE_COLLECTION}: {report['sample_documents']:,} dari {report['source_documents']:,} dokumen ({report['seconds']:.1f}s)")
+    else:
+        state = sample_state(db, args.source)
+        if not state:
+            print("Sampel belum dibangun")
+            return
+        current = db[args.source].estimated_document_count()
+        print(f"{SAMPLE_COLLECTION}: {state['sample_documents']:,} dokumen, fraction {state['fraction']}, dibangun {state['built_at']}")
+        if current != state['source_documents']:
+            print(f"  Sumber berubah: {state['source_documents']:,} -> {current:,} dokumen, jalankan build ulang")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Sketch probabilistik untuk hitungan distinct dan heavy hitter pada skala besar.
+
+  - HyperLogLog: register dihitung di MongoDB (`$toHashedIndexKey`, MongoDB
+    4.4+) lalu di-`$group` per register, sehingga server hanya menyimpan
+    2^precision grup berapa pun jumlah nilai distinct-nya. Client
+    menggabungkan register menjadi estimasi dengan standard error
+    1.04/sqrt(2^precision).
+  - Distinct sampling: hanya nilai yang hash-nya jatuh di bawah ambang yang
+    ikut di-`$group`, sehingga agregasi per pelanggan tetap kecil; hasilnya
+    diskalakan dengan estimasi HyperLogLog.
+  - Count-min: frekuensi per nilai dari stream batch, dengan overestimate
+    paling besar eps * N (eps = e / width) dengan peluang 1 - e^-depth.
+
+    python sketches.py distinct name
+    python sketches.py distinct id_transaction --by id_franchise
+    python sketches.py heavy name --top 20
+"""
+import argparse
+import logging
+import math
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from connection import MONGO_DB, get_mongo_db
+from queries import BASE_COLLECTION
+from streaming import DEFAULT_BATCH_SIZE, iter_batches
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRECISION = 14
+DEFAULT_CMS_WIDTH = 2 ** 16
+DEFAULT_CMS_DEPTH = 4
+DEFAULT_MAX_SAMPLE = 50_000
+CANDIDATE_FACTOR = 4
+Z_95 = 1.96
+
+HASH_SPACE = 2.0 ** 64
+HASH_OFFSET = 2.0 ** 63
+
+
+# ========== HyperLogLog ==========
+class HyperLogLog:
+    """HyperLogLog with 2^precision registers; mergeable with server-side registers"""
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision harus di antara 4 dan 18")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    @classmethod
+    def from_registers(cls, docs: Iterable[Dict[str, Any]], precision: int = DEFAULT_PRECISION) -> "HyperLogLog":
+        """Build from {register, rank} documents (see registers_pipeline)"""
+        sketch = cls(precision)
+        for doc in docs:
+            register = int(doc['register'])
+            sketch.registers[register] = max(sketch.registers[register], int(doc['rank']))
+        return sketch
+
+    def add_hashes(self, hashes: np.ndarray):
+        """Add unsigned 64-bit hashes"""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        bits = 64 - self.precision
+        registers = (hashes >> np.uint64(bits)).astype(np.int64)
+        remainder = hashes & np.uint64((1 << bits) - 1)
+        ranks = np.full(len(hashes), bits + 1, dtype=np.uint8)
+        nonzero = remainder > 0
+        ranks[nonzero] = bits - np.floor(np.log2(remainder[nonzero].astype(np.float64))).astype(np.uint8)
+        np.maximum.at(self.registers, registers, ranks)
+
+    def add(self, values: Iterable[Any]):
+        self.add_hashes(pd.util.hash_array(np.asarray(list(values), dtype=object)))
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.precision != self.precision:
+            raise ValueError("precision HyperLogLog harus sama untuk merge")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    @property
+    def standard_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def estimate(self) -> float:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m ** 2 / float(np.sum(np.power(2.0, -self.registers.astype(np.float64))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Koreksi rentang kecil: linear counting selama masih ada register kosong
+        if raw <= 2.5 * self.m and zeros:
+            return self.m * math.log(self.m / zeros)
+        return raw
+
+    def summary(self) -> Dict[str, Any]:
+        estimate = self.estimate()
+        margin = Z_95 * self.standard_error * estimate
+        return {
+            'estimate': int(round(estimate)),
+            'low': int(max(0, math.floor(estimate - margin))),
+            'high': int(math.ceil(estimate + margin)),
+            'standard_error': self.standard_error,
+            'confidence': 0.95
+        }
+
+
+def _hashed_position(field: str) -> Dict[str, Any]:
+    # Hash 64-bit bertanda dari MongoDB digeser ke [0, 2^64) sebagai double
+    return {"$add": [{"$toDouble": {"$toHashedIndexKey": f"${field}"}}, HASH_OFFSET]}
+
+
+def registers_pipeline(field: str, precision: int = DEFAULT_PRECISION, group_by: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    HyperLogLog registers of `field` computed server-side; yields at most
+    2^precision documents {register, rank[, group]} (per group).
+    """
+    bits = 64 - precision
+    bucket = 2.0 ** bits
+    return [
+        {"$project": {"_id": 0, "group": f"${group_by}" if group_by else {"$literal": None}, "x": _hashed_position(field)}},
+        {
+            "$project": {
+                "group": 1,
+                "register": {"$min": [{"$floor": {"$divide": ["$x", bucket]}}, (1 << precision) - 1]},
+                "w": {"$mod": ["$x", bucket]}
+            }
+        },
+        {
+            "$project": {
+                "group": 1,
+                "register": 1,
+                "rank": {"$cond": [{"$gte": ["$w", 1]}, {"$subtract": [bits, {"$floor": {"$log": ["$w", 2]}}]}, bits + 1]}
+            }
+        },
+        {"$group": {"_id": {"group": "$group", "register": "$register"}, "rank": {"$max": "$rank"}}},
+        {"$project": {"_id": 0, "group": "$_id.group", "register": "$_id.register", "rank": 1}}
+    ]
+
+
+def approximate_distinct(
+    collection,
+    field: str,
+    precision: int = DEFAULT_PRECISION,
+    group_by: Optional[str] = None,
+    match: Optional[Dict[str, Any]] = None) -> Dict[Any, HyperLogLog]:
+    """HyperLogLog per `group_by` value (key None without grouping)"""
+    pipeline = ([{"$match": match}] if match else []) + registers_pipeline(field, precision, group_by)
+    grouped: Dict[Any, List[Dict[str, Any]]] = {}
+    for doc in collection.aggregate(pipeline, allowDiskUse=True):
+        grouped.setdefault(doc.get('group'), []).append(doc)
+    return {group: HyperLogLog.from_registers(docs, precision) for group, docs in grouped.items()}
+
+
+# ========== Distinct Sampling ==========
+def hash_sample_stage(field: str, fraction: float) -> Dict[str, Any]:
+    """$match keeping every document whose `field` hashes into the first `fraction` of the hash space"""
+    return {"$match": {"$expr": {"$lt": [_hashed_position(field), min(1.0, fraction) * HASH_SPACE]}}}
+
+
+def sample_fraction(distinct_estimate: float, max_sample: int = DEFAULT_MAX_SAMPLE) -> float:
+    """Fraction of distinct values to keep so roughly `max_sample` remain"""
+    if distinct_estimate <= max_sample:
+        return 1.0
+    return max_sample / distinct_estimate
+
+
+def proportion_interval(count: int, sample_size: int, fraction: float = 0.0) -> Dict[str, float]:
+    """Share of a sample with a normal-approximation 95% interval (finite population corrected)"""
+    if sample_size <= 0:
+        return {'share': 0.0, 'low': 0.0, 'high': 0.0}
+    share = count / sample_size
+    margin = Z_95 * math.sqrt(share * (1 - share) / sample_size * max(0.0, 1 - fraction))
+    return {'share': share, 'low': max(0.0, share - margin), 'high': min(1.0, share + margin)}
+
+
+# ========== Count-Min ==========
+class CountMinSketch:
+    """Count-min sketch over hashed values; estimates never undercount"""
+
+    def __init__(self, width: int = DEFAULT_CMS_WIDTH, depth: int = DEFAULT_CMS_DEPTH):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+        # hash_key pandas harus 16 karakter; satu key per baris tabel
+        self._keys = [f"countmin{row:08d}" for row in range(depth)]
+
+    def _columns(self, values: np.ndarray) -> List[np.ndarray]:
+        return [
+            (pd.util.hash_array(values, hash_key=key) % np.uint64(self.width)).astype(np.int64)
+            for key in self._keys
+        ]
+
+    def add(self, values: Iterable[Any], weights: Optional[np.ndarray] = None):
+        values = np.asarray(list(values), dtype=object)
+        weights = np.ones(len(values), dtype=np.int64) if weights is None else np.asarray(weights, dtype=np.int64)
+        for row, columns in enumerate(self._columns(values)):
+            np.add.at(self.table[row], columns, weights)
+        self.total += int(weights.sum())
+
+    def estimate(self, values: Iterable[Any]) -> np.ndarray:
+        values = np.asarray(list(values), dtype=object)
+        if not len(values):
+            return np.zeros(0, dtype=np.int64)
+        return np.min([self.table[row][columns] for row, columns in enumerate(self._columns(values))], axis=0)
+
+    @property
+    def epsilon(self) -> float:
+        return math.e / self.width
+
+    @property
+    def delta(self) -> float:
+        return math.exp(-self.depth)
+
+    @property
+    def error_bound(self) -> float:
+        """Maximum overcount (eps * N) that holds with probability 1 - delta"""
+        return self.epsilon * self.total
+
+
+def heavy_hitters(
+    collection,
+    field: str,
+    top_n: int = 10,
+    match: Optional[Dict[str, Any]] = None,
+    width: int = DEFAULT_CMS_WIDTH,
+    depth: int = DEFAULT_CMS_DEPTH,
+    batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Most frequent values of `field` in one streamed pass. Memory is the
+    sketch plus top_n * CANDIDATE_FACTOR candidates, independent of the
+    number of distinct values.
+    """
+    sketch = CountMinSketch(width, depth)
+    candidates: Dict[Any, int] = {}
+    limit = top_n * CANDIDATE_FACTOR
+    cursor = collection.find(match or {}, {"_id": 0, field: 1}, batch_size=batch_size)
+    for batch in iter_batches(cursor, batch_size):
+        values = pd.Series([doc.get(field) for doc in batch]).dropna()
+        if values.empty:
+            continue
+        counts = values.value_counts()
+        sketch.add(counts.index, counts.to_numpy())
+        for value, estimate in zip(counts.index, sketch.estimate(counts.index)):
+            candidates[value] = int(estimate)
+        if len(candidates) > limit * 2:
+            candidates = dict(sorted(candidates.items(), key=lambda item: item[1], reverse=True)[:limit])
+
+    names = list(candidates)
+    estimates = sketch.estimate(names)
+    ranked = sorted(zip(names, estimates), key=lambda item: item[1], reverse=True)[:top_n]
+    return {
+        'items': [{'value': value, 'estimate': int(estimate)} for value, estimate in ranked],
+        'total': sketch.total,
+        'error_bound': sketch.error_bound,
+        'epsilon': sketch.epsilon,
+        'confidence': 1 - sketch.delta
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimasi distinct count (HyperLogLog) dan heavy hitter (count-min)")
+    parser.add_argument("command", choices=["distinct", "heavy"])
+    parser.add_argument("field")
+    parser.add_argument("--collection", default=BASE_COLLECTION)
+    parser.add_argument("--by", help="Field pengelompokan untuk distinct count")
+    parser.add_argument("--precision", type=int, default=DEFAULT_PRECISION)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    collection = get_mongo_db(MONGO_DB)[args.collection]
+
+    if args.command == "distinct":
+        sketches = approximate_distinct(collection, args.field, args.precision, args.by)
+        for group, sketch in sorted(sketches.items(), key=lambda item: str(item[0])):
+            summary = sketch.summary()
+            label = f"{args.by}={group}" if args.by else args.field
+            print(f"{label}: ~{summary['estimate']:,} ({summary['low']:,}..{summary['high']:,}, 95%)")
+    else:
+        result = heavy_hitters(collection, args.field, args.top)
+        print(f"{result['total']:,} nilai, overestimate maksimum {result['error_bound']:,.0f} "
+              f"(peluang {result['confidence']:.2%})")
+        print(pd.DataFrame(result['items']).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
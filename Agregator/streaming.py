@@ -0,0 +1,151 @@
+import logging
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Cara menangani field array bersarang (mis. `product`)
+ARRAY_MODES = ["list", "flatten", "raw"]
+
+
+def open_mongo_cursor(
+    collection,
+    query_type: str = "find",
+    query=None,
+    projection=None,
+    batch_size: int = DEFAULT_BATCH_SIZE):
+    """Open a server-side cursor that fetches `batch_size` documents per round trip"""
+    if query_type == "find":
+        return collection.find(query or {}, projection, batch_size=batch_size)
+    elif query_type == "aggregate":
+        if not isinstance(query, list):
+            raise ValueError("Aggregation query harus dalam bentuk list pipeline.")
+        return collection.aggregate(query, batchSize=batch_size, allowDiskUse=True)
+    else:
+        raise ValueError("query_type harus 'find' atau 'aggregate'")
+
+
+def iter_batches(cursor: Iterable[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Yield lists of at most `batch_size` documents from a cursor"""
+    iterator = iter(cursor)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def documents_to_frame(
+    docs: List[Dict[str, Any]],
+    array_field: Optional[str] = "product",
+    array_mode: str = "list") -> pd.DataFrame:
+    """
+    Build a DataFrame column by column from a batch of documents.
+
+    `array_field` is a nested array of sub-documents (the `product` line items
+    in transactionlog). With array_mode:
+      - "list": split into parallel list columns (`product.id_product`, ...)
+      - "flatten": one row per array element with scalar `product.*` columns
+      - "raw": keep the original list of dicts in a single column
+    """
+    if array_mode not in ARRAY_MODES:
+        raise ValueError(f"array_mode harus salah satu dari {ARRAY_MODES}")
+
+    columns: Dict[str, list] = {}
+    row = 0
+
+    def put(key, value):
+        col = columns.get(key)
+        if col is None:
+            col = columns[key] = [None] * row
+        elif len(col) < row:
+            col.extend([None] * (row - len(col)))
+        col.append(value)
+
+    for doc in docs:
+        items = doc.get(array_field) if array_field and array_mode != "raw" else None
+        if not isinstance(items, list):
+            for key, value in doc.items():
+                put(key, value)
+            row += 1
+            continue
+
+        base = [(key, value) for key, value in doc.items() if key != array_field]
+        if array_mode == "flatten":
+            for item in items or [None]:
+                for key, value in base:
+                    put(key, value)
+                if isinstance(item, dict):
+                    for key, value in item.items():
+                        put(f"{array_field}.{key}", value)
+                row += 1
+        else:
+            for key, value in base:
+                put(key, value)
+            sub_keys = dict.fromkeys(k for item in items if isinstance(item, dict) for k in item)
+            for sub_key in sub_keys:
+                put(
+                    f"{array_field}.{sub_key}",
+                    [item.get(sub_key) if isinstance(item, dict) else None for item in items]
+                )
+            row += 1
+
+    for col in columns.values():
+        if len(col) < row:
+            col.extend([None] * (row - len(col)))
+
+    return pd.DataFrame(columns)
+
+
+def stream_mongo_frames(
+    collection,
+    query_type: str = "find",
+    query=None,
+    projection=None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    array_field: Optional[str] = "product",
+    array_mode: str = "list") -> Iterator[pd.DataFrame]:
+    """
+    Stream a find/aggregate result as a sequence of DataFrame chunks.
+
+    Only one batch of raw documents is alive at a time, so peak memory is
+    bounded by `batch_size` regardless of the result size; the caller decides
+    how many chunks to retain.
+    """
+    cursor = open_mongo_cursor(collection, query_type, query, projection, batch_size)
+    try:
+        for batch in iter_batches(cursor, batch_size):
+            yield documents_to_frame(batch, array_field, array_mode)
+    finally:
+        cursor.close()
+
+
+class BoundedPreview:
+    """Keep at most `max_rows` rows of a streamed result while counting the total"""
+
+    def __init__(self, max_rows: int = 10000):
+        self.max_rows = max_rows
+        self.total_rows = 0
+        self._chunks: List[pd.DataFrame] = []
+        self._kept_rows = 0
+
+    def add(self, chunk: pd.DataFrame):
+        self.total_rows += len(chunk)
+        room = self.max_rows - self._kept_rows
+        if room > 0:
+            kept = chunk if len(chunk) <= room else chunk.iloc[:room]
+            self._chunks.append(kept)
+            self._kept_rows += len(kept)
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_rows > self._kept_rows
+
+    def frame(self) -> pd.DataFrame:
+        if not self._chunks:
+            return pd.DataFrame()
+        return pd.concat(self._chunks, ignore_index=True)
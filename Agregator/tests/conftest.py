@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modul Agregator saling import secara top-level (mis. `from connection import ...`)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
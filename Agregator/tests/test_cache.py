@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("pymongo")
+
+from cache import DATA_VERSION_COLLECTION, ResultCache
+
+
+class FakeVersions:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection):
+        return list(self.docs)
+
+
+def test_sync_data_versions_invalidates_keys_first_seen_after_sync():
+    docs = [{"_id": "mongodb:transactionlog", "version": 1}]
+    db = {DATA_VERSION_COLLECTION: FakeVersions(docs)}
+    cache = ResultCache()
+    cache.put("a", [1], "mongodb", "transactionlog")
+    cache.put("b", [2], "neo4j", "neo4j")
+
+    assert cache.sync_data_versions(db) == 0
+
+    # graph_loader dijalankan pertama kali setelah dashboard hidup
+    docs.append({"_id": "neo4j:neo4j", "version": 1})
+    assert cache.sync_data_versions(db) == 1
+    assert cache.get("b") is None
+    assert cache.get("a") == [1]
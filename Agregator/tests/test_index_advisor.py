@@ -0,0 +1,88 @@
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("pymongo")
+pytest.importorskip("neo4j")
+
+from index_advisor import extract_shape, propose_indexes
+
+
+def workload(*items, collection="transactionlogindex"):
+    return [{"collection": collection, "shape": shape, "count": count} for shape, count in items]
+
+
+def test_find_shape_splits_equality_range_and_sort():
+    shape = extract_shape(
+        "find",
+        {"transaction_date": "2024-12-07", "id_employee": {"$in": [5, 6]}, "product.quantity": 2, "order_quantity": {"$gt": 7}},
+        sort={"order_quantity": -1, "id_employee": 1}
+    )
+    assert shape == {
+        'equality': ["id_employee", "product.quantity", "transaction_date"],
+        'sort': [["order_quantity", -1]],
+        'range': [],
+        'group': []
+    }
+
+
+def test_find_shape_descends_into_and_and_elem_match_but_not_or():
+    shape = extract_shape("find", {
+        "$and": [{"id_franchise": 1}, {"transaction_date": {"$gte": "2024-01-01"}}],
+        "product": {"$elemMatch": {"id_product": "C1", "quantity": {"$gt": 1}}},
+        "$or": [{"name": "A"}, {"name": "B"}]
+    })
+    assert shape['equality'] == ["id_franchise", "product.id_product"]
+    assert shape['range'] == ["product.quantity", "transaction_date"]
+
+
+def test_pipeline_shape_stops_at_first_reshaping_stage():
+    shape = extract_shape("aggregate", [
+        {"$match": {"transaction_date": {"$gte": "2024-01-01", "$lte": "2024-12-31"}}},
+        {"$sort": {"id_franchise": 1}},
+        {"$unwind": "$product"},
+        {"$match": {"product.id_product": "C1"}}
+    ])
+    assert shape == {'equality': [], 'sort': [["id_franchise", 1]], 'range': ["transaction_date"], 'group': []}
+
+    grouped = extract_shape("aggregate", [
+        {"$match": {"id_franchise": 1}},
+        {"$group": {"_id": {"f": "$id_franchise", "e": "$id_employee"}}}
+    ])
+    assert grouped['equality'] == ["id_franchise"]
+    assert grouped['group'] == ["id_employee"]
+
+
+def test_proposals_follow_esr_and_shared_equality_order():
+    proposals = propose_indexes(workload(
+        (extract_shape("find", {"id_franchise": 1, "transaction_date": {"$gte": "2024-01-01"}}), 3),
+        (extract_shape("find", {"id_employee": 5, "id_franchise": 1}, sort={"transaction_date": -1}), 1)
+    ))
+    assert [p['keys'] for p in proposals] == [
+        [["id_franchise", 1], ["transaction_date", 1]],
+        [["id_franchise", 1], ["id_employee", 1], ["transaction_date", -1]]
+    ]
+    assert proposals[0]['name'] == "id_franchise_1_transaction_date_1"
+    assert not any(p['multikey'] for p in proposals)
+
+
+def test_prefix_proposals_fold_into_longer_index_and_existing_indexes_are_skipped():
+    shapes = workload(
+        (extract_shape("find", {"id_franchise": 1}), 2),
+        (extract_shape("find", {"id_franchise": 1, "transaction_date": {"$lte": "2024-12-31"}}), 1),
+        (extract_shape("find", {"product.id_product": "C1"}), 1)
+    )
+    proposals = propose_indexes(shapes)
+    assert [(p['name'], p['queries'], p['multikey']) for p in proposals] == [
+        ("id_franchise_1_transaction_date_1", 3, False),
+        ("product.id_product_1", 1, True)
+    ]
+
+    existing = {"transactionlogindex": [[["product.id_product", 1], ["quantity", 1]]]}
+    assert [p['name'] for p in propose_indexes(shapes, existing)] == ["id_franchise_1_transaction_date_1"]
+
+
+def test_proposals_are_capped_per_collection_and_deterministic():
+    shapes = workload(*[(extract_shape("find", {f"field_{i}": 1}), i + 1) for i in range(5)])
+    first = propose_indexes(shapes, max_per_collection=2)
+    assert [p['name'] for p in first] == ["field_4_1", "field_3_1"]
+    assert propose_indexes(list(reversed(shapes)), max_per_collection=2) == first
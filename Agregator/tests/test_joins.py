@@ -0,0 +1,30 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from joins import join_records
+
+
+def test_join_records_keeps_key_outside_right_columns():
+    mongo = [{"_id": 1, "total_revenue": 300}, {"_id": 2, "total_revenue": 150}, {"_id": 3, "total_revenue": 90}]
+    neo4j = [
+        {"employee_id": "1", "employee_name": "Ani", "start_hour": "08:00", "end_hour": "16:00", "cafe_id": 1},
+        {"employee_id": 2, "employee_name": "Budi", "start_hour": "10:00", "end_hour": "18:00", "cafe_id": 2}
+    ]
+    combined = join_records(
+        mongo, neo4j, "_id", "employee_id",
+        right_columns=["employee_name", "start_hour", "end_hour", "cafe_id"],
+        indicator=True
+    )
+    assert combined["employee_name"].tolist()[:2] == ["Ani", "Budi"]
+    assert combined["_merge"].tolist() == ["both", "both", "left_only"]
+    assert "employee_id" not in combined.columns
+
+
+def test_join_records_product_categories():
+    products = pd.DataFrame({"product_id": ["C1", "C2", "NC1"], "total_orders": [5, 3, 1]})
+    reference = [{"product_id": "C1", "category": "Coffee", "price": 25000}, {"product_id": "NC1", "category": "Non-Coffee"}]
+    combined = join_records(products, reference, "product_id", "product_id", right_columns=["category"], indicator=True)
+    assert combined["category"].where(combined["_merge"] == "both", "Coffee").tolist() == ["Coffee", "Coffee", "Non-Coffee"]
+    assert "price" not in combined.columns
+    assert "product_id_right" not in combined.columns
@@ -0,0 +1,65 @@
+from multi_aggregate import combine_pipelines, facet_compatible
+
+DATE_MATCH = {"$match": {"transaction_date": {"$gte": "2024-01-01", "$lte": "2024-12-31"}}}
+REVENUE = {"$addFields": {"calculated_revenue": {"$multiply": ["$order_quantity", 30000]}}}
+
+
+def test_common_match_is_hoisted_before_facet():
+    pipelines = {
+        "by_franchise": [DATE_MATCH, {"$group": {"_id": "$id_franchise", "n": {"$sum": 1}}}],
+        "by_employee": [DATE_MATCH, {"$match": {"id_franchise": 1}}, {"$group": {"_id": "$id_employee", "n": {"$sum": 1}}}]
+    }
+    combined, fields = combine_pipelines(pipelines)
+
+    assert fields == {"by_franchise": "q0", "by_employee": "q1"}
+    assert combined[0] == DATE_MATCH
+    assert combined[1] == {"$facet": {
+        "q0": [{"$group": {"_id": "$id_franchise", "n": {"$sum": 1}}}],
+        "q1": [{"$match": {"id_franchise": 1}}, {"$group": {"_id": "$id_employee", "n": {"$sum": 1}}}]
+    }}
+
+
+def test_differing_matches_stay_in_branches():
+    pipelines = {
+        "a": [{"$match": {"id_franchise": 1}}, {"$count": "n"}],
+        "b": [{"$match": {"id_franchise": 2}}, {"$count": "n"}]
+    }
+    combined, _ = combine_pipelines(pipelines)
+    assert len(combined) == 1
+    assert combined[0]["$facet"] == {"q0": pipelines["a"], "q1": pipelines["b"]}
+
+
+def test_last_stage_is_never_hoisted():
+    pipelines = {"a": [DATE_MATCH], "b": [DATE_MATCH]}
+    combined, _ = combine_pipelines(pipelines)
+    assert combined == [{"$facet": {"q0": [DATE_MATCH], "q1": [DATE_MATCH]}}]
+
+
+def test_shared_stages_run_once_and_only_leave_branches_behind_matches():
+    group = {"$group": {"_id": "$id_franchise", "revenue": {"$sum": "$calculated_revenue"}}}
+    pipelines = {
+        "revenue": [DATE_MATCH, REVENUE, group],
+        "filtered": [DATE_MATCH, {"$match": {"id_employee": 5}}, REVENUE, group],
+        "late": [DATE_MATCH, {"$unwind": "$product"}, REVENUE, group]
+    }
+    combined, _ = combine_pipelines(pipelines, shared_stages=[REVENUE])
+
+    assert combined[:2] == [DATE_MATCH, REVENUE]
+    facet = combined[2]["$facet"]
+    assert facet["q0"] == [group]
+    assert facet["q1"] == [{"$match": {"id_employee": 5}}, group]
+    # Sesudah $unwind stage bersama tetap di cabang
+    assert facet["q2"] == [{"$unwind": "$product"}, REVENUE, group]
+
+
+def test_branch_reduced_to_nothing_gets_empty_match():
+    pipelines = {"a": [DATE_MATCH, REVENUE], "b": [DATE_MATCH, {"$count": "n"}]}
+    combined, _ = combine_pipelines(pipelines, shared_stages=[REVENUE])
+    assert combined[-1]["$facet"]["q0"] == [{"$match": {}}]
+
+
+def test_facet_compatible():
+    assert facet_compatible([DATE_MATCH, {"$count": "n"}])
+    assert not facet_compatible([])
+    assert not facet_compatible([DATE_MATCH, {"$merge": {"into": "out"}}])
+    assert not facet_compatible([{"$facet": {"a": [{"$count": "n"}]}}])
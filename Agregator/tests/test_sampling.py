@@ -0,0 +1,122 @@
+import math
+import statistics
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("pymongo")
+pytest.importorskip("neo4j")
+
+from sampling import REPLICATE_FIELD, SAMPLE_FIELDS, T_975, WEIGHT_FIELD, attach_error_bars, scale_pipeline
+
+REPLICATES = 3
+
+
+def stage_names(pipeline):
+    return [next(iter(stage)) for stage in pipeline]
+
+
+def test_sum_is_weighted_with_replicate_sums():
+    plan = scale_pipeline([{"$group": {"_id": "$id_franchise", "total": {"$sum": "$order_quantity"}, "rows": {"$sum": 1}}}], REPLICATES)
+    group = plan['pipeline'][0]["$group"]
+
+    assert group["total"] == {"$sum": {"$multiply": ["$order_quantity", f"${WEIGHT_FIELD}"]}}
+    assert group["rows"] == {"$sum": f"${WEIGHT_FIELD}"}
+    assert group["total__r1"] == {
+        "$sum": {"$cond": [{"$eq": [f"${REPLICATE_FIELD}", 1]}, {"$multiply": ["$order_quantity", f"${WEIGHT_FIELD}"]}, 0]}
+    }
+    assert sorted(field for field in group if "__r" in field) == [f"{field}__r{r}" for field in ("rows", "total") for r in range(REPLICATES)]
+    assert plan['scaled'] and not plan['partial']
+    assert plan['scaled_fields'] == ["total", "rows"]
+
+
+def test_avg_becomes_weighted_mean():
+    plan = scale_pipeline([{"$group": {"_id": None, "mean": {"$avg": "$order_quantity"}}}], REPLICATES)
+
+    assert stage_names(plan['pipeline']) == ["$group", "$set", "$unset"]
+    group = plan['pipeline'][0]["$group"]
+    assert set(group) == {"_id", "mean__wx", "mean__w"}
+    assert plan['pipeline'][1]["$set"]["mean"] == {
+        "$cond": [{"$gt": ["$mean__w", 0]}, {"$divide": ["$mean__wx", "$mean__w"]}, None]
+    }
+    assert plan['pipeline'][2] == {"$unset": ["mean__wx", "mean__w"]}
+    assert plan['scaled_fields'] == []
+
+
+def test_count_and_sort_by_count_are_rewritten_as_weighted_sums():
+    count = scale_pipeline([{"$match": {"id_franchise": 1}}, {"$count": "n"}], REPLICATES)
+    assert stage_names(count['pipeline']) == ["$match", "$group", "$project"]
+    assert count['pipeline'][1]["$group"]["_id"] is None
+    assert count['pipeline'][1]["$group"]["n"] == {"$sum": f"${WEIGHT_FIELD}"}
+    assert count['pipeline'][2] == {"$project": {"_id": 0}}
+    assert count['scaled_fields'] == ["n"]
+
+    by_count = scale_pipeline([{"$sortByCount": "$id_franchise"}], REPLICATES)
+    assert stage_names(by_count['pipeline']) == ["$group", "$sort"]
+    assert by_count['pipeline'][0]["$group"]["_id"] == "$id_franchise"
+    assert by_count['pipeline'][1] == {"$sort": {"count": -1}}
+    assert by_count['scaled_fields'] == ["count"]
+
+
+def test_inclusion_projects_keep_sample_and_replicate_fields():
+    plan = scale_pipeline([
+        {"$project": {"id_franchise": 1, "order_quantity": 1}},
+        {"$group": {"_id": "$id_franchise", "total": {"$sum": "$order_quantity"}}},
+        {"$project": {"total": 1}}
+    ], REPLICATES)
+
+    before, after = plan['pipeline'][0]["$project"], plan['pipeline'][-1]["$project"]
+    assert all(before[field] == 1 for field in SAMPLE_FIELDS)
+    assert after == dict({"total": 1}, **{f"total__r{r}": 1 for r in range(REPLICATES)})
+
+
+def test_stage_dropping_weight_before_group_is_unscalable():
+    plan = scale_pipeline([{"$limit": 10}, {"$group": {"_id": None, "total": {"$sum": "$order_quantity"}}}], REPLICATES)
+    assert not plan['scaled'] and not plan['partial']
+    assert plan['scaled_fields'] == [] and plan['unscaled_fields'] == []
+
+
+def test_non_additive_accumulators_and_derived_fields_are_unscaled():
+    plan = scale_pipeline([
+        {"$unwind": "$product"},
+        {"$group": {"_id": "$id_franchise", "total_sales": {"$sum": "$product.quantity"}, "transaction_ids": {"$addToSet": "$id_transaction"}}},
+        {"$project": {
+            "total_sales": 1,
+            "transaction_count": {"$size": "$transaction_ids"},
+            "avg_sales": {"$divide": ["$total_sales", {"$size": "$transaction_ids"}]}
+        }},
+        {"$sort": {"_id": 1}}
+    ], REPLICATES)
+
+    assert plan['pipeline'][1]["$group"]["transaction_ids"] == {"$addToSet": "$id_transaction"}
+    assert plan['scaled'] and plan['partial']
+    assert plan['scaled_fields'] == ["total_sales"]
+    assert plan['unscaled_fields'] == ["transaction_ids", "transaction_count", "avg_sales"]
+
+
+def test_attach_error_bars_random_groups_interval():
+    replicates = 10
+    estimates = list(range(1, replicates + 1))
+    doc = dict(
+        {"total": 550.0, WEIGHT_FIELD: 100.0, REPLICATE_FIELD: 3},
+        **{f"total__r{r}": value for r, value in enumerate(estimates)}
+    )
+
+    [result] = attach_error_bars([doc], ["total"], replicates)
+
+    spread = statistics.stdev(value * replicates for value in estimates) / math.sqrt(replicates)
+    assert T_975[replicates - 1] == 2.262
+    assert result["total_low"] == pytest.approx(550.0 - 2.262 * spread)
+    assert result["total_high"] == pytest.approx(550.0 + 2.262 * spread)
+    assert result["total_high"] - result["total_low"] == pytest.approx(2 * 2.262 * 9.5743, rel=1e-4)
+    assert set(result) == {"total", "total_low", "total_high"}
+
+
+def test_attach_error_bars_clamps_low_at_zero_and_skips_missing_replicates():
+    docs = [
+        dict({"n": 1.0}, **{f"n__r{r}": value for r, value in enumerate([0, 0, 3])}),
+        {"n": 5.0, "n__r0": 1, "n__r1": None, "n__r2": 2}
+    ]
+    clamped, missing = attach_error_bars(docs, ["n"], REPLICATES)
+    assert clamped["n_low"] == 0.0
+    assert "n_low" not in missing and "n__r0" not in missing
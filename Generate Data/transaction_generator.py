@@ -0,0 +1,347 @@
+"""
+Generator data transaksi cafe sintetis (versi modul dari Random_Data_Cafe_Final.ipynb).
+
+Semua kolom di-sampling secara vectorized dengan NumPy per chunk: jumlah item,
+produk (tanpa duplikat dalam satu transaksi), quantity, id_franchise,
+id_employee, dan transaction_date. Nama customer diambil dari pool nama Faker
+yang dibuat sekali di awal, bukan `fake.name()` per baris.
+
+Setiap chunk punya RNG sendiri yang diturunkan dari (seed, nomor chunk), jadi
+hasilnya identik berapa pun jumlah worker yang dipakai. Chunk dibagi ke
+beberapa proses dan langsung di-stream ke file part sendiri, sehingga memori
+per proses dibatasi oleh --chunk-size, bukan oleh jumlah baris total.
+
+Format output:
+  ndjson   satu dokumen JSON per baris (opsional gzip/zstd), bisa langsung
+           di-mongoimport atau dibaca paralel per file
+  parquet  dataset Parquet terpartisi month=YYYY-MM/id_franchise=N
+
+    python transaction_generator.py --rows 1098000 --seed 42
+    python transaction_generator.py --rows 50000000 --workers 8 --compression zstd
+    python transaction_generator.py --rows 50000000 --format parquet --output-dir out
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+from faker import Faker
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_ID_MAP = {
+    "Americano": "C1",
+    "Cappuccino": "C2",
+    "Latte": "C3",
+    "Espresso": "C4",
+    "Mocha": "C5",
+    "Flat White": "C6",
+    "Macchiato": "C7",
+    "Cold Brew": "C8",
+    "Matcha Latte": "NC1",
+    "Chocolate Frappe": "NC2"
+}
+LIST_MENU = list(PRODUCT_ID_MAP.keys())
+PRODUCT_IDS = [PRODUCT_ID_MAP[menu] for menu in LIST_MENU]
+
+NUM_FRANCHISES = 10
+EMPLOYEES_PER_FRANCHISE = 5
+MAX_ITEMS = 5
+MAX_QUANTITY = 3
+
+# Tanggal disebar merata dari START_DATE sampai END_DATE; baris terakhir
+# (tepat END_DATE) digeser ke hari sebelumnya seperti di notebook
+START_DATE = np.datetime64("2024-01-01", "D")
+END_DATE = np.datetime64("2025-01-01", "D")
+
+DEFAULT_ROWS = 1_098_000
+DEFAULT_CHUNK_SIZE = 250_000
+DEFAULT_NAME_POOL_SIZE = 20_000
+DEFAULT_SEED = 42
+
+OUTPUT_FORMATS = ["ndjson", "parquet"]
+COMPRESSIONS = ["none", "gzip", "zstd"]
+NDJSON_EXTENSIONS = {"none": ".ndjson", "gzip": ".ndjson.gz", "zstd": ".ndjson.zst"}
+PARQUET_PARTITION_COLS = ["month", "id_franchise"]
+NDJSON_WRITE_BATCH = 10_000
+
+
+def build_name_pool(size: int = DEFAULT_NAME_POOL_SIZE, seed: int = DEFAULT_SEED) -> List[str]:
+    """Pre-generate customer names once; rows then sample indices into this pool"""
+    fake = Faker()
+    fake.seed_instance(seed)
+    return [fake.name() for _ in range(size)]
+
+
+def chunk_ranges(total_rows: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[tuple]:
+    """(chunk_index, start, stop) for every chunk; boundaries depend only on chunk_size"""
+    return [
+        (index, start, min(start + chunk_size, total_rows))
+        for index, start in enumerate(range(0, total_rows, chunk_size))
+    ]
+
+
+def _sample_products(rng: np.random.Generator, n: int):
+    """
+    Same distribution as the notebook loop: draw 1..5 menu items with
+    replacement and drop repeats. Returns left-packed (n, MAX_ITEMS) code and
+    quantity matrices padded with -1 / 0.
+    """
+    n_draws = rng.integers(1, MAX_ITEMS + 1, size=n)
+    draws = rng.integers(0, len(LIST_MENU), size=(n, MAX_ITEMS), dtype=np.int8)
+    quantities = rng.integers(1, MAX_QUANTITY + 1, size=(n, MAX_ITEMS), dtype=np.int8)
+
+    valid = np.arange(MAX_ITEMS) < n_draws[:, None]
+    same = draws[:, :, None] == draws[:, None, :]
+    earlier = np.tril(np.ones((MAX_ITEMS, MAX_ITEMS), dtype=bool), k=-1)
+    duplicate = (same & earlier).any(axis=2)
+    keep = valid & ~duplicate
+
+    # Geser item yang dipakai ke kiri dengan urutan tetap
+    order = np.argsort(~keep, axis=1, kind="stable")
+    keep = np.take_along_axis(keep, order, axis=1)
+    codes = np.where(keep, np.take_along_axis(draws, order, axis=1), -1).astype(np.int8)
+    quantities = np.where(keep, np.take_along_axis(quantities, order, axis=1), 0).astype(np.int8)
+    return codes, quantities
+
+
+def _transaction_dates(row_index: np.ndarray, total_rows: int) -> np.ndarray:
+    """Vectorized equivalent of pd.date_range(START, END, periods=total).date"""
+    span_days = int((END_DATE - START_DATE).astype(np.int64))
+    if total_rows > 1:
+        offsets = (row_index.astype(np.int64) * span_days) // (total_rows - 1)
+    else:
+        offsets = np.zeros(len(row_index), dtype=np.int64)
+    dates = START_DATE + offsets.astype("timedelta64[D]")
+    return np.minimum(dates, END_DATE - np.timedelta64(1, "D"))
+
+
+def generate_chunk(chunk_index: int, start: int, stop: int, total_rows: int, name_pool_size: int, seed: int = DEFAULT_SEED) -> Dict[str, np.ndarray]:
+    """
+    Generate rows [start, stop) as columnar arrays. `product_codes` indexes
+    LIST_MENU and `name_index` indexes the name pool.
+    """
+    rng = np.random.default_rng([seed, chunk_index])
+    n = stop - start
+    row_index = np.arange(start, stop, dtype=np.int64)
+
+    codes, quantities = _sample_products(rng, n)
+    id_franchise = (row_index % NUM_FRANCHISES + 1).astype(np.int16)
+    id_employee = ((id_franchise - 1) * EMPLOYEES_PER_FRANCHISE + rng.integers(1, EMPLOYEES_PER_FRANCHISE + 1, size=n)).astype(np.int16)
+
+    return {
+        "id_transaction": row_index + 1,
+        "product_codes": codes,
+        "quantities": quantities,
+        "name_index": rng.integers(0, name_pool_size, size=n, dtype=np.int32),
+        "order_quantity": quantities.sum(axis=1, dtype=np.int16),
+        "id_franchise": id_franchise,
+        "id_employee": id_employee,
+        "transaction_date": _transaction_dates(row_index, total_rows)
+    }
+
+
+def iter_records(chunk: Dict[str, np.ndarray], names: List[str]) -> Iterator[Dict[str, Any]]:
+    """Expand a columnar chunk into documents shaped like df_cafe.json"""
+    dates = np.datetime_as_string(chunk["transaction_date"], unit="D")
+    for i in range(len(chunk["id_transaction"])):
+        codes = chunk["product_codes"][i]
+        quantities = chunk["quantities"][i]
+        yield {
+            "id_transaction": int(chunk["id_transaction"][i]),
+            "product": [
+                {"id_product": PRODUCT_IDS[code], "name": LIST_MENU[code], "quantity": int(quantity)}
+                for code, quantity in zip(codes, quantities) if code >= 0
+            ],
+            "name": names[chunk["name_index"][i]],
+            "order_quantity": int(chunk["order_quantity"][i]),
+            "id_franchise": int(chunk["id_franchise"][i]),
+            "id_employee": int(chunk["id_employee"][i]),
+            "transaction_date": str(dates[i])
+        }
+
+
+# ========== Output ==========
+def _open_text(path: str, compression: str = "none"):
+    if compression == "gzip":
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("Kompresi zstd membutuhkan paket 'zstandard'")
+        return zstandard.open(path, "wt", encoding="utf-8")
+    if compression == "none":
+        return open(path, "w", encoding="utf-8")
+    raise ValueError(f"compression harus salah satu dari {COMPRESSIONS}")
+
+
+def write_ndjson_part(chunk: Dict[str, np.ndarray], names: List[str], path: str, compression: str = "none") -> int:
+    """Stream one chunk as newline-delimited JSON, one document per line"""
+    rows = 0
+    lines = []
+    with _open_text(path, compression) as f:
+        for record in iter_records(chunk, names):
+            lines.append(json.dumps(record, separators=(",", ":")))
+            if len(lines) >= NDJSON_WRITE_BATCH:
+                f.write("\n".join(lines) + "\n")
+                rows += len(lines)
+                lines = []
+        if lines:
+            f.write("\n".join(lines) + "\n")
+            rows += len(lines)
+    return rows
+
+
+def chunk_to_arrow(chunk: Dict[str, np.ndarray], names: List[str]):
+    """
+    Build an Arrow table straight from the columnar chunk; `product` becomes a
+    list<struct<id_product, name, quantity>> built from flat arrays and offsets.
+    """
+    if pa is None:
+        raise ImportError("Output Parquet membutuhkan paket 'pyarrow'")
+    codes = chunk["product_codes"]
+    used = codes >= 0
+    flat_codes = codes[used]
+    offsets = np.concatenate([[0], np.cumsum(used.sum(axis=1))]).astype(np.int32)
+
+    items = pa.StructArray.from_arrays(
+        [
+            pa.array(np.asarray(PRODUCT_IDS, dtype=object)[flat_codes], type=pa.string()),
+            pa.array(np.asarray(LIST_MENU, dtype=object)[flat_codes], type=pa.string()),
+            pa.array(chunk["quantities"][used].astype(np.int64))
+        ],
+        names=["id_product", "name", "quantity"]
+    )
+    dates = np.datetime_as_string(chunk["transaction_date"], unit="D")
+    return pa.table({
+        "id_transaction": chunk["id_transaction"],
+        "product": pa.ListArray.from_arrays(pa.array(offsets), items),
+        "name": pa.array(np.asarray(names, dtype=object)[chunk["name_index"]], type=pa.string()),
+        "order_quantity": chunk["order_quantity"].astype(np.int64),
+        "id_franchise": chunk["id_franchise"].astype(np.int64),
+        "id_employee": chunk["id_employee"].astype(np.int64),
+        "transaction_date": pa.array(dates.astype(object), type=pa.string()),
+        "month": pa.array(np.datetime_as_string(chunk["transaction_date"].astype("datetime64[M]"), unit="M").astype(object), type=pa.string())
+    })
+
+
+def write_parquet_part(chunk: Dict[str, np.ndarray], names: List[str], output_dir: str, chunk_index: int, compression: str = "zstd") -> int:
+    """Append one chunk to the month/id_franchise partitioned dataset under output_dir"""
+    table = chunk_to_arrow(chunk, names)
+    pq.write_to_dataset(
+        table,
+        root_path=output_dir,
+        partition_cols=PARQUET_PARTITION_COLS,
+        basename_template=f"part-{chunk_index:05d}-{{i}}.parquet",
+        compression=compression
+    )
+    return table.num_rows
+
+
+# ========== Worker ==========
+_worker_names: Optional[List[str]] = None
+
+
+def _init_worker(names: List[str]):
+    global _worker_names
+    _worker_names = names
+
+
+def _generate_part(chunk_index: int, start: int, stop: int, total_rows: int, seed: int, output_dir: str, output_format: str, compression: str) -> Dict[str, Any]:
+    started = time.perf_counter()
+    chunk = generate_chunk(chunk_index, start, stop, total_rows, len(_worker_names), seed)
+    if output_format == "parquet":
+        path = output_dir
+        rows = write_parquet_part(chunk, _worker_names, output_dir, chunk_index, "zstd" if compression == "none" else compression)
+    else:
+        path = os.path.join(output_dir, f"part-{chunk_index:05d}{NDJSON_EXTENSIONS[compression]}")
+        rows = write_ndjson_part(chunk, _worker_names, path, compression)
+    return {"chunk": chunk_index, "path": path, "rows": rows, "seconds": time.perf_counter() - started}
+
+
+def generate_dataset(
+    total_rows: int = DEFAULT_ROWS,
+    output_dir: str = "generated",
+    seed: int = DEFAULT_SEED,
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    name_pool_size: int = DEFAULT_NAME_POOL_SIZE,
+    output_format: str = "ndjson",
+    compression: str = "none") -> Dict[str, Any]:
+    """Generate `total_rows` transactions into part files, sharded across processes"""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"output_format harus salah satu dari {OUTPUT_FORMATS}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"compression harus salah satu dari {COMPRESSIONS}")
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+    names = build_name_pool(name_pool_size, seed)
+    ranges = chunk_ranges(total_rows, chunk_size)
+
+    parts = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(names,)) as executor:
+        futures = [
+            executor.submit(_generate_part, index, start, stop, total_rows, seed, output_dir, output_format, compression)
+            for index, start, stop in ranges
+        ]
+        for future in as_completed(futures):
+            part = future.result()
+            parts.append(part)
+            logger.info(f"Chunk {part['chunk']}: {part['rows']:,} rows in {part['seconds']:.2f}s")
+
+    elapsed = time.perf_counter() - started
+    rows = sum(part["rows"] for part in parts)
+    return {
+        "rows": rows,
+        "parts": sorted(parts, key=lambda part: part["chunk"]),
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate data transaksi cafe sintetis secara paralel")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--workers", type=int, default=None, help="Jumlah proses (default: jumlah CPU)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--name-pool-size", type=int, default=DEFAULT_NAME_POOL_SIZE)
+    parser.add_argument("--output-dir", default="generated")
+    parser.add_argument("--format", dest="output_format", choices=OUTPUT_FORMATS, default="ndjson")
+    parser.add_argument("--compression", choices=COMPRESSIONS, default="none",
+                        help="Kompresi file NDJSON; untuk Parquet dipakai sebagai codec (default zstd)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = generate_dataset(
+        total_rows=args.rows,
+        output_dir=args.output_dir,
+        seed=args.seed,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        name_pool_size=args.name_pool_size,
+        output_format=args.output_format,
+        compression=args.compression
+    )
+    print(f"{report['rows']:,} transaksi dalam {len(report['parts'])} chunk "
+          f"({report['seconds']:.1f}s, {report['rows_per_second']:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
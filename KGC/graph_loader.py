@@ -0,0 +1,328 @@
+"""
+Bulk loader Knowledge Graph cafe dari `Dataset/cafe_graph_data.xlsx` ke Neo4j.
+
+Setiap sheet dikirim sebagai batch `UNWIND $rows AS row MERGE ...` di dalam
+transaksi eksplisit, sehingga satu round trip memuat ribuan node sekaligus.
+Constraint dibuat lebih dulu agar MERGE memakai index, dan karena semua node
+di-MERGE berdasarkan key-nya, loader aman dijalankan berulang kali.
+
+id_cafe dan id_employee disimpan sebagai integer, sama dengan id_franchise dan
+id_employee di MongoDB, sehingga `f.id_cafe IN $cafe_ids` memakai index tanpa
+konversi tipe. Graph lama bisa dimigrasi dengan `neo4j_schema.py normalize`.
+
+Relasi IS_LOCATED, HAS_EMPLOYEE, dan HAS_PRODUCT juga dibuat set-based: baris
+sheet dikirim per batch dan dipasangkan lewat lookup berindex di server,
+bukan pasangan demi pasangan dari Python. HAS_PRODUCT memakai pemetaan menu
+per franchise (sheet "Menu" atau --menu CSV berisi id_cafe,id_product) jika
+ada; tanpa itu setiap franchise dihubungkan ke semua produk.
+
+Setelah load, versi data Neo4j dinaikkan lewat `bump_data_version` milik
+Agregator sehingga cache hasil query di dashboard ikut ter-invalidasi.
+
+    python graph_loader.py --excel ../Dataset/cafe_graph_data.xlsx
+    python graph_loader.py --menu menu_franchise.csv
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+from dotenv import load_dotenv
+from neo4j import GraphDatabase
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXCEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Dataset", "cafe_graph_data.xlsx")
+DEFAULT_BATCH_SIZE = 1000
+AGREGATOR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Agregator")
+
+CONSTRAINTS = [
+    "CREATE CONSTRAINT daerah_id_cafe IF NOT EXISTS FOR (n:Daerah) REQUIRE n.id_cafe IS UNIQUE",
+    "CREATE CONSTRAINT franchise_id_cafe IF NOT EXISTS FOR (n:Franchise) REQUIRE n.id_cafe IS UNIQUE",
+    "CREATE CONSTRAINT product_id_product IF NOT EXISTS FOR (n:Product) REQUIRE n.id_product IS UNIQUE",
+    "CREATE CONSTRAINT employee_id_employee IF NOT EXISTS FOR (n:Employee) REQUIRE n.id_employee IS UNIQUE"
+]
+
+
+def _text(value):
+    """Same coercion as neomodel StringProperty (used for names and work hours)"""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    return str(value)
+
+
+def _int(value):
+    if value is None or pd.isna(value):
+        return None
+    return int(value)
+
+
+# sheet -> label, Cypher MERGE per batch, dan mapper baris Excel ke parameter
+NODE_SPECS: Dict[str, Dict[str, Any]] = {
+    "Daerah": {
+        "label": "Daerah",
+        "query": """
+            UNWIND $rows AS row
+            MERGE (n:Daerah {id_cafe: row.id_cafe})
+            SET n.nama_daerah = row.nama_daerah,
+                n.kecamatan = row.kecamatan,
+                n.kota = row.kota,
+                n.kode_pos = row.kode_pos
+        """,
+        "row": lambda r: {
+            "id_cafe": _int(r["id_cafe"]),
+            "nama_daerah": _text(r["nama_daerah"]),
+            "kecamatan": _text(r["kecamatan"]),
+            "kota": _text(r["kota"]),
+            "kode_pos": _text(r["kode_pos"])
+        }
+    },
+    "Product": {
+        "label": "Product",
+        "query": """
+            UNWIND $rows AS row
+            MERGE (n:Product {id_product: row.id_product})
+            SET n.name = row.name,
+                n.category = row.category,
+                n.price = row.price
+        """,
+        "row": lambda r: {
+            "id_product": _text(r["id"]),
+            "name": _text(r["name"]),
+            "category": _text(r["category"]),
+            "price": _int(r["price"])
+        }
+    },
+    "Franchise": {
+        "label": "Franchise",
+        "query": """
+            UNWIND $rows AS row
+            MERGE (n:Franchise {id_cafe: row.id_cafe})
+            SET n.name = row.name,
+                n.year = row.year
+        """,
+        "row": lambda r: {
+            "id_cafe": _int(r["id_cafe"]),
+            "name": _text(r["cafe_name"]),
+            "year": _int(r["year_established"])
+        }
+    },
+    "Employee": {
+        "label": "Employee",
+        "query": """
+            UNWIND $rows AS row
+            MERGE (n:Employee {id_employee: row.id_employee})
+            SET n.name = row.name,
+                n.work_start_hour = row.work_start_hour,
+                n.work_end_hour = row.work_end_hour,
+                n.id_cafe = row.id_cafe
+        """,
+        "row": lambda r: {
+            "id_employee": _int(r["id"]),
+            "name": _text(r["name"]),
+            "work_start_hour": _text(r["work_start_hour"]),
+            "work_end_hour": _text(r["work_end_hour"]),
+            "id_cafe": _int(r["id_cafe"])
+        }
+    }
+}
+
+
+MENU_SHEET = "Menu"
+
+# Relasi dibuat per batch baris sheet dengan lookup berindex di kedua ujung
+RELATIONSHIP_SPECS: Dict[str, Dict[str, Any]] = {
+    "IS_LOCATED": {
+        "sheet": "Franchise",
+        "query": """
+            UNWIND $rows AS row
+            MATCH (f:Franchise {id_cafe: row.id_cafe})
+            MATCH (d:Daerah {id_cafe: row.id_cafe})
+            MERGE (f)-[:IS_LOCATED]->(d)
+        """,
+        "row": lambda r: {"id_cafe": _int(r["id_cafe"])}
+    },
+    "HAS_EMPLOYEE": {
+        "sheet": "Employee",
+        "query": """
+            UNWIND $rows AS row
+            MATCH (f:Franchise {id_cafe: row.id_cafe})
+            MATCH (e:Employee {id_employee: row.id_employee})
+            MERGE (f)-[:HAS_EMPLOYEE]->(e)
+        """,
+        "row": lambda r: {"id_cafe": _int(r["id_cafe"]), "id_employee": _int(r["id"])}
+    }
+}
+
+HAS_PRODUCT_MENU_QUERY = """
+    UNWIND $rows AS row
+    MATCH (f:Franchise {id_cafe: row.id_cafe})
+    MATCH (p:Product {id_product: row.id_product})
+    MERGE (f)-[:HAS_PRODUCT]->(p)
+"""
+
+# Tanpa pemetaan menu: setiap franchise pada batch dihubungkan ke semua produk
+HAS_PRODUCT_ALL_QUERY = """
+    UNWIND $rows AS row
+    MATCH (f:Franchise {id_cafe: row.id_cafe})
+    MATCH (p:Product)
+    MERGE (f)-[:HAS_PRODUCT]->(p)
+"""
+
+
+def read_sheets(excel_path: str = DEFAULT_EXCEL_PATH) -> Dict[str, pd.DataFrame]:
+    """Read every sheet the loader knows about (plus the optional Menu sheet)"""
+    available = pd.ExcelFile(excel_path).sheet_names
+    wanted = list(NODE_SPECS.keys()) + ([MENU_SHEET] if MENU_SHEET in available else [])
+    return pd.read_excel(excel_path, sheet_name=wanted)
+
+
+def read_menu(sheets: Dict[str, pd.DataFrame], menu_path: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """Per-franchise menu mapping (columns id_cafe, id_product), if one is provided"""
+    if menu_path:
+        return pd.read_csv(menu_path)
+    return sheets.get(MENU_SHEET)
+
+
+def to_rows(df: pd.DataFrame, mapper: Callable[[Dict[str, Any]], Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [mapper(record) for record in df.to_dict("records")]
+
+
+def chunked(rows: List[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    for i in range(0, len(rows), batch_size):
+        yield rows[i:i + batch_size]
+
+
+def create_constraints(session):
+    for statement in CONSTRAINTS:
+        session.run(statement).consume()
+
+
+def write_batches(session, query: str, rows: List[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, Any]:
+    """Send rows as UNWIND batches, one explicit write transaction per batch"""
+    start = time.perf_counter()
+    counters = {'nodes_created': 0, 'relationships_created': 0, 'properties_set': 0}
+    for batch in chunked(rows, batch_size):
+        summary = session.execute_write(lambda tx, b=batch: tx.run(query, rows=b).consume())
+        counters['nodes_created'] += summary.counters.nodes_created
+        counters['relationships_created'] += summary.counters.relationships_created
+        counters['properties_set'] += summary.counters.properties_set
+    elapsed = time.perf_counter() - start
+    return {
+        'rows': len(rows),
+        'seconds': elapsed,
+        'rows_per_second': len(rows) / elapsed if elapsed > 0 else float('inf'),
+        **counters
+    }
+
+
+def load_nodes(driver, sheets: Dict[str, pd.DataFrame], batch_size: int = DEFAULT_BATCH_SIZE, database: str = "neo4j") -> Dict[str, Dict[str, Any]]:
+    report = {}
+    with driver.session(database=database) as session:
+        create_constraints(session)
+        for sheet, spec in NODE_SPECS.items():
+            rows = to_rows(sheets[sheet], spec["row"])
+            report[spec["label"]] = write_batches(session, spec["query"], rows, batch_size)
+            logger.info(
+                f"{spec['label']}: {report[spec['label']]['rows']} rows in "
+                f"{report[spec['label']]['seconds']:.2f}s ({report[spec['label']]['rows_per_second']:,.0f} rows/s)"
+            )
+    return report
+
+
+def load_relationships(
+    driver,
+    sheets: Dict[str, pd.DataFrame],
+    menu: Optional[pd.DataFrame] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    database: str = "neo4j") -> Dict[str, Dict[str, Any]]:
+    report = {}
+    with driver.session(database=database) as session:
+        for rel_type, spec in RELATIONSHIP_SPECS.items():
+            rows = to_rows(sheets[spec["sheet"]], spec["row"])
+            report[rel_type] = write_batches(session, spec["query"], rows, batch_size)
+
+        if menu is not None:
+            rows = [
+                {"id_cafe": _int(r["id_cafe"]), "id_product": _text(r["id_product"])}
+                for r in menu.to_dict("records")
+            ]
+            report["HAS_PRODUCT"] = write_batches(session, HAS_PRODUCT_MENU_QUERY, rows, batch_size)
+        else:
+            # Batch lebih kecil: tiap baris franchise menghasilkan |Product| relasi
+            rows = to_rows(sheets["Franchise"], lambda r: {"id_cafe": _int(r["id_cafe"])})
+            report["HAS_PRODUCT"] = write_batches(session, HAS_PRODUCT_ALL_QUERY, rows, max(1, batch_size // 100))
+
+        for rel_type, stats in report.items():
+            logger.info(
+                f"{rel_type}: {stats['rows']} rows, {stats['relationships_created']} created in "
+                f"{stats['seconds']:.2f}s ({stats['rows_per_second']:,.0f} rows/s)"
+            )
+    return report
+
+
+def mark_graph_loaded(database: str = "neo4j"):
+    """Bump the neo4j data version used by the Agregator result cache"""
+    try:
+        if AGREGATOR_DIR not in sys.path:
+            sys.path.append(AGREGATOR_DIR)
+        from cache import bump_data_version
+        from connection import MONGO_DB, get_mongo_db
+        bump_data_version(get_mongo_db(MONGO_DB), "neo4j", database)
+    except Exception as e:
+        logger.warning(f"Gagal menandai versi data Neo4j {database}: {e}")
+
+
+def load_graph(
+    uri: str,
+    username: str,
+    password: str,
+    excel_path: str = DEFAULT_EXCEL_PATH,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    database: str = "neo4j",
+    menu_path: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    sheets = read_sheets(excel_path)
+    menu = read_menu(sheets, menu_path)
+    driver = GraphDatabase.driver(uri, auth=(username, password))
+    try:
+        report = load_nodes(driver, sheets, batch_size, database)
+        report.update(load_relationships(driver, sheets, menu, batch_size, database))
+        mark_graph_loaded(database)
+        return report
+    finally:
+        driver.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk load Knowledge Graph cafe ke Neo4j")
+    parser.add_argument("--excel", default=DEFAULT_EXCEL_PATH)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--database", default="neo4j")
+    parser.add_argument("--menu", help="CSV pemetaan menu per franchise (kolom id_cafe,id_product)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    report = load_graph(
+        uri=os.getenv("NEO4J_URI"),
+        username=os.getenv("NEO4J_USERNAME"),
+        password=os.getenv("NEO4J_PASSWORD"),
+        excel_path=args.excel,
+        batch_size=args.batch_size,
+        database=args.database,
+        menu_path=args.menu
+    )
+
+    print("\n=== LOAD SUMMARY ===")
+    for label, stats in report.items():
+        print(f"{label:<24} {stats['rows']:>8} rows  {stats['seconds']:>7.2f}s  {stats['rows_per_second']:>10,.0f} rows/s")
+    print("Data imported successfully!")
+
+
+if __name__ == "__main__":
+    main()